@@ -1,40 +1,221 @@
 import sys
 import os
 import json
+import queue
+import itertools
+import re
+import tempfile
+import threading
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
                              QLabel, QLineEdit, QPushButton, QTextEdit, QFileDialog, 
-                             QProgressBar, QMessageBox, QCheckBox)
+                             QProgressBar, QMessageBox, QCheckBox, QListWidget, QListWidgetItem)
 from PyQt6.QtGui import QIcon, QFont
-from PyQt6.QtCore import Qt, QThread, pyqtSignal
+from PyQt6.QtCore import Qt, QThread, pyqtSignal, QObject, QRunnable, QThreadPool, QTimer, QElapsedTimer
 
-class APIThread(QThread):
-    update_progress = pyqtSignal(int)
-    update_output = pyqtSignal(str)
-    finished = pyqtSignal(bool, str)
+TOKEN_COUNT_DELAY_MS = 300
+MAX_CONCURRENT_JOBS = 4
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+FRAME_MS = 16
+# mkstemp files are owner-only; saved files get the mode open() would give
+# them. The umask is read once here, before any worker thread starts.
+UMASK = os.umask(0)
+os.umask(UMASK)
+FILE_MODE = 0o666 & ~UMASK
 
-    def __init__(self, prompt, api_key):
+
+class TokenCountSignals(QObject):
+    counted = pyqtSignal(int, int)
+
+
+class TokenCountTask(QRunnable):
+    # Counts tokens off the GUI thread; generation lets the receiver drop
+    # results for text that has since changed.
+    def __init__(self, text, generation):
         super().__init__()
+        self.text = text
+        self.generation = generation
+        self.signals = TokenCountSignals()
+
+    def run(self):
+        count = sum(1 for _ in TOKEN_PATTERN.finditer(self.text))
+        self.signals.counted.emit(self.generation, count)
+
+class UpdateThrottle(QObject):
+    # Workers post here instead of emitting one queued signal per update.
+    # Consecutive appends to the same target are joined and only the newest
+    # value per target is kept, then everything is delivered on the GUI thread
+    # at most once per frame.
+    wake = pyqtSignal()
+
+    def __init__(self, interval_ms=FRAME_MS, parent=None):
+        super().__init__(parent)
+        self.interval_ms = interval_ms
+        self.lock = threading.Lock()
+        self.pending = []
+        self.latest = {}
+        self.awake = False
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.flush)
+        self.since_flush = QElapsedTimer()
+        self.since_flush.start()
+        self.wake.connect(self.schedule)
+
+    def append(self, target, text, sep=""):
+        with self.lock:
+            if self.pending and self.pending[-1][0] == target and self.pending[-1][1] == sep:
+                self.pending[-1][2].append(text)
+            else:
+                self.pending.append([target, sep, [text]])
+            wake, self.awake = not self.awake, True
+        if wake:
+            self.wake.emit()
+
+    def set_latest(self, target, value):
+        with self.lock:
+            self.latest[target] = value
+            wake, self.awake = not self.awake, True
+        if wake:
+            self.wake.emit()
+
+    def schedule(self):
+        if not self.timer.isActive():
+            self.timer.start(max(0, self.interval_ms - self.since_flush.elapsed()))
+
+    def flush(self):
+        self.timer.stop()
+        with self.lock:
+            pending, self.pending = self.pending, []
+            latest, self.latest = self.latest, {}
+            self.awake = False
+        self.since_flush.restart()
+        for target, value in latest.items():
+            target(value)
+        for target, sep, parts in pending:
+            target(sep.join(parts))
+
+class APIJobSignals(QObject):
+    started = pyqtSignal(int)
+    update_progress = pyqtSignal(int, int)
+    update_output = pyqtSignal(int, str)
+    finished = pyqtSignal(int, str, str)  # job id, state, response
+
+class APIJob(QRunnable):
+    # One prompt run on the window's bounded thread pool. Cancelling sets an
+    # event that the run checks between steps; a job that has not started yet
+    # is taken off the pool instead.
+    def __init__(self, job_id, title, prompt, api_key):
+        super().__init__()
+        self.job_id = job_id
+        self.title = title
         self.prompt = prompt
         self.api_key = api_key
+        self.state = "pending"
+        self.progress = 0
+        self.cancel_event = threading.Event()
+        self.signals = APIJobSignals()
 
     def run(self):
+        if self.cancel_event.is_set():
+            self.signals.finished.emit(self.job_id, "cancelled", "")
+            return
+        self.signals.started.emit(self.job_id)
         # Simulating API call
         import time
         for i in range(101):
+            if self.cancel_event.is_set():
+                self.signals.finished.emit(self.job_id, "cancelled", "")
+                return
             time.sleep(0.05)
-            self.update_progress.emit(i)
+            self.progress = i
+            self.signals.update_progress.emit(self.job_id, i)
             if i % 10 == 0:
-                self.update_output.emit(f"Processing: {i}% complete")
+                self.signals.update_output.emit(self.job_id, f"Processing: {i}% complete")
         
         # Simulated API response
         response = "This is a simulated API response."
-        self.finished.emit(True, response)
+        self.signals.finished.emit(self.job_id, "done", response)
+
+class FileWriterThread(QThread):
+    # Saves files off the GUI thread. Each file is written to a temp file in
+    # the target folder, fsynced, and then renamed over the target, so a
+    # crash never leaves a half-written file. Groups that queue up while a
+    # batch is being written are handled in the next batch.
+    saved = pyqtSignal(list)
+    failed = pyqtSignal(list, str)
+
+    def __init__(self):
+        super().__init__()
+        self.queue = queue.Queue()
+
+    def submit(self, files):
+        self.queue.put(files)
+
+    def stop(self):
+        self.queue.put(None)
+        self.wait()
+
+    def run(self):
+        running = True
+        while running:
+            batch = [self.queue.get()]
+            while True:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            if None in batch:
+                running = False
+            folders = set()
+            for files in batch:
+                if files is None:
+                    continue
+                paths = [path for path, _ in files]
+                try:
+                    for path, text in files:
+                        folder = os.path.dirname(os.path.abspath(path))
+                        os.makedirs(folder, exist_ok=True)
+                        fd, tmp_path = tempfile.mkstemp(dir=folder, suffix=".part")
+                        try:
+                            with os.fdopen(fd, 'w') as f:
+                                f.write(text)
+                                f.flush()
+                                os.fsync(f.fileno())
+                            os.chmod(tmp_path, FILE_MODE)
+                            os.replace(tmp_path, path)
+                        except OSError:
+                            os.remove(tmp_path)
+                            raise
+                        folders.add(folder)
+                except OSError as e:
+                    self.failed.emit(paths, str(e))
+                else:
+                    self.saved.emit(paths)
+            # One directory fsync per folder per batch makes the renames durable
+            if hasattr(os, "O_DIRECTORY"):
+                for folder in folders:
+                    fd = os.open(folder, os.O_RDONLY | os.O_DIRECTORY)
+                    try:
+                        os.fsync(fd)
+                    finally:
+                        os.close(fd)
+
 
 class PromptRunner(QMainWindow):
     def __init__(self):
         super().__init__()
+        self.ui_updates = UpdateThrottle(parent=self)
+        self.job_pool = QThreadPool(self)
+        self.job_pool.setMaxThreadCount(MAX_CONCURRENT_JOBS)
+        self.jobs = {}
+        self.job_items = {}
+        self.job_ids = itertools.count(1)
         self.initUI()
         self.load_config()
+        self.file_writer = FileWriterThread()
+        self.file_writer.saved.connect(self.files_saved)
+        self.file_writer.failed.connect(self.files_failed)
+        self.file_writer.start()
 
     def initUI(self):
         self.setWindowTitle("Enhanced Prompt Runner")
@@ -59,10 +240,17 @@ class PromptRunner(QMainWindow):
         self.prompt_input = QTextEdit()
         self.prompt_input.setPlaceholderText("Enter your prompt here...")
         self.char_count = QLabel("Characters: 0")
-        self.prompt_input.textChanged.connect(self.update_char_count)
+        self.token_count = QLabel("Tokens: 0")
+        self.token_generation = 0
+        self.token_timer = QTimer(self)
+        self.token_timer.setSingleShot(True)
+        self.token_timer.setInterval(TOKEN_COUNT_DELAY_MS)
+        self.token_timer.timeout.connect(self.start_token_count)
+        self.prompt_input.document().contentsChange.connect(self.update_char_count)
         main_layout.addWidget(prompt_label)
         main_layout.addWidget(self.prompt_input)
         main_layout.addWidget(self.char_count)
+        main_layout.addWidget(self.token_count)
 
         # Folder Configuration
         folder_layout = QVBoxLayout()
@@ -98,6 +286,22 @@ class PromptRunner(QMainWindow):
         self.progress_bar = QProgressBar()
         main_layout.addWidget(self.progress_bar)
 
+        # Job Queue
+        self.job_list = QListWidget()
+        self.job_list.setSelectionMode(QListWidget.SelectionMode.ExtendedSelection)
+        self.job_list.setMaximumHeight(120)
+        job_buttons = QHBoxLayout()
+        self.job_status = QLabel("0 running, 0 pending")
+        cancel_job_button = QPushButton("Cancel Selected")
+        cancel_job_button.clicked.connect(self.cancel_selected_jobs)
+        clear_jobs_button = QPushButton("Clear Finished")
+        clear_jobs_button.clicked.connect(self.clear_finished_jobs)
+        job_buttons.addWidget(self.job_status, 1)
+        job_buttons.addWidget(cancel_job_button)
+        job_buttons.addWidget(clear_jobs_button)
+        main_layout.addWidget(self.job_list)
+        main_layout.addLayout(job_buttons)
+
         # Terminal Output
         self.terminal_output = QTextEdit()
         self.terminal_output.setReadOnly(True)
@@ -125,9 +329,23 @@ class PromptRunner(QMainWindow):
         if folder:
             input_widget.setText(folder)
 
-    def update_char_count(self):
-        count = len(self.prompt_input.toPlainText())
+    def update_char_count(self, position, removed, added):
+        # characterCount() is O(1) and includes the final paragraph separator.
+        # The raw contentsChange deltas are not used directly because they are
+        # off by one when the whole document is replaced.
+        count = self.prompt_input.document().characterCount() - 1
         self.char_count.setText(f"Characters: {count}")
+        self.token_generation += 1
+        self.token_timer.start()
+
+    def start_token_count(self):
+        task = TokenCountTask(self.prompt_input.toPlainText(), self.token_generation)
+        task.signals.counted.connect(self.update_token_count)
+        QThreadPool.globalInstance().start(task)
+
+    def update_token_count(self, generation, count):
+        if generation == self.token_generation:
+            self.token_count.setText(f"Tokens: ~{count}")
 
     def toggle_api_key_visibility(self, state):
         if state == Qt.CheckState.Checked.value:
@@ -150,53 +368,97 @@ class PromptRunner(QMainWindow):
             QMessageBox.warning(self, "Input Error", "Please enter both a prompt and an API key")
             return
 
-        self.run_button.setEnabled(False)
-        self.progress_bar.setValue(0)
-        self.terminal_output.clear()
-
-        self.api_thread = APIThread(prompt, api_key)
-        self.api_thread.update_progress.connect(self.update_progress)
-        self.api_thread.update_output.connect(self.update_terminal)
-        self.api_thread.finished.connect(self.api_call_finished)
-        self.api_thread.start()
-
-    def update_progress(self, value):
-        self.progress_bar.setValue(value)
+        # Runs are queued rather than blocking the Run button; the job keeps
+        # its own copy of the title and prompt for saving.
+        job = APIJob(next(self.job_ids), self.title_input.text() or "untitled", prompt, api_key)
+        job.signals.started.connect(self.job_started)
+        # Direct connections run on the worker thread and only post to the
+        # throttle; the widgets are updated once per frame.
+        job.signals.update_progress.connect(
+            lambda job_id, value: self.ui_updates.set_latest(self.refresh_jobs, None), Qt.ConnectionType.DirectConnection
+        )
+        job.signals.update_output.connect(
+            lambda job_id, message: self.ui_updates.append(self.update_terminal, f"#{job_id} {message}", "\n"),
+            Qt.ConnectionType.DirectConnection,
+        )
+        job.signals.finished.connect(self.job_finished)
+        self.jobs[job.job_id] = job
+        item = QListWidgetItem()
+        item.setData(Qt.ItemDataRole.UserRole, job.job_id)
+        self.job_items[job.job_id] = item
+        self.job_list.addItem(item)
+        self.job_pool.start(job)
+        self.terminal_output.append(f"#{job.job_id} Queued: {job.title}")
+        self.prompt_input.clear()
+        self.refresh_jobs()
+
+    def refresh_jobs(self, _=None):
+        running = [job for job in self.jobs.values() if job.state == "running"]
+        pending = sum(1 for job in self.jobs.values() if job.state == "pending")
+        for job_id, job in self.jobs.items():
+            detail = f"{job.progress}%" if job.state == "running" else job.state
+            self.job_items[job_id].setText(f"#{job_id} {job.title} - {detail}")
+        if running:
+            self.progress_bar.setValue(sum(job.progress for job in running) // len(running))
+        self.job_status.setText(f"{len(running)} running, {pending} pending")
+
+    def job_started(self, job_id):
+        self.jobs[job_id].state = "running"
+        self.refresh_jobs()
+
+    def job_finished(self, job_id, state, response):
+        self.ui_updates.flush()
+        job = self.jobs[job_id]
+        job.state = state
+        if state == "done":
+            job.progress = 100
+            self.save_output(job.title, job.prompt, response)
+            self.terminal_output.append(f"#{job_id} API call completed successfully")
+        else:
+            self.terminal_output.append(f"#{job_id} API call {state}")
+        self.refresh_jobs()
+
+    def cancel_selected_jobs(self):
+        for item in self.job_list.selectedItems():
+            job = self.jobs[item.data(Qt.ItemDataRole.UserRole)]
+            if job.state not in ("pending", "running"):
+                continue
+            job.cancel_event.set()
+            if job.state == "pending" and self.job_pool.tryTake(job):
+                self.job_finished(job.job_id, "cancelled", "")
+
+    def clear_finished_jobs(self):
+        for job_id in [job_id for job_id, job in self.jobs.items() if job.state not in ("pending", "running")]:
+            del self.jobs[job_id]
+            item = self.job_items.pop(job_id)
+            self.job_list.takeItem(self.job_list.row(item))
+        self.refresh_jobs()
 
     def update_terminal(self, message):
         self.terminal_output.append(message)
 
-    def api_call_finished(self, success, response):
-        self.run_button.setEnabled(True)
-        if success:
-            self.save_output(response)
-            self.terminal_output.append("API call completed successfully")
-            self.prompt_input.clear()
-        else:
-            self.terminal_output.append("API call failed")
-
-    def save_output(self, response):
-        title = self.title_input.text() or "untitled"
+    def save_output(self, title, prompt, response):
         prompts_folder = self.prompts_folder.itemAt(1).widget().text()
         outputs_folder = self.outputs_folder.itemAt(1).widget().text()
 
-        if not os.path.exists(prompts_folder):
-            os.makedirs(prompts_folder)
-        if not os.path.exists(outputs_folder):
-            os.makedirs(outputs_folder)
-
         prompt_file = os.path.join(prompts_folder, f"{title}.txt")
         output_file = os.path.join(outputs_folder, f"{title}_output.txt")
 
-        with open(prompt_file, 'w') as f:
-            f.write(self.prompt_input.toPlainText())
-
-        with open(output_file, 'w') as f:
-            f.write(response)
+        # Folders are created and files written on the writer thread
+        self.file_writer.submit([
+            (prompt_file, prompt),
+            (output_file, response),
+        ])
+        self.terminal_output.append("Saving output...")
 
+    def files_saved(self, paths):
+        prompt_file, output_file = paths
         self.terminal_output.append(f"Prompt saved to: {prompt_file}")
         self.terminal_output.append(f"Output saved to: {output_file}")
 
+    def files_failed(self, paths, error):
+        self.terminal_output.append(f"Failed to save {', '.join(paths)}: {error}")
+
     def toggle_dark_mode(self, state):
         if state == Qt.CheckState.Checked.value:
             self.setStyleSheet("""
@@ -230,7 +492,11 @@ class PromptRunner(QMainWindow):
             json.dump(config, f)
 
     def closeEvent(self, event):
+        for job in self.jobs.values():
+            job.cancel_event.set()
+        self.job_pool.waitForDone(5000)
         self.save_config()
+        self.file_writer.stop()
         event.accept()
 
 if __name__ == '__main__':
@@ -0,0 +1,422 @@
+"""Bulk runs through the provider's Batch API.
+
+The per-call path sends one request per prompt and pays the full price for
+each, within the client's rate limits. For non-interactive bulk work,
+``run_batch_api`` writes the prompts to JSONL batch input files instead: one
+``/v1/chat/completions`` request per line, with the title as ``custom_id``.
+It uploads each file and creates a batch job, which the provider runs at a
+reduced rate within its completion window. Every open batch is then polled
+with exponential backoff. When a batch finishes, its output file is
+downloaded and each result is saved the way the other runners save it:
+``{title}_output.txt`` in the outputs folder, plus the run store and the
+response cache.
+
+Input files are written a line at a time and split at ``MAX_BATCH_REQUESTS``
+lines or ``MAX_BATCH_BYTES``. Submitted batches are listed in
+``batches.json`` in the work folder until their results are collected,
+together with the outputs folder they were submitted for. An interrupted
+run, or a cancelled GUI job, therefore loses nothing. The next run collects
+those batches into their own outputs folder and does not submit their
+prompts again. Only one run at a time may use a work folder; a second one,
+in this process or another, raises ``WorkDirBusy``.
+
+Point ``OPENAI_BASE_URL`` at ``mock_server.py`` to run the whole flow offline.
+
+Usage:
+    python batch_api.py PROMPTS_FOLDER OUTPUTS_FOLDER [--model gpt-4o-mini] [--collect-only]
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from batch_runner import (DEFAULT_MODEL, add_param_arguments, discover_prompts, output_path, params_from_args,
+                          read_text, write_text)
+from response_cache import DEFAULT_MAX_BYTES, ResponseCache, default_cache_dir
+from run_store import RunStore, default_store_path
+from token_budget import describe, estimate, fits_context
+from transport import Transport
+
+ENDPOINT = "/v1/chat/completions"
+COMPLETION_WINDOW = "24h"
+MAX_BATCH_REQUESTS = 50_000
+# The service accepts input files of up to 200 MB.
+MAX_BATCH_BYTES = 190 * 1024 * 1024
+DEFAULT_POLL_SECONDS = 10.0
+DEFAULT_MAX_POLL_SECONDS = 300.0
+POLL_BACKOFF = 1.5
+TERMINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
+MANIFEST_NAME = "batches.json"
+LOCK_NAME = "batches.lock"
+
+
+class WorkDirBusy(RuntimeError):
+    """Another batch run holds the work folder."""
+
+
+def default_work_dir(config_folder=""):
+    base = config_folder or os.path.join(os.path.expanduser("~"), ".enhanced_prompt_runner")
+    return os.path.join(base, "batches")
+
+
+def batch_request(title, model, prompt_text, params=None):
+    return {
+        "custom_id": title, "method": "POST", "url": ENDPOINT,
+        "body": {"model": model, "messages": [{"role": "user", "content": prompt_text}], **(params or {})},
+    }
+
+
+def body_params(body):
+    """The request parameters of a batch request body: everything but the model and messages."""
+    return {name: value for name, value in body.items() if name not in ("model", "messages")}
+
+
+def read_jsonl(path):
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def pack(requests, work_dir, prefix, max_requests=MAX_BATCH_REQUESTS, max_bytes=MAX_BATCH_BYTES):
+    """Write ``requests`` to JSONL input files; yield ``(path, count)`` as each file is completed."""
+    f = None
+    part = 0
+    try:
+        for request in requests:
+            line = (json.dumps(request, ensure_ascii=False) + "\n").encode("utf-8")
+            if f is not None and (count >= max_requests or size + len(line) > max_bytes):
+                f.close()
+                f = None
+                yield path, count
+            if f is None:
+                part += 1
+                path = os.path.join(work_dir, f"{prefix}-{part:03d}.jsonl")
+                f = open(path, "wb")
+                count = size = 0
+            f.write(line)
+            count += 1
+            size += len(line)
+        if f is not None:
+            f.close()
+            f = None
+            yield path, count
+    finally:
+        if f is not None:
+            f.close()
+
+
+@contextlib.contextmanager
+def work_dir_lock(work_dir):
+    """Hold ``work_dir`` for one batch run; raise ``WorkDirBusy`` if another run has it.
+
+    The lock is taken on a file of its own, so it is per open file rather
+    than per process, and the OS drops it if the process dies.
+    """
+    f = open(os.path.join(work_dir, LOCK_NAME), "a+b")
+    try:
+        try:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            raise WorkDirBusy(f"Another batch run is using {work_dir}") from None
+        yield
+    finally:
+        # Closing the file releases the lock.
+        f.close()
+
+
+class Manifest:
+    """Batches submitted but not collected yet, kept in ``batches.json``."""
+
+    def __init__(self, work_dir):
+        self.path = os.path.join(work_dir, MANIFEST_NAME)
+        self.batches = {}
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.batches = json.load(f)
+
+    def add(self, batch_id, input_path, model, outputs_folder):
+        self.batches[batch_id] = {
+            "input_path": input_path, "model": model, "outputs_folder": outputs_folder, "submitted_at": time.time(),
+        }
+        self._save()
+
+    def remove(self, batch_id):
+        self.batches.pop(batch_id, None)
+        self._save()
+
+    def titles(self, outputs_folder):
+        """Titles in open batches whose results go to ``outputs_folder``."""
+        titles = set()
+        for entry in self.batches.values():
+            if entry.get("outputs_folder", outputs_folder) != outputs_folder:
+                continue
+            if os.path.exists(entry["input_path"]):
+                titles.update(request["custom_id"] for request in read_jsonl(entry["input_path"]))
+        return titles
+
+    def _save(self):
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.path), prefix=".tmp-", suffix=".part")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(self.batches, f, indent=2)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+
+def batch_output(record):
+    """``(output, usage, error)`` for one line of a batch output or error file."""
+    response = record.get("response") or {}
+    body = response.get("body") or {}
+    if record.get("error"):
+        return None, None, record["error"].get("message") or str(record["error"])
+    if response.get("status_code") != 200:
+        error = body.get("error") or {}
+        return None, None, f"HTTP {response.get('status_code')}: {error.get('message', 'no response')}"
+    return body["choices"][0]["message"]["content"] or "", body.get("usage") or {}, None
+
+
+def run_batch_api(prompts_folder, outputs_folder, api_key, model=DEFAULT_MODEL, work_dir=None,
+                  overwrite=False, cache=None, refresh_cache=False, store=None, transport=None,
+                  poll_seconds=DEFAULT_POLL_SECONDS, max_poll_seconds=DEFAULT_MAX_POLL_SECONDS,
+                  collect_only=False, cancelled=None, log=print, params=None):
+    """Submit every prompt in ``prompts_folder`` as batches and save the results as they finish.
+
+    ``params`` (from ``request_params``) are sent with every request. Batches
+    left open by an earlier run are collected too, into the outputs folder
+    they were submitted for, and their results are cached under the
+    parameters they were submitted with. Returns ``(succeeded, failed)``
+    counts. If ``cancelled`` (a ``threading.Event``) is set, polling stops;
+    the batches keep running at the provider and the next run collects them.
+    Raises ``WorkDirBusy`` if another run is using ``work_dir``.
+    """
+    work_dir = work_dir or default_work_dir()
+    os.makedirs(work_dir, exist_ok=True)
+    outputs_folder = os.path.abspath(outputs_folder)
+    with work_dir_lock(work_dir):
+        os.makedirs(outputs_folder, exist_ok=True)
+        if cancelled is None:
+            cancelled = threading.Event()
+        owns_transport = transport is None
+        if owns_transport:
+            transport = Transport()
+        client = transport.openai_client(api_key)
+        manifest = Manifest(work_dir)
+        counts = {"ok": 0, "failed": 0}
+        params = params or {}
+
+        def save(title, model_name, prompt_text, output, usage, source, folder=outputs_folder):
+            write_text(output_path(folder, title), output)
+            if store is not None:
+                store.add(title, model_name, prompt_text, output, source=source, usage=usage)
+            counts["ok"] += 1
+
+        def requests():
+            # Prompts answered by the cache or too long for the model never reach a batch file.
+            pending = manifest.titles(outputs_folder)
+            seen = set()
+            for title, prompt_file in discover_prompts(prompts_folder):
+                if title in seen:
+                    log(f"[skip] {title}: another prompt file has the same title")
+                    continue
+                seen.add(title)
+                if title in pending:
+                    log(f"[skip] {title}: already in an open batch")
+                    continue
+                if not overwrite:
+                    if os.path.exists(output_path(outputs_folder, title)):
+                        log(f"[skip] {title}: output already exists")
+                        continue
+                    if store is not None and store.latest(title, model):
+                        log(f"[skip] {title}: already in the run store")
+                        continue
+                prompt_text = read_text(prompt_file)
+                messages = [{"role": "user", "content": prompt_text}]
+                if cache is not None and not refresh_cache:
+                    output = cache.get(model, messages, params)
+                    if output is not None:
+                        save(title, model, prompt_text, output, {}, "cache")
+                        log(f"[done] {title} (cache)")
+                        continue
+                run_estimate = estimate(messages, model, params.get("max_tokens"))
+                if not fits_context(run_estimate):
+                    log(f"[reject] {title}: too long for {model} ({describe(run_estimate)})")
+                    counts["failed"] += 1
+                    continue
+                yield batch_request(title, model, prompt_text, params)
+
+        def collect(batch, entry):
+            # Batches left by an earlier run go to the folder they were submitted for.
+            folder = entry.get("outputs_folder", outputs_folder)
+            os.makedirs(folder, exist_ok=True)
+            bodies = {}
+            if os.path.exists(entry["input_path"]):
+                for request in read_jsonl(entry["input_path"]):
+                    bodies[request["custom_id"]] = request["body"]
+            downloaded = []
+            for file_id in (batch.output_file_id, batch.error_file_id):
+                if not file_id:
+                    continue
+                path = os.path.join(work_dir, f"{batch.id}-{file_id}.jsonl")
+                client.files.content(file_id).write_to_file(path)
+                downloaded.append(path)
+                for record in read_jsonl(path):
+                    title = record.get("custom_id")
+                    body = bodies.pop(title, None)
+                    output, usage, error = batch_output(record)
+                    if error is not None or body is None:
+                        log(f"[error] {title}: {error or 'not in the batch input'}")
+                        counts["failed"] += 1
+                        continue
+                    messages = body["messages"]
+                    prompt_text = messages[0]["content"]
+                    if cache is not None:
+                        cache.put(entry["model"], messages, output, body_params(body))
+                    save(title, entry["model"], prompt_text, output, usage, "batch", folder)
+                    log(f"[done] {title} (batch {batch.id})")
+            for title in bodies:
+                log(f"[error] {title}: no result (batch {batch.status})")
+                counts["failed"] += 1
+            if store is not None:
+                store.flush()
+            for path in downloaded + [entry["input_path"]]:
+                if os.path.exists(path):
+                    os.remove(path)
+
+        try:
+            if not collect_only:
+                # Runs started in the same second must not share input file names.
+                prefix = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+                for path, count in pack(requests(), work_dir, prefix):
+                    with open(path, "rb") as f:
+                        uploaded = client.files.create(file=f, purpose="batch")
+                    batch = client.batches.create(
+                        input_file_id=uploaded.id, endpoint=ENDPOINT, completion_window=COMPLETION_WINDOW
+                    )
+                    manifest.add(batch.id, path, model, outputs_folder)
+                    log(f"[submit] {batch.id}: {count} prompts from {os.path.basename(path)}")
+
+            delay = poll_seconds
+            statuses = {}
+            while manifest.batches:
+                for batch_id, entry in list(manifest.batches.items()):
+                    try:
+                        batch = client.batches.retrieve(batch_id)
+                    except Exception as e:
+                        log(f"[poll] {batch_id}: {e.__class__.__name__}: {e}; retrying")
+                        continue
+                    if statuses.get(batch_id) != batch.status:
+                        statuses[batch_id] = batch.status
+                        done = batch.request_counts
+                        progress = f" ({done.completed + done.failed}/{done.total})" if done and done.total else ""
+                        log(f"[poll] {batch_id}: {batch.status}{progress}")
+                    if batch.status in TERMINAL_STATUSES:
+                        collect(batch, entry)
+                        manifest.remove(batch_id)
+                if not manifest.batches:
+                    break
+                # Jitter keeps several runners from polling in lockstep.
+                if cancelled.wait(delay * random.uniform(0.9, 1.1)):
+                    log(f"Stopped waiting; {len(manifest.batches)} batches stay open and are collected on the next run")
+                    break
+                delay = min(delay * POLL_BACKOFF, max_poll_seconds)
+        finally:
+            if store is not None:
+                store.flush()
+            if owns_transport:
+                transport.close()
+        return counts["ok"], counts["failed"]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run every prompt in a folder through the Batch API.")
+    parser.add_argument("prompts_folder", help="Folder containing .txt/.md prompt files")
+    parser.add_argument("outputs_folder", help="Folder to write {title}_output.txt files to")
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    add_param_arguments(parser)
+    parser.add_argument("--api-key", default=os.environ.get("OPENAI_API_KEY", ""),
+                        help="Defaults to $OPENAI_API_KEY")
+    parser.add_argument("--work-dir", default=default_work_dir(),
+                        help="Where batch input files and the list of open batches are kept")
+    parser.add_argument("--collect-only", action="store_true",
+                        help="Only wait for and collect batches submitted earlier")
+    parser.add_argument("--poll-seconds", type=float, default=DEFAULT_POLL_SECONDS,
+                        help="First polling interval; it grows by half after each poll")
+    parser.add_argument("--max-poll-seconds", type=float, default=DEFAULT_MAX_POLL_SECONDS,
+                        help="Longest polling interval")
+    parser.add_argument("--overwrite", action="store_true",
+                        help="Re-run prompts whose output file already exists")
+    parser.add_argument("--store", default=default_store_path(),
+                        help="SQLite run store that records every run")
+    parser.add_argument("--cache-dir", default=default_cache_dir(),
+                        help="Directory of the on-disk response cache")
+    parser.add_argument("--cache-max-mb", type=float, default=DEFAULT_MAX_BYTES / (1024 * 1024),
+                        help="Size budget of the response cache")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the response cache entirely")
+    parser.add_argument("--refresh-cache", action="store_true",
+                        help="Ignore cached responses but store the fresh ones")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not args.api_key:
+        print("API Key is required! Pass --api-key or set OPENAI_API_KEY.", file=sys.stderr)
+        return 2
+    if not args.collect_only and not os.path.isdir(args.prompts_folder):
+        print(f"Prompts folder not found: {args.prompts_folder}", file=sys.stderr)
+        return 2
+    if args.poll_seconds <= 0 or args.max_poll_seconds < args.poll_seconds:
+        print("--poll-seconds must be positive and at most --max-poll-seconds", file=sys.stderr)
+        return 2
+
+    cache = None
+    if not args.no_cache:
+        cache = ResponseCache(args.cache_dir, max_bytes=int(args.cache_max_mb * 1024 * 1024))
+    store = RunStore(args.store)
+
+    started = time.perf_counter()
+    try:
+        ok, failed = run_batch_api(
+            args.prompts_folder, args.outputs_folder, args.api_key, model=args.model, work_dir=args.work_dir,
+            overwrite=args.overwrite, cache=cache, refresh_cache=args.refresh_cache, store=store,
+            poll_seconds=args.poll_seconds, max_poll_seconds=args.max_poll_seconds,
+            collect_only=args.collect_only, params=params_from_args(args),
+        )
+    except WorkDirBusy as e:
+        print(f"{e}; wait for it to finish or pass another --work-dir", file=sys.stderr)
+        return 2
+    except KeyboardInterrupt:
+        print(f"Interrupted; open batches are listed in {os.path.join(args.work_dir, MANIFEST_NAME)}",
+              file=sys.stderr)
+        return 130
+    finally:
+        store.close()
+    print(f"Finished {ok + failed} prompts in {time.perf_counter() - started:.1f}s "
+          f"({ok} succeeded, {failed} failed)")
+    if cache is not None:
+        print(cache.stats())
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
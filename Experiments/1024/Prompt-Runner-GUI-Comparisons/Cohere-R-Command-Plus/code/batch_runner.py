@@ -0,0 +1,313 @@
+"""Headless batch runner for the Enhanced Prompt Runner.
+
+Runs every prompt file in a prompts folder against the chat completions API
+with a bounded number of requests in flight, and writes each result to
+``{title}_output.txt`` in the outputs folder (the same naming used by
+``EnhancedPromptRunner.save_prompt_and_output``).
+
+Usage:
+    python batch_runner.py PROMPTS_FOLDER OUTPUTS_FOLDER [--concurrency 8]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+from hedging import DEFAULT_BUDGET_RATIO, DEFAULT_DEADLINE, HedgeBudget, HedgePolicy, hedged_call_async
+from metrics import MetricsRegistry, RunMetrics, current_run, default_metrics_dir, metrics_file_path
+from rate_limiter import DEFAULT_RPM, DEFAULT_TPM, RateLimiter, call_with_rate_limit_async
+from response_cache import DEFAULT_MAX_BYTES, ResponseCache, default_cache_dir, request_params
+from run_store import RunStore, default_store_path, usage_dict
+from token_budget import count_tokens_batch, describe, estimate, estimate_from_count, fits_context
+from transport import Transport
+
+DEFAULT_MODEL = "gpt-3.5-turbo"
+DEFAULT_CONCURRENCY = 8
+PROMPT_EXTENSIONS = (".txt", ".md")
+
+
+def output_path(outputs_folder, title):
+    return os.path.join(outputs_folder, f"{title}_output.txt")
+
+
+def discover_prompts(prompts_folder):
+    """Yield (title, path) for every prompt file in the folder, in name order."""
+    for name in sorted(os.listdir(prompts_folder)):
+        path = os.path.join(prompts_folder, name)
+        title, ext = os.path.splitext(name)
+        if os.path.isfile(path) and ext.lower() in PROMPT_EXTENSIONS:
+            yield title, path
+
+
+def read_text(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def write_text(path, text):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+async def run_jobs(jobs, handler, concurrency):
+    """Feed ``jobs`` to ``concurrency`` workers calling ``handler(job)``.
+
+    Jobs are pulled from the iterable lazily through a bounded queue, so a
+    folder of any size is held in memory only ``concurrency`` items at a time.
+    Returns ``(succeeded, failed)`` counts.
+    """
+    queue = asyncio.Queue(maxsize=concurrency * 2)
+    counts = {"ok": 0, "failed": 0}
+
+    async def worker():
+        while True:
+            job = await queue.get()
+            try:
+                if job is None:
+                    return
+                ok = await handler(job)
+                counts["ok" if ok else "failed"] += 1
+            finally:
+                queue.task_done()
+
+    workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+    for job in jobs:
+        await queue.put(job)
+    for _ in workers:
+        await queue.put(None)
+    await asyncio.gather(*workers)
+    return counts["ok"], counts["failed"]
+
+
+def prompt_runner(client, model=DEFAULT_MODEL, cache=None, refresh_cache=False, rate_limiter=None,
+                  store=None, metrics=None, hedge_policy=None, log=print, params=None):
+    """Return ``run_prompt(title, prompt_text)``, the per-prompt pipeline shared by the batch runners.
+
+    It answers from the cache when it can and otherwise calls the API under
+    the rate limiter and hedge policy. ``params`` (from ``request_params``)
+    are sent with every request and are part of the cache key. Each run is recorded in the metrics
+    and the run store. The coroutine returns ``(output, run)``; ``output`` is
+    ``None`` if the prompt is too long for the model.
+    """
+    if rate_limiter is None:
+        rate_limiter = RateLimiter()
+    if hedge_policy is None:
+        hedge_policy = HedgePolicy(metrics, model)
+    params = params or {}
+
+    async def run_prompt(title, prompt_text):
+        run = RunMetrics(title, model)
+        token = current_run.set(run)
+        try:
+            messages = [{"role": "user", "content": prompt_text}]
+            started = time.perf_counter()
+            output = None
+            usage = {}
+            if cache is not None and not refresh_cache:
+                output = await asyncio.to_thread(cache.get, model, messages, params)
+            if output is not None:
+                source = run.source = "cache"
+            else:
+                source = "api"
+                run_estimate = await asyncio.to_thread(estimate, messages, model, params.get("max_tokens"))
+                if not fits_context(run_estimate):
+                    log(f"[reject] {title}: too long for {model} ({describe(run_estimate)})")
+                    return None, run
+                response, run.hedged = await hedged_call_async(
+                    hedge_policy,
+                    lambda: call_with_rate_limit_async(
+                        rate_limiter,
+                        lambda: client.chat.completions.with_raw_response.create(
+                            model=model, messages=messages, **params
+                        ),
+                        run_estimate.prompt_tokens + run_estimate.completion_tokens,
+                        log=lambda message: log(f"[retry] {title}: {message}"),
+                    ),
+                    log=lambda message: log(f"[hedge] {title}: {message}"),
+                )
+                output = response.choices[0].message.content or ""
+                usage = usage_dict(response.usage)
+                if cache is not None:
+                    await asyncio.to_thread(cache.put, model, messages, output, params)
+            run.finish(usage)
+            if metrics is not None:
+                metrics.observe(run)
+            if store is not None:
+                await asyncio.to_thread(
+                    store.add, title, model, prompt_text, output, source=source,
+                    duration=time.perf_counter() - started, usage=usage, metrics=run.as_dict(),
+                )
+            return output, run
+        finally:
+            current_run.reset(token)
+
+    return run_prompt
+
+
+async def run_batch(prompts_folder, outputs_folder, api_key, model=DEFAULT_MODEL,
+                    concurrency=DEFAULT_CONCURRENCY, overwrite=False, cache=None,
+                    refresh_cache=False, transport=None, rate_limiter=None, store=None,
+                    export_txt=True, metrics=None, hedge_policy=None, log=print, params=None):
+    if export_txt:
+        os.makedirs(outputs_folder, exist_ok=True)
+    owns_transport = transport is None
+    if owns_transport:
+        transport = Transport(max_connections=concurrency, max_keepalive_connections=concurrency)
+    if hedge_policy is None:
+        hedge_policy = HedgePolicy(metrics, model)
+    client = transport.async_openai_client(api_key).with_options(max_retries=0, timeout=hedge_policy.deadline)
+    run_prompt = prompt_runner(
+        client, model, cache, refresh_cache, rate_limiter, store, metrics, hedge_policy, log, params
+    )
+
+    async def handle(job):
+        title, prompt_file = job
+        output_file = output_path(outputs_folder, title)
+        if not overwrite:
+            if export_txt and os.path.exists(output_file):
+                log(f"[skip] {title}: output already exists")
+                return True
+            if store is not None and await asyncio.to_thread(store.latest, title, model):
+                log(f"[skip] {title}: already in the run store")
+                return True
+        try:
+            prompt_text = await asyncio.to_thread(read_text, prompt_file)
+            output, run = await run_prompt(title, prompt_text)
+            if output is None:
+                return False
+            if export_txt:
+                await asyncio.to_thread(write_text, output_file, output)
+                await asyncio.to_thread(write_text, metrics_file_path(output_file), run.to_json())
+            log(f"[done] {title} ({run.source}; {run.describe()})")
+            return True
+        except Exception as e:
+            log(f"[error] {title}: {e}")
+            return False
+
+    try:
+        return await run_jobs(discover_prompts(prompts_folder), handle, concurrency)
+    finally:
+        if store is not None:
+            await asyncio.to_thread(store.flush)
+        if owns_transport:
+            await transport.aclose()
+
+
+def report_estimates(prompts_folder, model, log=print):
+    """Tokenize every prompt in a process pool and print the projected cost."""
+    prompts = list(discover_prompts(prompts_folder))
+    counts = count_tokens_batch((read_text(path) for _, path in prompts), model)
+    total_cost = 0.0
+    oversized = 0
+    for (title, _), count in zip(prompts, counts):
+        run_estimate = estimate_from_count(count, model)
+        total_cost += run_estimate.cost or 0.0
+        if not fits_context(run_estimate):
+            oversized += 1
+            log(f"[too long] {title}: {describe(run_estimate)}")
+    log(f"{len(prompts)} prompts, {sum(counts)} prompt tokens, "
+        f"up to ${total_cost:.2f} for {model}; {oversized} would be rejected")
+    return oversized
+
+
+def add_param_arguments(parser):
+    parser.add_argument("--temperature", type=float, default=None,
+                        help="Sampling temperature (default: the API's); part of the cache key")
+    parser.add_argument("--max-tokens", type=int, default=None,
+                        help="Cap on completion tokens (default: the API's); part of the cache key")
+
+
+def params_from_args(args):
+    return request_params(temperature=args.temperature, max_tokens=args.max_tokens)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run every prompt in a folder concurrently.")
+    parser.add_argument("prompts_folder", help="Folder containing .txt/.md prompt files")
+    parser.add_argument("outputs_folder", help="Folder to write {title}_output.txt files to")
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help="Maximum number of requests in flight")
+    add_param_arguments(parser)
+    parser.add_argument("--api-key", default=os.environ.get("OPENAI_API_KEY", ""),
+                        help="Defaults to $OPENAI_API_KEY")
+    parser.add_argument("--rpm", type=int, default=DEFAULT_RPM,
+                        help="Requests-per-minute budget; updated from x-ratelimit-* headers")
+    parser.add_argument("--tpm", type=int, default=DEFAULT_TPM,
+                        help="Tokens-per-minute budget; updated from x-ratelimit-* headers")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Only count tokens and estimate cost for the folder, then exit")
+    parser.add_argument("--overwrite", action="store_true",
+                        help="Re-run prompts whose output file already exists")
+    parser.add_argument("--store", default=default_store_path(),
+                        help="SQLite run store that records every run")
+    parser.add_argument("--no-txt", action="store_true",
+                        help="Only record runs in the run store; skip the {title}_output.txt export")
+    parser.add_argument("--cache-dir", default=default_cache_dir(),
+                        help="Directory of the on-disk response cache")
+    parser.add_argument("--cache-max-mb", type=float, default=DEFAULT_MAX_BYTES / (1024 * 1024),
+                        help="Size budget of the response cache; least recently used entries are evicted")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the response cache entirely")
+    parser.add_argument("--refresh-cache", action="store_true",
+                        help="Ignore cached responses but store the fresh ones")
+    parser.add_argument("--hedge", action="store_true",
+                        help="Send a duplicate request when one exceeds the observed p95 time to first token")
+    parser.add_argument("--hedge-budget", type=float, default=DEFAULT_BUDGET_RATIO,
+                        help="Maximum hedged requests as a fraction of all requests")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_DEADLINE,
+                        help="Hard deadline in seconds for each prompt, including retries and hedges")
+    parser.add_argument("--metrics-dir", default=default_metrics_dir(),
+                        help="Where to write latency histograms as Prometheus text and CSV")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not args.api_key and not args.dry_run:
+        print("API Key is required! Pass --api-key or set OPENAI_API_KEY.", file=sys.stderr)
+        return 2
+    if not os.path.isdir(args.prompts_folder):
+        print(f"Prompts folder not found: {args.prompts_folder}", file=sys.stderr)
+        return 2
+    if args.concurrency < 1:
+        print("--concurrency must be at least 1", file=sys.stderr)
+        return 2
+
+    if args.dry_run:
+        return 1 if report_estimates(args.prompts_folder, args.model) else 0
+
+    cache = None
+    if not args.no_cache:
+        cache = ResponseCache(args.cache_dir, max_bytes=int(args.cache_max_mb * 1024 * 1024))
+
+    store = RunStore(args.store)
+    metrics = MetricsRegistry()
+
+    started = time.perf_counter()
+    ok, failed = asyncio.run(run_batch(
+        args.prompts_folder, args.outputs_folder, args.api_key,
+        model=args.model, concurrency=args.concurrency, overwrite=args.overwrite,
+        cache=cache, refresh_cache=args.refresh_cache,
+        rate_limiter=RateLimiter(args.rpm, args.tpm), store=store, export_txt=not args.no_txt,
+        metrics=metrics,
+        hedge_policy=HedgePolicy(metrics, args.model, enabled=args.hedge, deadline=args.timeout,
+                                 budget=HedgeBudget(args.hedge_budget)),
+        params=params_from_args(args),
+    ))
+    store.close()
+    os.makedirs(args.metrics_dir, exist_ok=True)
+    for path, text in metrics.export_files(args.metrics_dir):
+        write_text(path, text)
+    print(metrics.summary(args.model, "time_to_first_token_seconds"))
+    print(metrics.summary(args.model))
+    print(f"Finished {ok + failed} prompts in {time.perf_counter() - started:.1f}s "
+          f"({ok} succeeded, {failed} failed)")
+    if cache is not None:
+        print(cache.stats())
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,170 @@
+"""Side-by-side comparison window: one experiment prompt, several models, one column each."""
+
+import asyncio
+import os
+
+from PyQt6 import QtCore, QtWidgets
+
+from fan_out import OUTPUT_FILE, PROMPT_FILE, fan_out, parse_backend, read_prompt
+from throttle import UpdateThrottle
+
+SETTINGS_KEYS = ("compare_experiment_dir", "compare_backends")
+BACKENDS_PLACEHOLDER = (
+    "One backend per line, NAME=MODEL[@BASE_URL], e.g.\n"
+    "GPT-4o=gpt-4o\n"
+    "Ollama-70B-Via-Hugging-Chat=llama3.1:70b@http://localhost:11434/v1"
+)
+
+
+class FanOutSignals(QtCore.QObject):
+    done = QtCore.pyqtSignal(str, str, str)  # name, summary, error
+    finished = QtCore.pyqtSignal(float)
+    failed = QtCore.pyqtSignal(str)
+
+
+class FanOutTask(QtCore.QRunnable):
+    # All models are streamed concurrently on one event loop on a pool
+    # thread. Deltas reach the panes through the throttle, at most once per
+    # frame per pane; completion goes through queued signals.
+    def __init__(self, prompt_text, backends, experiment_dir, ui_updates, sinks):
+        super().__init__()
+        self.prompt_text = prompt_text
+        self.backends = backends
+        self.experiment_dir = experiment_dir
+        self.ui_updates = ui_updates
+        self.sinks = sinks
+        self.signals = FanOutSignals()
+
+    def run(self):
+        def on_delta(name, text):
+            self.ui_updates.append(self.sinks[name], text)
+
+        def on_done(result):
+            error = "" if result.error is None else f"{result.error.__class__.__name__}: {result.error}"
+            self.signals.done.emit(result.backend.name, result.metrics.describe(), error)
+
+        started = QtCore.QElapsedTimer()
+        started.start()
+        try:
+            asyncio.run(fan_out(self.prompt_text, self.backends, self.experiment_dir,
+                                on_delta=on_delta, on_done=on_done))
+        except Exception as e:
+            self.signals.failed.emit(str(e))
+            return
+        self.signals.finished.emit(started.elapsed() / 1000)
+
+
+class ComparePane(QtWidgets.QGroupBox):
+    def __init__(self, backend, parent=None):
+        super().__init__(backend.name, parent)
+        self.output = QtWidgets.QPlainTextEdit()
+        self.output.setReadOnly(True)
+        self.status = QtWidgets.QLabel(f"{backend.model} - waiting for first token...")
+        self.status.setWordWrap(True)
+        layout = QtWidgets.QVBoxLayout(self)
+        layout.addWidget(self.output)
+        layout.addWidget(self.status)
+
+    def append(self, text):
+        if self.output.document().isEmpty():
+            self.status.setText("Streaming...")
+        cursor = self.output.textCursor()
+        cursor.movePosition(cursor.MoveOperation.End)
+        cursor.insertText(text)
+
+
+class CompareDialog(QtWidgets.QDialog):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Compare Models")
+        self.resize(1200, 700)
+        self.panes = {}
+        self.ui_updates = UpdateThrottle(parent=self)
+
+        self.experiment_input = QtWidgets.QLineEdit()
+        self.experiment_input.setPlaceholderText(f"Experiment folder containing {PROMPT_FILE}")
+        self.browse_button = QtWidgets.QPushButton("Browse")
+        self.backends_input = QtWidgets.QPlainTextEdit()
+        self.backends_input.setPlaceholderText(BACKENDS_PLACEHOLDER)
+        self.backends_input.setMaximumHeight(90)
+        self.run_button = QtWidgets.QPushButton("Run All")
+        self.run_button.setToolTip(f"Stream {PROMPT_FILE} to every backend at once and write NAME/{OUTPUT_FILE}")
+        self.columns = QtWidgets.QSplitter(QtCore.Qt.Orientation.Horizontal)
+        self.status = QtWidgets.QLabel("")
+
+        folder_row = QtWidgets.QHBoxLayout()
+        folder_row.addWidget(self.experiment_input)
+        folder_row.addWidget(self.browse_button)
+        layout = QtWidgets.QVBoxLayout(self)
+        layout.addLayout(folder_row)
+        layout.addWidget(self.backends_input)
+        layout.addWidget(self.run_button)
+        layout.addWidget(self.columns, 1)
+        layout.addWidget(self.status)
+
+        self.browse_button.clicked.connect(self.browse)
+        self.run_button.clicked.connect(self.run_all)
+
+        settings = QtCore.QSettings("MyApp", "EnhancedPromptRunner")
+        self.experiment_input.setText(settings.value(SETTINGS_KEYS[0], ""))
+        self.backends_input.setPlainText(settings.value(SETTINGS_KEYS[1], ""))
+
+    def browse(self):
+        folder = QtWidgets.QFileDialog.getExistingDirectory(self, "Select an experiment folder")
+        if folder:
+            self.experiment_input.setText(folder)
+
+    def run_all(self):
+        experiment_dir = self.experiment_input.text()
+        lines = [line.strip() for line in self.backends_input.toPlainText().splitlines() if line.strip()]
+        try:
+            backends = [parse_backend(line) for line in lines]
+            prompt_text = read_prompt(experiment_dir)
+        except (OSError, ValueError) as e:
+            self.status.setText(str(e))
+            return
+        if not backends:
+            self.status.setText("Add at least one backend")
+            return
+        if len({backend.name for backend in backends}) != len(backends):
+            self.status.setText("Backend names must be unique")
+            return
+
+        settings = QtCore.QSettings("MyApp", "EnhancedPromptRunner")
+        settings.setValue(SETTINGS_KEYS[0], experiment_dir)
+        settings.setValue(SETTINGS_KEYS[1], "\n".join(lines))
+
+        for pane in self.panes.values():
+            pane.deleteLater()
+        self.panes = {}
+        for backend in backends:
+            pane = ComparePane(backend)
+            self.panes[backend.name] = pane
+            self.columns.addWidget(pane)
+
+        self.run_button.setEnabled(False)
+        self.status.setText(f"Running {len(backends)} models against {os.path.join(experiment_dir, PROMPT_FILE)}...")
+        sinks = {name: pane.append for name, pane in self.panes.items()}
+        task = FanOutTask(prompt_text, backends, experiment_dir, self.ui_updates, sinks)
+        task.signals.done.connect(self.backend_done)
+        task.signals.finished.connect(self.all_done)
+        task.signals.failed.connect(self.all_failed)
+        QtCore.QThreadPool.globalInstance().start(task)
+
+    def backend_done(self, name, summary, error):
+        self.ui_updates.flush()
+        pane = self.panes[name]
+        if error:
+            pane.status.setText(f"Failed: {error}")
+        else:
+            pane.status.setText(f"Saved {name}/{OUTPUT_FILE} - {summary}")
+
+    def all_done(self, seconds):
+        self.ui_updates.flush()
+        self.run_button.setEnabled(True)
+        self.status.setText(f"{len(self.panes)} models finished in {seconds:.1f}s")
+
+    def all_failed(self, message):
+        self.ui_updates.flush()
+        self.run_button.setEnabled(True)
+        self.status.setText(f"Comparison failed: {message}")
@@ -0,0 +1,287 @@
+"""Expand a prompt template over every row of a CSV or JSONL dataset.
+
+The template is an ordinary prompt file with ``{placeholders}`` named after
+the dataset's columns (CSV header) or keys (JSONL objects). Rows are read
+lazily by a generator, formatted, and fed through ``run_jobs`` to the batch
+runner's per-prompt pipeline, so at most ``--concurrency`` requests are in
+flight. Each finished row is appended to a JSONL results file keyed by row
+id as soon as it completes. Memory stays flat however many rows the dataset
+has.
+
+Each row gets a title from ``--title`` (default ``{_template}-{_id}``). That
+title is used for the run store and, with ``--outputs-folder``, for the
+``{title}_output.txt`` files written by the existing save path. Rows whose
+title is already in the run store are skipped unless ``--overwrite``, so an
+interrupted run can be restarted with the same command.
+
+Usage:
+    python dataset_runner.py TEMPLATE DATASET RESULTS.jsonl [--id-field id] [--concurrency 8]
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import os
+import re
+import string
+import sys
+import time
+
+from batch_runner import (DEFAULT_CONCURRENCY, DEFAULT_MODEL, add_param_arguments, output_path, params_from_args,
+                          prompt_runner, read_text, run_jobs, write_text)
+from hedging import DEFAULT_BUDGET_RATIO, DEFAULT_DEADLINE, HedgeBudget, HedgePolicy
+from metrics import MetricsRegistry, default_metrics_dir, metrics_file_path
+from rate_limiter import DEFAULT_RPM, DEFAULT_TPM, RateLimiter
+from response_cache import DEFAULT_MAX_BYTES, ResponseCache, default_cache_dir
+from run_store import RunStore, default_store_path
+from transport import Transport
+
+DEFAULT_TITLE = "{_template}-{_id}"
+UNSAFE_TITLE_CHARS = re.compile(r"[^\w.-]+")
+
+
+def template_fields(template):
+    """The placeholder names used in ``template``, e.g. ``{"name", "city"}``."""
+    fields = set()
+    for _, name, _, _ in string.Formatter().parse(template):
+        if name:
+            fields.add(re.split(r"[.\[]", name, maxsplit=1)[0])
+    return fields
+
+
+def parse_jsonl(f):
+    for line in f:
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as e:
+            yield e
+
+
+def read_rows(path, id_field=None):
+    """Yield ``(row_id, row, error)`` for each record of a .csv or .jsonl file, one at a time.
+
+    The id is the ``id_field`` value when given, otherwise the 1-based record
+    number. A malformed record is yielded with ``row`` set to ``None`` and an
+    error message, so it fails on its own instead of stopping the run.
+    """
+    is_csv = path.lower().endswith(".csv")
+    with open(path, "r", encoding="utf-8", newline="" if is_csv else None) as f:
+        records = csv.DictReader(f) if is_csv else parse_jsonl(f)
+        for number, row in enumerate(records, 1):
+            if isinstance(row, ValueError):
+                yield str(number), None, f"invalid JSON: {row}"
+            elif not isinstance(row, dict):
+                yield str(number), None, "record is not an object"
+            elif id_field and row.get(id_field) in (None, ""):
+                yield str(number), None, f"record has no {id_field!r}"
+            else:
+                yield str(row[id_field] if id_field else number), row, None
+
+
+def safe_title(title):
+    # Titles become file names on the existing save path.
+    return UNSAFE_TITLE_CHARS.sub("_", title).strip("._") or "untitled"
+
+
+def expand(rows, template, title_template, template_name):
+    """Yield ``(row_id, title, prompt_text, error)`` for each row, lazily."""
+    for row_id, row, error in rows:
+        if error is not None:
+            yield row_id, None, None, error
+            continue
+        values = dict(row, _id=row_id, _template=template_name)
+        try:
+            yield row_id, safe_title(title_template.format_map(values)), template.format_map(values), None
+        except (KeyError, IndexError, AttributeError, ValueError) as e:
+            yield row_id, None, None, f"cannot fill the template: {e.__class__.__name__}: {e}"
+
+
+class ResultsWriter:
+    """Appends one JSON line per finished row and flushes it, so results survive a crash."""
+
+    def __init__(self, path):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._file = open(path, "a", encoding="utf-8")
+
+    def write(self, record):
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+async def run_dataset(template, rows, results, api_key, template_name="template", title_template=DEFAULT_TITLE,
+                      model=DEFAULT_MODEL, concurrency=DEFAULT_CONCURRENCY, outputs_folder=None,
+                      overwrite=False, cache=None, refresh_cache=False, transport=None, rate_limiter=None,
+                      store=None, metrics=None, hedge_policy=None, log=print, params=None):
+    """Run ``template`` over ``rows`` (from ``read_rows``) and write each result to ``results``."""
+    if outputs_folder:
+        os.makedirs(outputs_folder, exist_ok=True)
+    owns_transport = transport is None
+    if owns_transport:
+        transport = Transport(max_connections=concurrency, max_keepalive_connections=concurrency)
+    if hedge_policy is None:
+        hedge_policy = HedgePolicy(metrics, model)
+    client = transport.async_openai_client(api_key).with_options(max_retries=0, timeout=hedge_policy.deadline)
+    run_prompt = prompt_runner(
+        client, model, cache, refresh_cache, rate_limiter, store, metrics, hedge_policy, log, params
+    )
+
+    async def handle(job):
+        row_id, title, prompt_text, error = job
+        record = {"id": row_id, "title": title, "status": "error"}
+        try:
+            if error is not None:
+                record["error"] = error
+                log(f"[error] row {row_id}: {error}")
+                return False
+            if not overwrite and store is not None and await asyncio.to_thread(store.latest, title, model):
+                record["status"] = "skipped"
+                log(f"[skip] {title}: already in the run store")
+                return True
+            output, run = await run_prompt(title, prompt_text)
+            record["metrics"] = run.as_dict()
+            if output is None:
+                record["status"] = "rejected"
+                record["error"] = f"too long for {model}"
+                return False
+            if outputs_folder:
+                output_file = output_path(outputs_folder, title)
+                await asyncio.to_thread(write_text, output_file, output)
+                await asyncio.to_thread(write_text, metrics_file_path(output_file), run.to_json())
+            record["status"] = "ok"
+            record["output"] = output
+            log(f"[done] {title} ({run.source}; {run.describe()})")
+            return True
+        except Exception as e:
+            record["error"] = str(e)
+            log(f"[error] {title}: {e}")
+            return False
+        finally:
+            results.write(record)
+
+    jobs = expand(rows, template, title_template, template_name)
+    try:
+        return await run_jobs(jobs, handle, concurrency)
+    finally:
+        if store is not None:
+            await asyncio.to_thread(store.flush)
+        if owns_transport:
+            await transport.aclose()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run a prompt template over every row of a CSV/JSONL dataset.")
+    parser.add_argument("template", help="Prompt file with {column} placeholders")
+    parser.add_argument("dataset", help=".csv (with a header row) or .jsonl file of rows")
+    parser.add_argument("results", help="JSONL file that results are appended to, one line per row")
+    parser.add_argument("--id-field", default=None,
+                        help="Column that identifies a row (default: the row number)")
+    parser.add_argument("--title", default=DEFAULT_TITLE,
+                        help="Per-row title template; may use columns, {_id} and {_template} (default: %(default)s)")
+    parser.add_argument("--outputs-folder", default=None,
+                        help="Also write {title}_output.txt for each row, like the GUI's export")
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help="Maximum number of requests in flight")
+    add_param_arguments(parser)
+    parser.add_argument("--api-key", default=os.environ.get("OPENAI_API_KEY", ""),
+                        help="Defaults to $OPENAI_API_KEY")
+    parser.add_argument("--rpm", type=int, default=DEFAULT_RPM, help="Requests-per-minute budget")
+    parser.add_argument("--tpm", type=int, default=DEFAULT_TPM, help="Tokens-per-minute budget")
+    parser.add_argument("--overwrite", action="store_true",
+                        help="Re-run rows whose title is already in the run store")
+    parser.add_argument("--store", default=default_store_path(),
+                        help="SQLite run store that records every run")
+    parser.add_argument("--cache-dir", default=default_cache_dir(),
+                        help="Directory of the on-disk response cache")
+    parser.add_argument("--cache-max-mb", type=float, default=DEFAULT_MAX_BYTES / (1024 * 1024),
+                        help="Size budget of the response cache")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the response cache entirely")
+    parser.add_argument("--refresh-cache", action="store_true",
+                        help="Ignore cached responses but store the fresh ones")
+    parser.add_argument("--hedge", action="store_true",
+                        help="Send a duplicate request when one exceeds the observed p95 time to first token")
+    parser.add_argument("--hedge-budget", type=float, default=DEFAULT_BUDGET_RATIO,
+                        help="Maximum hedged requests as a fraction of all requests")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_DEADLINE,
+                        help="Hard deadline in seconds for each row, including retries and hedges")
+    parser.add_argument("--metrics-dir", default=default_metrics_dir(),
+                        help="Where to write latency histograms as Prometheus text and CSV")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not args.api_key:
+        print("API Key is required! Pass --api-key or set OPENAI_API_KEY.", file=sys.stderr)
+        return 2
+    if args.concurrency < 1:
+        print("--concurrency must be at least 1", file=sys.stderr)
+        return 2
+    if not args.dataset.lower().endswith((".csv", ".jsonl")):
+        print(f"Dataset must be a .csv or .jsonl file: {args.dataset}", file=sys.stderr)
+        return 2
+    try:
+        template = read_text(args.template)
+        rows = read_rows(args.dataset, args.id_field)
+        # Check the placeholders against the first row before any request is sent.
+        first = next(rows, None)
+    except OSError as e:
+        print(e, file=sys.stderr)
+        return 2
+    if first is None:
+        print(f"No rows in {args.dataset}", file=sys.stderr)
+        return 2
+    if first[1] is not None:
+        missing = template_fields(template) - set(first[1]) - {"_id", "_template"}
+        if missing:
+            print(f"Template placeholders missing from the dataset: {', '.join(sorted(missing))}", file=sys.stderr)
+            return 2
+
+    def all_rows():
+        yield first
+        yield from rows
+
+    cache = None
+    if not args.no_cache:
+        cache = ResponseCache(args.cache_dir, max_bytes=int(args.cache_max_mb * 1024 * 1024))
+    store = RunStore(args.store)
+    metrics = MetricsRegistry()
+    results = ResultsWriter(args.results)
+
+    started = time.perf_counter()
+    try:
+        ok, failed = asyncio.run(run_dataset(
+            template, all_rows(), results, args.api_key,
+            template_name=os.path.splitext(os.path.basename(args.template))[0],
+            title_template=args.title, model=args.model, concurrency=args.concurrency,
+            outputs_folder=args.outputs_folder, overwrite=args.overwrite,
+            cache=cache, refresh_cache=args.refresh_cache,
+            rate_limiter=RateLimiter(args.rpm, args.tpm), store=store, metrics=metrics,
+            hedge_policy=HedgePolicy(metrics, args.model, enabled=args.hedge, deadline=args.timeout,
+                                     budget=HedgeBudget(args.hedge_budget)),
+            params=params_from_args(args),
+        ))
+    finally:
+        results.close()
+        store.close()
+    os.makedirs(args.metrics_dir, exist_ok=True)
+    for path, text in metrics.export_files(args.metrics_dir):
+        write_text(path, text)
+    print(metrics.summary(args.model))
+    print(f"Finished {ok + failed} rows in {time.perf_counter() - started:.1f}s "
+          f"({ok} succeeded, {failed} failed); results in {args.results}")
+    if cache is not None:
+        print(cache.stats())
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
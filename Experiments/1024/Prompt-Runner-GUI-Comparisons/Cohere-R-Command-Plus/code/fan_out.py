@@ -0,0 +1,210 @@
+"""Run one prompt against several models at once for side-by-side comparison.
+
+Each backend is an OpenAI-compatible endpoint. All backends are streamed
+concurrently over the shared ``Transport``, so an N-model comparison takes
+as long as the slowest model rather than the sum of them. Every result is
+written to ``<experiment>/<name>/output.md``, the layout of the
+``Experiments`` tree. Output is streamed to a temp file and swapped into
+place only once the model finishes, so a failed run keeps the previous
+output.
+
+A backend is given as ``NAME=MODEL`` or ``NAME=MODEL@BASE_URL``. Its API key
+is read from ``PROMPT_RUNNER_KEY_<NAME>`` (upper-cased, with non-alphanumeric
+characters replaced by ``_``), falling back to ``OPENAI_API_KEY``.
+
+Usage:
+    python fan_out.py EXPERIMENT_DIR --backend GPT-4o=gpt-4o \\
+        --backend Ollama-70B=llama3.1:70b@http://localhost:11434/v1
+"""
+
+import argparse
+import asyncio
+import os
+import re
+import sys
+import tempfile
+import time
+from collections import namedtuple
+
+from file_writer import FILE_MODE
+from hedging import DEFAULT_DEADLINE
+from metrics import MetricsRegistry, RunMetrics, current_run
+from rate_limiter import RateLimiter, call_with_rate_limit_async
+from run_store import usage_dict
+from token_budget import estimate
+from transport import Transport
+
+PROMPT_FILE = "prompt.md"
+OUTPUT_FILE = "output.md"
+KEY_ENV_PREFIX = "PROMPT_RUNNER_KEY_"
+
+Backend = namedtuple("Backend", "name model base_url api_key")
+FanOutResult = namedtuple("FanOutResult", "backend path error metrics")
+
+
+def key_env_name(name):
+    return KEY_ENV_PREFIX + re.sub(r"[^A-Za-z0-9]", "_", name).upper()
+
+
+def parse_backend(spec, environ=os.environ):
+    """Parse ``NAME=MODEL[@BASE_URL]`` into a ``Backend``."""
+    name, sep, rest = spec.partition("=")
+    if not sep or not name.strip() or not rest.strip():
+        raise ValueError(f"Backend must look like NAME=MODEL[@BASE_URL]: {spec!r}")
+    model, _, base_url = rest.partition("@")
+    name = name.strip()
+    api_key = environ.get(key_env_name(name)) or environ.get("OPENAI_API_KEY", "")
+    return Backend(name, model.strip(), base_url.strip() or None, api_key)
+
+
+def read_prompt(experiment_dir):
+    with open(os.path.join(experiment_dir, PROMPT_FILE), "r", encoding="utf-8") as f:
+        return f.read()
+
+
+async def run_backend(backend, prompt_text, experiment_dir, transport, rate_limiter,
+                      on_delta=None, timeout=DEFAULT_DEADLINE):
+    messages = [{"role": "user", "content": prompt_text}]
+    run = RunMetrics(backend.name, backend.model)
+    current_run.set(run)  # each backend runs in its own task, hence its own context
+
+    async def stream_into(f):
+        client = transport.async_openai_client(backend.api_key, base_url=backend.base_url).with_options(
+            max_retries=0, timeout=timeout
+        )
+        run_estimate = estimate(messages, backend.model)
+        # ``timeout`` bounds the time to the first token, retries included,
+        # and then every gap between chunks; not the whole stream, so a long
+        # generation is not cut off.
+        loop = asyncio.get_running_loop()
+        first_token_by = loop.time() + timeout
+        stream = await asyncio.wait_for(call_with_rate_limit_async(
+            rate_limiter,
+            lambda: client.chat.completions.with_raw_response.create(
+                model=backend.model, messages=messages, stream=True, stream_options={"include_usage": True}
+            ),
+            run_estimate.prompt_tokens + run_estimate.completion_tokens,
+        ), timeout)
+        usage = {}
+        started = False
+        chunks = stream.__aiter__()
+        try:
+            while True:
+                wait = timeout if started else max(first_token_by - loop.time(), 0)
+                try:
+                    chunk = await asyncio.wait_for(chunks.__anext__(), wait)
+                except StopAsyncIteration:
+                    break
+                if chunk.usage is not None:
+                    usage = usage_dict(chunk.usage)
+                if not chunk.choices or not chunk.choices[0].delta.content:
+                    continue
+                delta = chunk.choices[0].delta.content
+                started = True
+                run.mark_first_token()
+                f.write(delta)
+                if on_delta is not None:
+                    on_delta(backend.name, delta)
+        finally:
+            await stream.close()
+        return usage
+
+    directory = os.path.join(experiment_dir, backend.name)
+    path = os.path.join(directory, OUTPUT_FILE)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".part")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            usage = await stream_into(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, FILE_MODE)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        os.remove(tmp_path)
+        run.finish()
+        return FanOutResult(backend, path, e, run)
+    run.finish(usage)
+    return FanOutResult(backend, path, None, run)
+
+
+async def fan_out(prompt_text, backends, experiment_dir, transport=None, on_delta=None, on_done=None,
+                  timeout=DEFAULT_DEADLINE, metrics=None):
+    """Stream ``prompt_text`` to every backend concurrently; return their ``FanOutResult``s.
+
+    ``on_delta(name, text)`` is called for every streamed piece, and
+    ``on_done(result)`` as each backend finishes.
+    """
+    owns_transport = transport is None
+    if owns_transport:
+        transport = Transport(max_connections=max(len(backends), 1) * 2)
+    # Providers meter separately, so each backend gets its own limiter.
+    limiters = {backend.name: RateLimiter() for backend in backends}
+
+    async def run_one(backend):
+        result = await run_backend(
+            backend, prompt_text, experiment_dir, transport, limiters[backend.name], on_delta, timeout
+        )
+        if metrics is not None and result.error is None:
+            metrics.observe(result.metrics)
+        if on_done is not None:
+            on_done(result)
+        return result
+
+    try:
+        return await asyncio.gather(*(run_one(backend) for backend in backends))
+    finally:
+        if owns_transport:
+            await transport.aclose()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run an experiment's prompt.md against several models at once.")
+    parser.add_argument("experiment_dir", help=f"Directory containing {PROMPT_FILE}")
+    parser.add_argument("--backend", action="append", required=True, metavar="NAME=MODEL[@BASE_URL]",
+                        help=f"Repeat for each model; results go to NAME/{OUTPUT_FILE}")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_DEADLINE,
+                        help="Longest wait in seconds for a model's first token and between its chunks")
+    parser.add_argument("--quiet", action="store_true", help="Only report when each model finishes")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        backends = [parse_backend(spec) for spec in args.backend]
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    names = [backend.name for backend in backends]
+    if len(set(names)) != len(names):
+        print("Backend names must be unique", file=sys.stderr)
+        return 2
+    prompt_text = read_prompt(args.experiment_dir)
+
+    # Interleaved streams are unreadable in one terminal, so the CLI shows
+    # progress per model; the GUI's compare window gives each its own pane.
+    received = dict.fromkeys(names, 0)
+
+    def on_delta(name, text):
+        if received[name] == 0 and not args.quiet:
+            print(f"[{name}] first token")
+        received[name] += len(text)
+
+    def on_done(result):
+        name = result.backend.name
+        if result.error is not None:
+            print(f"[{name}] failed: {result.error.__class__.__name__}: {result.error}")
+        else:
+            print(f"[{name}] wrote {received[name]} characters to {result.path} ({result.metrics.describe()})")
+
+    started = time.perf_counter()
+    results = asyncio.run(fan_out(prompt_text, backends, args.experiment_dir, on_delta=on_delta,
+                                  on_done=on_done, timeout=args.timeout, metrics=MetricsRegistry()))
+    slowest = max((result.metrics.as_dict()["duration_seconds"] or 0.0 for result in results), default=0.0)
+    print(f"{len(results)} models in {time.perf_counter() - started:.1f}s (slowest model {slowest:.1f}s)")
+    return 1 if any(result.error is not None for result in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,116 @@
+"""Write-behind file writer with atomic replacement.
+
+``FileWriter`` owns one background thread and a queue. Callers submit a
+group of ``(path, text)`` files and return immediately. The writer drains
+every group that is waiting and writes and fsyncs each file to a temp file
+in its target directory. Only then does it ``os.replace`` each temp file
+over its target. A crash therefore leaves either the old file or the new
+one, never a half-written file. Directory entries are fsynced once per
+batch rather than once per file. ``mkstemp`` creates its files readable
+by the owner only, so each temp file is given ``FILE_MODE`` (what a plain
+``open`` would create) before it is swapped in.
+"""
+
+import os
+import queue
+import tempfile
+import threading
+
+MAX_BATCH = 64
+
+# Reading the umask means setting it, which is not thread-safe, so it is read
+# once at import, before any writer thread exists.
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+FILE_MODE = 0o666 & ~_UMASK
+
+_STOP = object()
+
+
+def _fsync_dir(directory):
+    if not hasattr(os, "O_DIRECTORY"):  # Windows cannot open directories
+        return
+    fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class FileWriter:
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="file-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, files, on_done=None):
+        """Queue ``files`` (a list of ``(path, text)``) to be written together.
+
+        ``on_done(paths, error)`` is called from the writer thread once the
+        files are in place, with ``error`` set to the exception on failure.
+        """
+        self._queue.put((list(files), on_done))
+
+    def close(self, timeout=None):
+        """Flush everything queued so far and stop the writer thread."""
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def _run(self):
+        while True:
+            jobs = [self._queue.get()]
+            while len(jobs) < MAX_BATCH:
+                try:
+                    jobs.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = _STOP in jobs
+            self._write_batch([job for job in jobs if job is not _STOP])
+            if stop:
+                return
+
+    def _write_batch(self, jobs):
+        staged = []  # (job index, tmp path, final path)
+        errors = {}
+        for i, (files, _) in enumerate(jobs):
+            try:
+                for path, text in files:
+                    directory = os.path.dirname(os.path.abspath(path))
+                    os.makedirs(directory, exist_ok=True)
+                    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".part")
+                    staged.append((i, tmp_path, path))
+                    os.chmod(tmp_path, FILE_MODE)
+                    with os.fdopen(fd, "w", encoding="utf-8") as f:
+                        f.write(text)
+                        f.flush()
+                        os.fsync(f.fileno())
+            except OSError as e:
+                errors[i] = e
+
+        directories = set()
+        for i, tmp_path, path in staged:
+            if i in errors:
+                _discard(tmp_path)
+                continue
+            try:
+                os.replace(tmp_path, path)
+                directories.add(os.path.dirname(os.path.abspath(path)))
+            except OSError as e:
+                errors[i] = e
+                _discard(tmp_path)
+        for directory in directories:
+            try:
+                _fsync_dir(directory)
+            except OSError:
+                pass
+
+        for i, (files, on_done) in enumerate(jobs):
+            if on_done is not None:
+                on_done([path for path, _ in files], errors.get(i))
+
+
+def _discard(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
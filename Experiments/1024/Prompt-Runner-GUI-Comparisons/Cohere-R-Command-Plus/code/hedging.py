@@ -0,0 +1,173 @@
+"""Hedged requests with per-run deadlines.
+
+When hedging is enabled and a request is still pending after an adaptive
+delay, a duplicate is sent, and whichever finishes first is used. The delay
+defaults to the observed p95 time to first token for the model, clamped
+between ``min_delay`` and ``max_delay``. The loser is cancelled. Async
+attempts are cancelled outright. A thread attempt cannot be interrupted,
+so its result is handed to ``discard`` (for example to close a stream) as
+soon as it arrives. ``HedgeBudget`` caps hedges at a fraction of primary
+requests, so that a slow provider does not double the load.
+
+Every run also gets a hard deadline, whether or not hedging is enabled.
+A streamed attempt counts as done at its first token, so for streams the
+deadline bounds the time to first token rather than the whole generation.
+Hedge attempts run with no current run, so the latency breakdown in
+``metrics`` always describes the primary request.
+"""
+
+import asyncio
+import contextvars
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from metrics import current_run
+
+DEFAULT_DEADLINE = 120.0
+DEFAULT_QUANTILE = 95
+DEFAULT_MIN_DELAY = 0.5
+DEFAULT_MAX_DELAY = 30.0
+DEFAULT_BUDGET_RATIO = 0.1
+MIN_SAMPLES = 20
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+class HedgeBudget:
+    """Allows at most ``ratio`` hedges per primary request, plus ``burst``."""
+
+    def __init__(self, ratio=DEFAULT_BUDGET_RATIO, burst=1):
+        self.ratio = ratio
+        self.burst = burst
+        self.requests = 0
+        self.hedges = 0
+        self._lock = threading.Lock()
+
+    def record_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def try_spend(self):
+        with self._lock:
+            if self.hedges < self.ratio * self.requests + self.burst:
+                self.hedges += 1
+                return True
+            return False
+
+
+class HedgePolicy:
+    def __init__(self, metrics, model, enabled=False, deadline=DEFAULT_DEADLINE,
+                 quantile=DEFAULT_QUANTILE, min_delay=DEFAULT_MIN_DELAY,
+                 max_delay=DEFAULT_MAX_DELAY, budget=None):
+        self.metrics = metrics
+        self.model = model
+        self.enabled = enabled
+        self.deadline = deadline
+        self.quantile = quantile
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.budget = budget or HedgeBudget()
+
+    def delay(self):
+        """Seconds to wait before hedging: the model's p95 time to first token."""
+        observed = None
+        if self.metrics is not None:
+            observed = self.metrics.percentile(
+                self.model, "time_to_first_token_seconds", self.quantile, min_samples=MIN_SAMPLES
+            )
+        if observed is None:
+            return self.max_delay  # too little history; hedge only real stragglers
+        return min(max(observed, self.min_delay), self.max_delay)
+
+
+def _untraced(attempt):
+    current_run.set(None)
+    return attempt()
+
+
+async def _untraced_async(attempt):
+    current_run.set(None)
+    return await attempt()
+
+
+def _discard_when_done(future, discard):
+    def done(f):
+        if discard is not None and not f.cancelled() and f.exception() is None:
+            discard(f.result())
+
+    future.cancel()
+    future.add_done_callback(done)
+
+
+def hedged_call(policy, attempt, discard=None, log=None):
+    """Run ``attempt()`` under ``policy``; return ``(result, hedged)``.
+
+    ``hedged`` is True when the duplicate request won. Raises
+    ``DeadlineExceeded`` once ``policy.deadline`` seconds have passed, and
+    re-raises the last error when every attempt failed.
+    """
+    deadline = time.monotonic() + policy.deadline
+    policy.budget.record_request()
+    pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="hedge")
+    primary = pool.submit(contextvars.copy_context().run, attempt)
+    pending = {primary}
+    error = None
+    try:
+        if policy.enabled:
+            delay = min(policy.delay(), max(0.0, deadline - time.monotonic()))
+            done, _ = wait(pending, timeout=delay)
+            if not done and policy.budget.try_spend():
+                if log:
+                    log(f"No response after {delay:.2f}s, sending a hedged request")
+                pending.add(pool.submit(contextvars.copy_context().run, _untraced, attempt))
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise DeadlineExceeded(f"Run exceeded the {policy.deadline:g}s deadline")
+            done, _ = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            pending -= done
+            for future in done:
+                if future.exception() is None:
+                    pending |= done - {future}  # a tie: discard the other one too
+                    return future.result(), future is not primary
+                error = future.exception()
+        raise error
+    finally:
+        for future in pending:
+            _discard_when_done(future, discard)
+        pool.shutdown(wait=False)
+
+
+async def hedged_call_async(policy, attempt, log=None):
+    """Async ``hedged_call``: ``attempt`` returns an awaitable; losers are cancelled."""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + policy.deadline
+    policy.budget.record_request()
+    primary = asyncio.ensure_future(attempt())
+    pending = {primary}
+    error = None
+    try:
+        if policy.enabled:
+            delay = min(policy.delay(), max(0.0, deadline - loop.time()))
+            done, _ = await asyncio.wait(pending, timeout=delay)
+            if not done and policy.budget.try_spend():
+                if log:
+                    log(f"No response after {delay:.2f}s, sending a hedged request")
+                pending.add(asyncio.ensure_future(_untraced_async(attempt)))
+        while pending:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                raise DeadlineExceeded(f"Run exceeded the {policy.deadline:g}s deadline")
+            done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    pending |= done - {task}
+                    return task.result(), task is not primary
+                error = task.exception()
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
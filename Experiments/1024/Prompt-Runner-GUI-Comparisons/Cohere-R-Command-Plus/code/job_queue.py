@@ -0,0 +1,274 @@
+"""Job queue for prompt runs: a bounded ``QThreadPool``, plus a list view with per-job cancel.
+
+Each submitted run becomes a ``Job`` and is executed by a ``JobRunnable`` on
+the queue's own pool. At most ``max_jobs`` run at once; the rest wait in the
+pool's queue, so the Run button never has to be disabled.
+
+Job state changes only on the GUI thread, in the queue's slots for the
+runnables' queued signals. Cancelling a pending job takes it off the pool
+before it starts. Cancelling a running job sets its cancel event; the job
+function polls this with ``job.check_cancelled()`` and stops at the next
+chunk.
+"""
+
+import itertools
+import threading
+import time
+
+from PyQt6 import QtCore, QtWidgets
+
+DEFAULT_MAX_JOBS = 4
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = (DONE, FAILED, CANCELLED)
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, job_id, title, fn):
+        self.id = job_id
+        self.title = title
+        self.fn = fn
+        self.state = PENDING
+        self.message = ""
+        self.cancel_event = threading.Event()
+        self.submitted = time.monotonic()
+        self.started = None
+        self.finished = None
+
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def check_cancelled(self):
+        if self.cancel_event.is_set():
+            raise JobCancelled("Cancelled")
+
+    def elapsed(self):
+        if self.started is None:
+            return None
+        return (self.finished or time.monotonic()) - self.started
+
+
+class JobSignals(QtCore.QObject):
+    started = QtCore.pyqtSignal(int)
+    finished = QtCore.pyqtSignal(int, str, str)  # job id, state, message
+
+
+class JobRunnable(QtCore.QRunnable):
+    def __init__(self, job):
+        super().__init__()
+        self.job = job
+        self.signals = JobSignals()
+
+    def run(self):
+        job = self.job
+        if job.cancelled():
+            self.signals.finished.emit(job.id, CANCELLED, "Cancelled before it started")
+            return
+        self.signals.started.emit(job.id)
+        try:
+            message = job.fn(job) or ""
+        except JobCancelled as e:
+            self.signals.finished.emit(job.id, CANCELLED, str(e))
+        except Exception as e:
+            self.signals.finished.emit(job.id, FAILED, str(e))
+        else:
+            self.signals.finished.emit(job.id, DONE, message)
+
+
+class JobQueue(QtCore.QObject):
+    job_added = QtCore.pyqtSignal(object)
+    job_changed = QtCore.pyqtSignal(object)
+    jobs_removed = QtCore.pyqtSignal()
+
+    def __init__(self, max_jobs=DEFAULT_MAX_JOBS, parent=None):
+        super().__init__(parent)
+        self.pool = QtCore.QThreadPool(self)
+        self.pool.setMaxThreadCount(max_jobs)
+        self.jobs = {}
+        self._runnables = {}
+        self._ids = itertools.count(1)
+
+    def set_max_jobs(self, max_jobs):
+        self.pool.setMaxThreadCount(max_jobs)
+
+    def submit(self, title, fn):
+        """Queue ``fn(job)`` to run on the pool; its return value becomes the job's message."""
+        job = Job(next(self._ids), title, fn)
+        runnable = JobRunnable(job)
+        runnable.signals.started.connect(self._started)
+        runnable.signals.finished.connect(self._finished)
+        self.jobs[job.id] = job
+        self._runnables[job.id] = runnable
+        self.job_added.emit(job)
+        self.pool.start(runnable)
+        return job
+
+    def cancel(self, job_id):
+        job = self.jobs.get(job_id)
+        if job is None or job.state in FINISHED_STATES:
+            return
+        job.cancel_event.set()
+        if job.state == PENDING and self.pool.tryTake(self._runnables[job_id]):
+            self._finished(job_id, CANCELLED, "Cancelled before it started")
+            return
+        job.message = "Cancelling..."
+        self.job_changed.emit(job)
+
+    def cancel_all(self):
+        for job_id in list(self.jobs):
+            self.cancel(job_id)
+
+    def clear_finished(self):
+        for job_id in [job.id for job in self.jobs.values() if job.state in FINISHED_STATES]:
+            del self.jobs[job_id]
+        self.jobs_removed.emit()
+
+    def counts(self):
+        counts = {PENDING: 0, RUNNING: 0}
+        for job in self.jobs.values():
+            if job.state in counts:
+                counts[job.state] += 1
+        return counts[PENDING], counts[RUNNING]
+
+    def shutdown(self, wait_ms=5000):
+        self.cancel_all()
+        return self.pool.waitForDone(wait_ms)
+
+    def _started(self, job_id):
+        job = self.jobs.get(job_id)
+        if job is None:
+            return
+        job.state = RUNNING
+        job.started = time.monotonic()
+        self.job_changed.emit(job)
+
+    def _finished(self, job_id, state, message):
+        self._runnables.pop(job_id, None)
+        job = self.jobs.get(job_id)
+        if job is None:
+            return
+        job.state = state
+        job.message = message
+        job.finished = time.monotonic()
+        self.job_changed.emit(job)
+
+
+class JobListModel(QtCore.QAbstractTableModel):
+    HEADERS = ("#", "Title", "State", "Time", "Result")
+
+    def __init__(self, queue, parent=None):
+        super().__init__(parent)
+        self.queue = queue
+        self._jobs = list(queue.jobs.values())
+        queue.job_added.connect(self._add)
+        queue.job_changed.connect(self._change)
+        queue.jobs_removed.connect(self._reset)
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self._jobs)
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=QtCore.Qt.ItemDataRole.DisplayRole):
+        if role == QtCore.Qt.ItemDataRole.DisplayRole and orientation == QtCore.Qt.Orientation.Horizontal:
+            return self.HEADERS[section]
+        return None
+
+    def data(self, index, role=QtCore.Qt.ItemDataRole.DisplayRole):
+        if role != QtCore.Qt.ItemDataRole.DisplayRole or not index.isValid():
+            return None
+        job = self._jobs[index.row()]
+        column = index.column()
+        if column == 0:
+            return str(job.id)
+        if column == 1:
+            return job.title or "untitled"
+        if column == 2:
+            return job.state
+        if column == 3:
+            elapsed = job.elapsed()
+            return "" if elapsed is None else f"{elapsed:.1f}s"
+        return job.message
+
+    def job_at(self, row):
+        return self._jobs[row]
+
+    def refresh_times(self):
+        # Only running rows have a clock that moves.
+        for row, job in enumerate(self._jobs):
+            if job.state == RUNNING:
+                index = self.index(row, 3)
+                self.dataChanged.emit(index, index)
+
+    def _add(self, job):
+        row = len(self._jobs)
+        self.beginInsertRows(QtCore.QModelIndex(), row, row)
+        self._jobs.append(job)
+        self.endInsertRows()
+
+    def _change(self, job):
+        row = self._jobs.index(job)
+        self.dataChanged.emit(self.index(row, 0), self.index(row, len(self.HEADERS) - 1))
+
+    def _reset(self):
+        self.beginResetModel()
+        self._jobs = list(self.queue.jobs.values())
+        self.endResetModel()
+
+
+class JobPanel(QtWidgets.QGroupBox):
+    def __init__(self, queue, parent=None):
+        super().__init__("Jobs", parent)
+        self.queue = queue
+        self.model = JobListModel(queue, self)
+        self.view = QtWidgets.QTableView()
+        self.view.setModel(self.model)
+        self.view.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectionBehavior.SelectRows)
+        self.view.setEditTriggers(QtWidgets.QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.view.verticalHeader().setVisible(False)
+        self.view.horizontalHeader().setStretchLastSection(True)
+        self.view.setMaximumHeight(150)
+        self.cancel_button = QtWidgets.QPushButton("Cancel")
+        self.cancel_button.setToolTip("Cancel the selected jobs")
+        self.clear_button = QtWidgets.QPushButton("Clear Finished")
+        self.status = QtWidgets.QLabel("")
+
+        buttons = QtWidgets.QHBoxLayout()
+        buttons.addWidget(self.status, 1)
+        buttons.addWidget(self.cancel_button)
+        buttons.addWidget(self.clear_button)
+        layout = QtWidgets.QVBoxLayout(self)
+        layout.addWidget(self.view)
+        layout.addLayout(buttons)
+
+        self.cancel_button.clicked.connect(self.cancel_selected)
+        self.clear_button.clicked.connect(queue.clear_finished)
+        queue.job_added.connect(self.update_status)
+        queue.job_changed.connect(self.update_status)
+        queue.jobs_removed.connect(self.update_status)
+
+        self.clock = QtCore.QTimer(self)
+        self.clock.setInterval(1000)
+        self.clock.timeout.connect(self.model.refresh_times)
+        self.update_status()
+
+    def cancel_selected(self):
+        for index in self.view.selectionModel().selectedRows():
+            self.queue.cancel(self.model.job_at(index.row()).id)
+
+    def update_status(self, *_):
+        pending, running = self.queue.counts()
+        self.status.setText(f"{running} running, {pending} pending")
+        # The elapsed-time column only needs a clock while something runs.
+        if running and not self.clock.isActive():
+            self.clock.start()
+        elif not running:
+            self.clock.stop()
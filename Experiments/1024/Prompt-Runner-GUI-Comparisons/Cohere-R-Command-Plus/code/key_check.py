@@ -0,0 +1,120 @@
+"""Background API key checks with a deadline, and an on-disk cache of the results.
+
+``KeyCheckTask`` lists the models on a pool thread. The SDK's retries are
+off and its timeout is the check's deadline; the window stops waiting after
+the same deadline. A successful check stores the model list in ``KeyCache``
+under a SHA-256 fingerprint of the base URL and key, so the key itself never
+reaches the file. Until ``ttl`` seconds have passed, repeated checks and the
+model picker on the next start are answered from the cache. Failed checks
+are not cached, so a corrected key is checked again straight away.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+from PyQt6 import QtCore
+
+DEFAULT_BASE_URL = "https://api.openai.com/v1"
+DEFAULT_TTL = 3600.0
+DEFAULT_DEADLINE = 10.0
+# The models endpoint also lists embedding, audio and image models.
+CHAT_MODEL_PREFIXES = ("gpt-", "chatgpt-", "o1", "o3", "o4")
+
+
+def default_key_cache_path(config_folder=""):
+    base = config_folder or os.path.join(os.path.expanduser("~"), ".enhanced_prompt_runner")
+    return os.path.join(base, "key_cache.json")
+
+
+def key_fingerprint(api_key, base_url=None):
+    base_url = (base_url or os.environ.get("OPENAI_BASE_URL") or DEFAULT_BASE_URL).rstrip("/")
+    return hashlib.sha256(f"{base_url}\n{api_key}".encode("utf-8")).hexdigest()
+
+
+def chat_models(model_ids):
+    """The chat models among ``model_ids``, sorted; all of them if none look like chat models."""
+    chat = [model_id for model_id in model_ids if model_id.startswith(CHAT_MODEL_PREFIXES)]
+    return sorted(chat or model_ids)
+
+
+class KeyCache:
+    def __init__(self, path, ttl=DEFAULT_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = None
+
+    def _load(self):
+        if self._entries is None:
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError):
+                self._entries = {}
+        return self._entries
+
+    def get(self, fingerprint):
+        """The fresh entry (``{"models": [...], "checked_at": ...}``) for a key, or None."""
+        with self._lock:
+            entry = self._load().get(fingerprint)
+        if entry is None or time.time() - entry["checked_at"] > self.ttl:
+            return None
+        return entry
+
+    def put(self, fingerprint, models):
+        with self._lock:
+            entries = self._load()
+            now = time.time()
+            for stale in [name for name, entry in entries.items() if now - entry["checked_at"] > self.ttl]:
+                del entries[stale]
+            entries[fingerprint] = {"models": sorted(models), "checked_at": now}
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            # A temp file of its own, so another app instance saving at the
+            # same time never writes into it.
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".part")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(entries, f, indent=2)
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                os.remove(tmp_path)
+                raise
+
+
+class KeyCheckSignals(QtCore.QObject):
+    # generation, model ids (None if the check failed), error message
+    finished = QtCore.pyqtSignal(int, object, str)
+
+
+class KeyCheckTask(QtCore.QRunnable):
+    def __init__(self, transport, api_key, generation, cache, deadline=DEFAULT_DEADLINE):
+        super().__init__()
+        self.transport = transport
+        self.api_key = api_key
+        self.generation = generation
+        self.cache = cache
+        self.deadline = deadline
+        self.signals = KeyCheckSignals()
+
+    def run(self):
+        import openai
+
+        try:
+            client = self.transport.openai_client(self.api_key).with_options(max_retries=0, timeout=self.deadline)
+            models = [model.id for model in client.models.list()]
+        except openai.AuthenticationError as e:
+            self.signals.finished.emit(self.generation, None, f"API Key is invalid! Error: {e}")
+            return
+        except Exception as e:
+            self.signals.finished.emit(self.generation, None, f"Could not check the API key: {e}")
+            return
+        try:
+            self.cache.put(key_fingerprint(self.api_key), models)
+        except OSError:
+            pass  # the check itself succeeded; it is just not remembered
+        self.signals.finished.emit(self.generation, models, "")
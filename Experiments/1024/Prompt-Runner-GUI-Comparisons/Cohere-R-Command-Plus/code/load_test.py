@@ -0,0 +1,153 @@
+"""Load driver: replay a prompts folder against an OpenAI-compatible endpoint.
+
+Every prompt is sent through the same Transport and rate limiter as the
+runners, at a target concurrency. The driver then reports throughput and
+p50/p95/p99 latency (and time to first token when streaming). Pass
+``--mock`` to start ``mock_server`` in-process, so the numbers are
+reproducible on a laptop with no network.
+
+Usage:
+    python load_test.py PROMPTS_FOLDER --mock --concurrency 32 --repeat 5 --stream
+    python load_test.py PROMPTS_FOLDER --mock --rpm 120 --client-rpm 100
+    python load_test.py PROMPTS_FOLDER --base-url http://127.0.0.1:8000/v1
+"""
+
+import argparse
+import asyncio
+import itertools
+import math
+import sys
+import time
+
+import mock_server
+from batch_runner import DEFAULT_MODEL, discover_prompts, read_text, run_jobs
+from rate_limiter import RateLimiter, call_with_rate_limit_async
+from token_budget import estimate
+from transport import Transport
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not values:
+        return float("nan")
+    rank = max(1, math.ceil(pct / 100 * len(values)))
+    return values[rank - 1]
+
+
+def summarize(label, values):
+    values = sorted(values)
+    if not values:
+        return f"{label:>14}: no samples"
+    return (f"{label:>14}: p50 {percentile(values, 50) * 1000:8.1f} ms   "
+            f"p95 {percentile(values, 95) * 1000:8.1f} ms   "
+            f"p99 {percentile(values, 99) * 1000:8.1f} ms   "
+            f"max {values[-1] * 1000:8.1f} ms")
+
+
+async def drive(prompts, base_url, api_key, model, concurrency, stream, rate_limiter=None):
+    transport = Transport(max_connections=concurrency, max_keepalive_connections=concurrency)
+    client = transport.async_openai_client(api_key, base_url=base_url).with_options(max_retries=0)
+    latencies, first_tokens = [], []
+    stats = {"tokens": 0, "errors": 0}
+
+    async def send(messages):
+        def create():
+            if stream:
+                return client.chat.completions.with_raw_response.create(
+                    model=model, messages=messages, stream=True, stream_options={"include_usage": True}
+                )
+            return client.chat.completions.with_raw_response.create(model=model, messages=messages)
+
+        if rate_limiter is None:
+            return (await create()).parse()
+        run_estimate = estimate(messages, model)
+        budget = run_estimate.prompt_tokens + run_estimate.completion_tokens
+        return await call_with_rate_limit_async(rate_limiter, create, budget)
+
+    async def handle(prompt_text):
+        messages = [{"role": "user", "content": prompt_text}]
+        started = time.perf_counter()
+        try:
+            response = await send(messages)
+            if stream:
+                first = None
+                async for chunk in response:
+                    if first is None and chunk.choices and chunk.choices[0].delta.content:
+                        first = time.perf_counter() - started
+                    if chunk.usage is not None:
+                        stats["tokens"] += chunk.usage.completion_tokens
+                if first is not None:
+                    first_tokens.append(first)
+            elif response.usage is not None:
+                stats["tokens"] += response.usage.completion_tokens
+        except Exception:
+            stats["errors"] += 1
+            return False
+        latencies.append(time.perf_counter() - started)
+        return True
+
+    started = time.perf_counter()
+    try:
+        await run_jobs(prompts, handle, concurrency)
+    finally:
+        await transport.aclose()
+    return time.perf_counter() - started, latencies, first_tokens, stats
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a prompts folder and report latency percentiles.")
+    parser.add_argument("prompts_folder")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000/v1")
+    parser.add_argument("--api-key", default="mock-key")
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--repeat", type=int, default=1, help="Replay the folder this many times")
+    parser.add_argument("--stream", action="store_true", help="Use SSE streaming and record time to first token")
+    # Not --rpm/--tpm: those are the mock server's own limits below.
+    parser.add_argument("--client-rpm", type=int, default=None,
+                        help="Pace requests through the client rate limiter")
+    parser.add_argument("--client-tpm", type=int, default=None,
+                        help="Tokens-per-minute budget of the client rate limiter")
+    parser.add_argument("--mock", action="store_true", help="Start mock_server in-process and target it")
+    mock_server.add_config_arguments(parser.add_argument_group("mock server (with --mock)"))
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    texts = [read_text(path) for _, path in discover_prompts(args.prompts_folder)]
+    if not texts:
+        print(f"No prompts found in {args.prompts_folder}", file=sys.stderr)
+        return 2
+    prompts = itertools.chain.from_iterable(itertools.repeat(texts, args.repeat))
+
+    server = None
+    base_url = args.base_url
+    if args.mock:
+        server = mock_server.start_in_thread(mock_server.config_from_args(args))
+        base_url = server.base_url
+
+    rate_limiter = None
+    if args.client_rpm or args.client_tpm:
+        rate_limiter = RateLimiter(args.client_rpm or 10_000, args.client_tpm or 10_000_000)
+
+    try:
+        elapsed, latencies, first_tokens, stats = asyncio.run(drive(
+            prompts, base_url, args.api_key, args.model, args.concurrency, args.stream, rate_limiter,
+        ))
+    finally:
+        if server is not None:
+            server.shutdown()
+
+    total = len(latencies) + stats["errors"]
+    print(f"{total} requests against {base_url} at concurrency {args.concurrency} in {elapsed:.2f}s")
+    print(f"    throughput: {len(latencies) / elapsed:.1f} req/s, {stats['tokens'] / elapsed:.1f} completion tokens/s")
+    print(f"        errors: {stats['errors']}")
+    print(summarize("latency", latencies))
+    if args.stream:
+        print(summarize("first token", first_tokens))
+    return 1 if stats["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
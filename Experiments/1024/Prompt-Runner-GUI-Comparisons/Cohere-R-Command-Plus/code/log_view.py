@@ -0,0 +1,182 @@
+"""Bounded terminal log for the Enhanced Prompt Runner.
+
+``LogModel`` keeps the most recent lines in a ring buffer (``deque`` with a
+``maxlen``), so appends are O(1) however long the app has been open.
+``TerminalLog`` is a ``QListView`` over that model. With uniform item sizes it
+only lays out and paints the rows that are visible. Every completed line is
+also written to a rotating log file on disk, which keeps the full history.
+
+Streamed text gets a row of its own: ``insert_text`` opens it, and until
+``end_line`` closes it, lines appended by other jobs are inserted above it,
+so they never run into the stream.
+"""
+
+import logging
+import logging.handlers
+import os
+from collections import deque
+
+from PyQt6 import QtCore, QtGui, QtWidgets
+
+DEFAULT_MAX_LINES = 10_000
+LOG_FILE_MAX_BYTES = 5 * 1024 * 1024
+LOG_FILE_BACKUPS = 5
+
+
+def default_log_path(config_folder=""):
+    base = config_folder or os.path.join(os.path.expanduser("~"), ".enhanced_prompt_runner")
+    return os.path.join(base, "logs", "terminal.log")
+
+
+class LogModel(QtCore.QAbstractListModel):
+    def __init__(self, max_lines=DEFAULT_MAX_LINES, parent=None):
+        super().__init__(parent)
+        self._lines = deque(maxlen=max_lines)
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self._lines)
+
+    def data(self, index, role=QtCore.Qt.ItemDataRole.DisplayRole):
+        if role == QtCore.Qt.ItemDataRole.DisplayRole and index.isValid():
+            return self._lines[index.row()]
+        return None
+
+    def set_max_lines(self, max_lines):
+        self.beginResetModel()
+        self._lines = deque(self._lines, maxlen=max_lines)
+        self.endResetModel()
+
+    def append_lines(self, lines):
+        if not lines:
+            return
+        lines = lines[-self._lines.maxlen:]
+        overflow = len(self._lines) + len(lines) - self._lines.maxlen
+        if overflow > 0:
+            self.beginRemoveRows(QtCore.QModelIndex(), 0, overflow - 1)
+            for _ in range(overflow):
+                self._lines.popleft()
+            self.endRemoveRows()
+        first = len(self._lines)
+        self.beginInsertRows(QtCore.QModelIndex(), first, first + len(lines) - 1)
+        self._lines.extend(lines)
+        self.endInsertRows()
+
+    def insert_before_last(self, lines):
+        """Insert ``lines`` above the last row, which stays last."""
+        if not self._lines:
+            self.append_lines(lines)
+            return
+        lines = lines[-(self._lines.maxlen - 1):] if self._lines.maxlen > 1 else []
+        if not lines:
+            return
+        overflow = len(self._lines) + len(lines) - self._lines.maxlen
+        if overflow > 0:
+            self.beginRemoveRows(QtCore.QModelIndex(), 0, overflow - 1)
+            for _ in range(overflow):
+                self._lines.popleft()
+            self.endRemoveRows()
+        first = len(self._lines) - 1
+        self.beginInsertRows(QtCore.QModelIndex(), first, first + len(lines) - 1)
+        last = self._lines.pop()
+        self._lines.extend(lines)
+        self._lines.append(last)
+        self.endInsertRows()
+
+    def extend_last(self, text):
+        if not self._lines:
+            self.append_lines([text])
+            return
+        self._lines[-1] += text
+        index = self.index(len(self._lines) - 1)
+        self.dataChanged.emit(index, index)
+
+    def last_line(self):
+        return self._lines[-1] if self._lines else ""
+
+    def clear(self):
+        self.beginResetModel()
+        self._lines.clear()
+        self.endResetModel()
+
+
+class TerminalLog(QtWidgets.QListView):
+    """Drop-in replacement for the read-only ``QTextEdit`` terminal."""
+
+    def __init__(self, max_lines=DEFAULT_MAX_LINES, parent=None):
+        super().__init__(parent)
+        self.log_model = LogModel(max_lines, self)
+        self.setModel(self.log_model)
+        self.setUniformItemSizes(True)
+        self.setWordWrap(False)
+        self.setEditTriggers(QtWidgets.QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.setSelectionMode(QtWidgets.QAbstractItemView.SelectionMode.ExtendedSelection)
+        self.setFont(QtGui.QFont("Monospace"))
+        self._logger = None
+        self._line_open = False
+
+    def set_max_lines(self, max_lines):
+        self.log_model.set_max_lines(max_lines)
+
+    def open_log_file(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        handler = logging.handlers.RotatingFileHandler(
+            path, maxBytes=LOG_FILE_MAX_BYTES, backupCount=LOG_FILE_BACKUPS, encoding="utf-8"
+        )
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        self._logger = logging.getLogger(f"enhanced_prompt_runner.terminal.{id(self)}")
+        self._logger.propagate = False
+        self._logger.setLevel(logging.INFO)
+        for old in list(self._logger.handlers):
+            self._logger.removeHandler(old)
+            old.close()
+        self._logger.addHandler(handler)
+
+    def _at_bottom(self):
+        bar = self.verticalScrollBar()
+        return bar.value() >= bar.maximum()
+
+    def _close_line(self):
+        # A streamed line is only spilled to disk once it is complete.
+        if self._line_open and self._logger is not None:
+            self._logger.info(self.log_model.last_line())
+        self._line_open = False
+
+    def append(self, text):
+        follow = self._at_bottom()
+        lines = text.split("\n")
+        if self._line_open:
+            self.log_model.insert_before_last(lines)
+        else:
+            self.log_model.append_lines(lines)
+        if self._logger is not None:
+            for line in lines:
+                self._logger.info(line)
+        if follow:
+            self.scrollToBottom()
+
+    def insert_text(self, text):
+        """Append ``text`` to the streamed line, opening a new row for it if none is open."""
+        follow = self._at_bottom()
+        first, *rest = text.split("\n")
+        if self._line_open:
+            self.log_model.extend_last(first)
+        else:
+            self.log_model.append_lines([first])
+        self._line_open = True
+        if rest:
+            self._close_line()
+            self.log_model.append_lines(rest)
+            if self._logger is not None:
+                for line in rest[:-1]:
+                    self._logger.info(line)
+            self._line_open = True
+        if follow:
+            self.scrollToBottom()
+
+    def end_line(self):
+        """Close the streamed line; later appends go below it again."""
+        self._close_line()
+
+    def clear(self):
+        self._close_line()
+        self.log_model.clear()
@@ -1,14 +1,65 @@
+import copy
+import itertools
 import os
+import tempfile
 import threading
 import time
 
-from PyQt6 import QtCore, QtGui, QtWidgets
-from openai import OpenAI
+from PyQt6 import QtCore, QtWidgets
+from batch_api import default_work_dir, run_batch_api
+from compare_panel import CompareDialog
+from file_writer import FILE_MODE, FileWriter
+from hedging import DEFAULT_DEADLINE, HedgePolicy, hedged_call
+from job_queue import DEFAULT_MAX_JOBS, JobCancelled, JobPanel, JobQueue
+from key_check import DEFAULT_DEADLINE as KEY_CHECK_DEADLINE
+from key_check import DEFAULT_TTL as KEY_CACHE_TTL
+from key_check import KeyCache, KeyCheckTask, chat_models, default_key_cache_path, key_fingerprint
+from log_view import DEFAULT_MAX_LINES, TerminalLog, default_log_path
+from metrics import MetricsRegistry, RunMetrics, current_run, default_metrics_dir, metrics_file_path
+from output_viewer import OutputViewer
+from rate_limiter import DEFAULT_RPM, DEFAULT_TPM, RateLimiter, call_with_rate_limit
+from response_cache import ResponseCache, default_cache_dir, request_params
+from run_store import RunStore, default_store_path, usage_dict
+from search_index import default_index_path
+from search_panel import SearchDialog
+from startup_profile import FirstPaintWatcher, is_profile_child, profile_startup, report_first_paint
+from throttle import UpdateThrottle
+from token_budget import count_tokens, describe, estimate, fits_context
+from transport import DEFAULT_MAX_CONNECTIONS, DEFAULT_MAX_KEEPALIVE, Transport
+
+MODEL = "gpt-3.5-turbo"
+TOKEN_COUNT_DELAY_MS = 300
+# Long outputs are not copied into the terminal; the file opens in the viewer.
+TERMINAL_PREVIEW_CHARS = 2000
+
+
+class TokenCountSignals(QtCore.QObject):
+    counted = QtCore.pyqtSignal(int, int)
+
+
+class TokenCountTask(QtCore.QRunnable):
+    # Counts tokens on a pool thread. The generation number lets the window
+    # drop results for text that has changed since the count started.
+    def __init__(self, text, generation, model=MODEL):
+        super().__init__()
+        self.text = text
+        self.generation = generation
+        self.model = model
+        self.signals = TokenCountSignals()
+
+    def run(self):
+        count = count_tokens(self.text, self.model)
+        self.signals.counted.emit(self.generation, count)
+
 
 # Step 1: Import necessary modules and create the main application window
 class EnhancedPromptRunner(QtWidgets.QMainWindow):
     def __init__(self):
         super().__init__()
+        # Worker threads never touch the terminal directly; they post to this
+        # throttle, which merges bursts into one insert per frame on the GUI
+        # thread.
+        self.ui_updates = UpdateThrottle(parent=self)
         self.setWindowTitle("Enhanced Prompt Runner")
         self.setGeometry(100, 100, 800, 600)
 
@@ -23,21 +74,66 @@ class EnhancedPromptRunner(QtWidgets.QMainWindow):
         self.create_folder_config()
         self.create_api_config()
         self.create_run_button()
+        self.create_job_panel()
         self.create_terminal_output()
-
-        # Step 1.2: Load and apply user settings
+        self.create_search_button()
+
+        self.response_cache = None
+        self.run_store = None
+        self.search_dialog = None
+        self.compare_dialog = None
+        self.output_viewer = None
+        self.file_writer = FileWriter()
+        self.metrics = MetricsRegistry()
+        # Jobs run concurrently, so lazily created shared objects are built
+        # under a lock, and only one job at a time streams into the terminal.
+        self.lazy_lock = threading.Lock()
+        self.live_stream_lock = threading.Lock()
+        self.live_stream_job = None
+        # Key checks run in the background; a result that arrives after the
+        # deadline, or after a newer check started, is ignored.
+        self.key_check_generation = 0
+        self.pending_key_check = None
+
+        # Step 1.2: Load and apply user settings once the window has painted,
+        # so reading configuration never delays the first frame.
+        self.first_paint = FirstPaintWatcher(self)
+        self.first_paint.painted.connect(self.finish_startup)
+
+    def finish_startup(self):
         self.load_settings()
+        # The shared objects are built before anything touches a widget, so
+        # runs, key checks and closeEvent always have them. Neither the
+        # transport nor the key cache imports the SDK or opens a connection
+        # until the first run or key test.
+        self.transport = Transport(
+            max_connections=self.max_connections, max_keepalive_connections=self.max_keepalive_connections
+        )
+        self.rate_limiter = RateLimiter(self.requests_per_minute, self.tokens_per_minute)
+        self.hedge_policy = HedgePolicy(self.metrics, MODEL, deadline=self.request_timeout)
+        self.key_cache = KeyCache(default_key_cache_path(self.config_folder), self.key_cache_ttl)
+        self.apply_settings()
         self.apply_dark_mode()
+        self.job_queue.set_max_jobs(self.max_concurrent_jobs)
+        # Fills the model picker for the saved key without a network call.
+        self.load_cached_models()
 
     def create_prompt_input(self):
         self.prompt_input_label = QtWidgets.QLabel("Prompt Input:")
         self.prompt_input = QtWidgets.QPlainTextEdit()
         self.prompt_input.setPlaceholderText("Enter your prompt here...")
         self.prompt_input_char_count = QtWidgets.QLabel("0 characters")
-        self.prompt_input.textChanged.connect(self.update_char_count)
+        self.prompt_input_token_count = QtWidgets.QLabel("0 tokens")
+        self.token_generation = 0
+        self.token_timer = QtCore.QTimer(self)
+        self.token_timer.setSingleShot(True)
+        self.token_timer.setInterval(TOKEN_COUNT_DELAY_MS)
+        self.token_timer.timeout.connect(self.start_token_count)
+        self.prompt_input.document().contentsChange.connect(self.update_char_count)
         self.layout.addWidget(self.prompt_input_label)
         self.layout.addWidget(self.prompt_input)
         self.layout.addWidget(self.prompt_input_char_count)
+        self.layout.addWidget(self.prompt_input_token_count)
 
     def create_title_input(self):
         self.title_input_label = QtWidgets.QLabel("Title:")
@@ -48,27 +144,36 @@ class EnhancedPromptRunner(QtWidgets.QMainWindow):
 
     def create_folder_config(self):
         self.folder_config_label = QtWidgets.QLabel("Folder Configuration:")
-        self.prompts_folder_input = self.create_folder_input("Prompts Folder:")
-        self.outputs_folder_input = self.create_folder_input("Outputs Folder:")
-        self.config_folder_input = self.create_folder_input("Configuration Folder:")
+        self.prompts_folder_input, self.prompts_folder_edit = self.create_folder_input(
+            "Prompts Folder:", "prompts_folder"
+        )
+        self.outputs_folder_input, self.outputs_folder_edit = self.create_folder_input(
+            "Outputs Folder:", "outputs_folder"
+        )
+        self.config_folder_input, self.config_folder_edit = self.create_folder_input(
+            "Configuration Folder:", "config_folder"
+        )
         self.layout.addWidget(self.folder_config_label)
         self.layout.addWidget(self.prompts_folder_input)
         self.layout.addWidget(self.outputs_folder_input)
         self.layout.addWidget(self.config_folder_input)
 
-    def create_folder_input(self, label_text):
+    def create_folder_input(self, label_text, attribute):
+        # Returns the row and its line edit; the edit keeps self.<attribute> current.
+        setattr(self, attribute, "")
         label = QtWidgets.QLabel(label_text)
         input_field = QtWidgets.QLineEdit()
+        input_field.textChanged.connect(lambda text: setattr(self, attribute, text))
         browse_button = QtWidgets.QPushButton("Browse")
         browse_button.setToolTip("Select a folder")
-        browse_button.clicked.connect(self.browse_folder)
+        browse_button.clicked.connect(lambda: self.browse_folder(input_field))
         hbox = QtWidgets.QHBoxLayout()
         hbox.addWidget(label)
         hbox.addWidget(input_field)
         hbox.addWidget(browse_button)
         widget = QtWidgets.QWidget()
         widget.setLayout(hbox)
-        return widget
+        return widget, input_field
 
     def create_api_config(self):
         self.api_config_label = QtWidgets.QLabel("API Configuration:")
@@ -80,37 +185,100 @@ class EnhancedPromptRunner(QtWidgets.QMainWindow):
         self.show_hide_api_button = QtWidgets.QPushButton("Show")
         self.show_hide_api_button.setToolTip("Show/Hide API Key")
         self.show_hide_api_button.clicked.connect(self.show_hide_api_key)
+        self.api_key_input.editingFinished.connect(self.load_cached_models)
+        self.model_label = QtWidgets.QLabel("Model:")
+        self.model_picker = QtWidgets.QComboBox()
+        self.model_picker.setEditable(True)
+        self.model_picker.addItem(MODEL)
+        self.model_picker.setToolTip("Model for new runs; the list comes from the last successful key test")
+        self.model_picker.currentTextChanged.connect(self.model_changed)
         self.layout.addWidget(self.api_config_label)
         self.layout.addWidget(self.api_key_input)
         self.layout.addWidget(self.test_api_button)
         self.layout.addWidget(self.show_hide_api_button)
+        self.layout.addWidget(self.model_label)
+        self.layout.addWidget(self.model_picker)
 
     def create_run_button(self):
         self.run_button = QtWidgets.QPushButton("Run Prompt")
-        self.run_button.setToolTip("Execute the prompt")
+        self.run_button.setToolTip("Queue the prompt as a job; several can run at once")
         self.run_button.clicked.connect(self.execute_prompt)
+        self.batch_button = QtWidgets.QPushButton("Batch Run Folder")
+        self.batch_button.setToolTip(
+            "Submit every prompt in the prompts folder through the Batch API at a lower price; "
+            "results are saved to the outputs folder when the batch finishes, which can take hours"
+        )
+        self.batch_button.clicked.connect(self.execute_batch)
+        self.stream_checkbox = QtWidgets.QCheckBox("Stream output")
+        self.stream_checkbox.setToolTip("Show tokens in the terminal as they arrive")
         self.layout.addWidget(self.run_button, alignment=QtCore.Qt.AlignmentFlag.AlignCenter)
+        self.layout.addWidget(self.batch_button, alignment=QtCore.Qt.AlignmentFlag.AlignCenter)
+        self.refresh_cache_checkbox = QtWidgets.QCheckBox("Refresh cache")
+        self.refresh_cache_checkbox.setToolTip("Ignore cached responses and fetch a fresh one from the API")
+        self.layout.addWidget(self.stream_checkbox, alignment=QtCore.Qt.AlignmentFlag.AlignCenter)
+        self.export_checkbox = QtWidgets.QCheckBox("Export .txt files")
+        self.export_checkbox.setToolTip(
+            "Also write each run to the prompts and outputs folders; runs are always kept in the run store"
+        )
+        self.layout.addWidget(self.refresh_cache_checkbox, alignment=QtCore.Qt.AlignmentFlag.AlignCenter)
+        self.layout.addWidget(self.export_checkbox, alignment=QtCore.Qt.AlignmentFlag.AlignCenter)
+        self.hedge_checkbox = QtWidgets.QCheckBox("Hedge slow requests")
+        self.hedge_checkbox.setToolTip(
+            "Send a duplicate request when no reply arrives within the usual (p95) time to first token"
+        )
+        self.layout.addWidget(self.hedge_checkbox, alignment=QtCore.Qt.AlignmentFlag.AlignCenter)
+
+    def create_job_panel(self):
+        self.job_queue = JobQueue(parent=self)
+        self.job_panel = JobPanel(self.job_queue)
+        self.layout.addWidget(self.job_panel)
 
     def create_terminal_output(self):
-        self.terminal_output = QtWidgets.QTextEdit()
-        self.terminal_output.setReadOnly(True)
-        self.terminal_output.setFont(QtGui.QFont("Monospace"))
+        self.terminal_output = TerminalLog()
         self.layout.addWidget(self.terminal_output)
 
+    def create_search_button(self):
+        self.search_button = QtWidgets.QPushButton("Search History")
+        self.search_button.setToolTip("Full-text search over the prompts and outputs folders")
+        self.search_button.clicked.connect(self.open_search)
+        self.layout.addWidget(self.search_button)
+        self.compare_button = QtWidgets.QPushButton("Compare Models")
+        self.compare_button.setToolTip("Run an experiment's prompt.md against several models side by side")
+        self.compare_button.clicked.connect(self.open_compare)
+        self.layout.addWidget(self.compare_button)
+        self.viewer_button = QtWidgets.QPushButton("View Outputs")
+        self.viewer_button.setToolTip("Browse saved outputs of any size without loading them into memory")
+        self.viewer_button.clicked.connect(self.open_viewer)
+        self.layout.addWidget(self.viewer_button)
+
     # Step 1.3: Helper functions for UI interactions
-    def update_char_count(self):
-        count = self.prompt_input.toPlainText().count()
+    def update_char_count(self, position, removed, added):
+        # characterCount() is O(1) and includes the final paragraph separator;
+        # the contentsChange deltas themselves are off by one when the whole
+        # document is replaced, so they only trigger the update.
+        count = self.prompt_input.document().characterCount() - 1
         self.prompt_input_char_count.setText(f"{count} characters")
+        self.token_generation += 1
+        self.token_timer.start()
 
-    def browse_folder(self):
+    def model_changed(self, _model):
+        # Token counts depend on the model's tokenizer.
+        self.token_generation += 1
+        self.token_timer.start()
+
+    def start_token_count(self):
+        task = TokenCountTask(self.prompt_input.toPlainText(), self.token_generation, self.current_model())
+        task.signals.counted.connect(self.update_token_count)
+        QtCore.QThreadPool.globalInstance().start(task)
+
+    def update_token_count(self, generation, count):
+        if generation == self.token_generation:
+            self.prompt_input_token_count.setText(f"{count} tokens")
+
+    def browse_folder(self, input_field):
         folder_path = QtWidgets.QFileDialog.getExistingDirectory(self, "Select a folder")
-        sender = self.sender()
-        if sender is self.prompts_folder_input.children()[1]:
-            self.prompts_folder_input.children()[0].setText(folder_path)
-        elif sender is self.outputs_folder_input.children()[1]:
-            self.outputs_folder_input.children()[0].setText(folder_path)
-        elif sender is self.config_folder_input.children()[1]:
-            self.config_folder_input.children()[0].setText(folder_path)
+        if folder_path:
+            input_field.setText(folder_path)
 
     def show_hide_api_key(self):
         if self.show_hide_api_button.text() == "Show":
@@ -127,20 +295,65 @@ class EnhancedPromptRunner(QtWidgets.QMainWindow):
         self.outputs_folder = settings.value("outputs_folder", "")
         self.config_folder = settings.value("config_folder", "")
         self.api_key = settings.value("api_key", "")
-        self.dark_mode = settings.value("dark_mode", False)
-
-        self.prompts_folder_input.children()[0].setText(self.prompts_folder)
-        self.outputs_folder_input.children()[0].setText(self.outputs_folder)
-        self.config_folder_input.children()[0].setText(self.config_folder)
+        self.dark_mode = settings.value("dark_mode", False, type=bool)
+        self.stream_output = settings.value("stream_output", False, type=bool)
+        self.export_txt = settings.value("export_txt", True, type=bool)
+        self.terminal_max_lines = settings.value("terminal_max_lines", DEFAULT_MAX_LINES, type=int)
+        self.max_connections = settings.value("max_connections", DEFAULT_MAX_CONNECTIONS, type=int)
+        self.max_keepalive_connections = settings.value("max_keepalive_connections", DEFAULT_MAX_KEEPALIVE, type=int)
+        self.requests_per_minute = settings.value("requests_per_minute", DEFAULT_RPM, type=int)
+        self.tokens_per_minute = settings.value("tokens_per_minute", DEFAULT_TPM, type=int)
+        self.hedge_requests = settings.value("hedge_requests", False, type=bool)
+        self.request_timeout = settings.value("request_timeout", DEFAULT_DEADLINE, type=float)
+        self.max_concurrent_jobs = settings.value("max_concurrent_jobs", DEFAULT_MAX_JOBS, type=int)
+        self.model = settings.value("model", MODEL)
+        self.key_cache_ttl = settings.value("key_cache_ttl", KEY_CACHE_TTL, type=float)
+        self.key_check_deadline = settings.value("key_check_deadline", KEY_CHECK_DEADLINE, type=float)
+        # No widgets; set in the settings file. Empty leaves the parameter to the API.
+        self.temperature = settings.value("temperature", "")
+        self.max_tokens = settings.value("max_tokens", "")
+
+    def apply_settings(self):
+        self.prompts_folder_edit.setText(self.prompts_folder)
+        self.outputs_folder_edit.setText(self.outputs_folder)
+        self.config_folder_edit.setText(self.config_folder)
         self.api_key_input.setText(self.api_key)
+        self.model_picker.setCurrentText(self.model)
+        self.stream_checkbox.setChecked(self.stream_output)
+        self.export_checkbox.setChecked(self.export_txt)
+        self.hedge_checkbox.setChecked(self.hedge_requests)
+        self.terminal_output.set_max_lines(self.terminal_max_lines)
+        self.terminal_output.open_log_file(default_log_path(self.config_folder))
 
     def save_settings(self):
         settings = QtCore.QSettings("MyApp", "EnhancedPromptRunner")
         settings.setValue("prompts_folder", self.prompts_folder)
         settings.setValue("outputs_folder", self.outputs_folder)
         settings.setValue("config_folder", self.config_folder)
-        settings.setValue("api_key", self.api_key)
+        settings.setValue("api_key", self.api_key_input.text())
         settings.setValue("dark_mode", self.dark_mode)
+        settings.setValue("stream_output", self.stream_checkbox.isChecked())
+        settings.setValue("export_txt", self.export_checkbox.isChecked())
+        settings.setValue("terminal_max_lines", self.terminal_max_lines)
+        settings.setValue("max_connections", self.max_connections)
+        settings.setValue("max_keepalive_connections", self.max_keepalive_connections)
+        settings.setValue("requests_per_minute", self.requests_per_minute)
+        settings.setValue("tokens_per_minute", self.tokens_per_minute)
+        settings.setValue("hedge_requests", self.hedge_checkbox.isChecked())
+        settings.setValue("request_timeout", self.request_timeout)
+        settings.setValue("max_concurrent_jobs", self.max_concurrent_jobs)
+        settings.setValue("model", self.current_model())
+        settings.setValue("key_cache_ttl", self.key_cache_ttl)
+        settings.setValue("key_check_deadline", self.key_check_deadline)
+        settings.setValue("temperature", self.temperature)
+        settings.setValue("max_tokens", self.max_tokens)
+
+    def request_params(self):
+        # Sent with every run, and part of its response cache key.
+        return request_params(
+            temperature=float(self.temperature) if self.temperature not in (None, "") else None,
+            max_tokens=int(self.max_tokens) if self.max_tokens not in (None, "") else None,
+        )
 
     def apply_dark_mode(self):
         if self.dark_mode:
@@ -154,53 +367,298 @@ class EnhancedPromptRunner(QtWidgets.QMainWindow):
     def execute_prompt(self):
         prompt_text = self.prompt_input.toPlainText()
         title = self.title_input.text()
-        self.clear_output()
-        self.print_output("Running prompt...")
+        model = self.current_model()
 
-        if not self.validate_input():
+        if not self.validate_input(prompt_text, model):
+            return
+        export = self.export_checkbox.isChecked()
+        if export and not self.confirm_overwrite(title):
             return
 
-        self.run_button.setEnabled(False)
-        self.run_button.setText("Running...")
-
-        thread = threading.Thread(target=self.run_prompt_thread, args=(prompt_text, title))
-        thread.start()
+        # Everything a run needs from the widgets is read here, on the GUI
+        # thread; the job itself never touches a widget.
+        options = {
+            "api_key": self.api_key_input.text(),
+            "export": export,
+            "stream": self.stream_checkbox.isChecked(),
+            "refresh_cache": self.refresh_cache_checkbox.isChecked(),
+            "model": model,
+            "params": self.request_params(),
+        }
+        hedge_policy = copy.copy(self.hedge_policy)
+        hedge_policy.enabled = self.hedge_checkbox.isChecked()
+        hedge_policy.model = model
+        # Timing starts at the click, so queue wait covers time pending in the
+        # job queue and any rate-limit wait before dispatch.
+        run = RunMetrics(title, model)
+        job = self.job_queue.submit(
+            title, lambda job: self.run_prompt_thread(job, prompt_text, title, run, hedge_policy, options)
+        )
+        self.print_output(f"Job #{job.id} queued: {title or 'untitled'}")
+        self.prompt_input.clear()
+
+    def execute_batch(self):
+        api_key = self.api_key_input.text()
+        if not api_key:
+            self.print_output("API Key is required!")
+            return
+        if not self.prompts_folder or not self.outputs_folder:
+            self.print_output("Prompts and outputs folders must be set for a batch run!")
+            return
+        prompts_folder, outputs_folder = self.prompts_folder, self.outputs_folder
+        refresh_cache = self.refresh_cache_checkbox.isChecked()
+        model = self.current_model()
+        params = self.request_params()
+        job = self.job_queue.submit(
+            f"Batch API: {os.path.basename(prompts_folder)}",
+            lambda job: self.run_batch_job(job, api_key, prompts_folder, outputs_folder, refresh_cache, model, params),
+        )
+        self.print_output(f"Job #{job.id} queued: Batch API run of {prompts_folder}")
+
+    def run_prompt_thread(self, job, prompt_text, title, run, hedge_policy, options):
+        current_run.set(run)
+
+        def log(message):
+            self.print_output(f"#{job.id} {message}")
 
-    def run_prompt_thread(self, prompt_text, title):
         try:
-            client = OpenAI(api_key=self.api_key_input.text())
-            response = client.chat.completions.create(
-                model="gpt-3.5-turbo", messages=[{"role": "user", "content": prompt_text}]
+            log("Running prompt...")
+            messages = [{"role": "user", "content": prompt_text}]
+            export = options["export"]
+            model = options["model"]
+            params = options["params"]
+            cache = self.get_response_cache()
+            output = None
+            if not options["refresh_cache"]:
+                output = cache.get(model, messages, params)
+
+            started = time.perf_counter()
+            first_token = None
+            usage = {}
+            if output is not None:
+                source = run.source = "cache"
+                log(f"API Response (cached): {self.preview_output(output)}")
+                if export:
+                    self.save_prompt_and_output(prompt_text, output, title)
+            else:
+                source = "api"
+                # Retries are owned by the rate limiter, not the SDK. The timeout
+                # bounds connecting and each read; the run deadline bounds the whole
+                # call, or for a stream the wait for its first token.
+                client = self.transport.openai_client(options["api_key"]).with_options(
+                    max_retries=0, timeout=self.request_timeout
+                )
+                run_estimate = estimate(messages, model, params.get("max_tokens"))
+                budget = run_estimate.prompt_tokens + run_estimate.completion_tokens
+                if options["stream"]:
+                    output, first_token, usage = self.stream_prompt(
+                        job, client, model, messages, params, budget, title, export, hedge_policy, log
+                    )
+                else:
+                    response, hedged = hedged_call(
+                        hedge_policy,
+                        lambda: call_with_rate_limit(
+                            self.rate_limiter,
+                            lambda: client.chat.completions.with_raw_response.create(
+                                model=model, messages=messages, **params
+                            ),
+                            budget,
+                            log=log,
+                        ),
+                        log=log,
+                    )
+                    if hedged:
+                        run.hedged = True
+                        log("The hedged request answered first")
+                    output = response.choices[0].message.content or ""
+                    usage = usage_dict(response.usage)
+                    # A blocking call cannot be interrupted; a job cancelled
+                    # meanwhile is dropped before anything is saved.
+                    job.check_cancelled()
+                    log(f"API Response: {self.preview_output(output)}")
+
+                    if export:
+                        self.save_prompt_and_output(prompt_text, output, title)
+                cache.put(model, messages, output, params)
+
+            run.finish(usage)
+            self.metrics.observe(run)
+            log(f"Latency: {run.describe()}")
+            run_id = self.get_run_store().record(
+                title, model, prompt_text, output, source=source,
+                duration=time.perf_counter() - started, first_token=first_token, usage=usage,
+                metrics=run.as_dict(),
             )
-            output = response.choices[0].message.content
-            self.print_output(f"API Response: {output}")
-
-            self.save_prompt_and_output(prompt_text, output, title)
-            self.print_output("Prompt executed successfully!")
+            log(f"Run #{run_id} recorded in {self.get_run_store().path}")
+            self.export_metrics(run, export)
+            log(cache.stats())
+            log("Prompt executed successfully!")
+            return f"Run #{run_id}, {run.describe()}"
+        except JobCancelled:
+            log("Cancelled")
+            raise
         except Exception as e:
-            self.print_output(f"Error: {str(e)}")
+            log(f"Error: {str(e)}")
+            raise
+
+    def stream_prompt(self, job, client, model, messages, params, budget, title, export, hedge_policy, log):
+        # Streaming mode: deltas go to the terminal as they arrive, so a long
+        # generation is visible after the first token. Only one job streams
+        # into the terminal at a time, on a row of its own that other jobs'
+        # lines are inserted above; jobs that start while it runs print their
+        # output when they finish. When exporting, each delta is appended to
+        # a temp file in the outputs folder, so the output grows on disk
+        # during generation; it replaces {title}_output.txt only once the
+        # stream completes, so a failed run keeps the previous output.
+        # The run deadline bounds the wait for the first token. After that a
+        # long generation may take as long as it needs; only a stall is cut
+        # off, by the client's read timeout between chunks.
+        started = time.perf_counter()
+
+        def open_stream():
+            # With hedging, the race is to the first token, so each attempt
+            # reads up to its first content chunk before it counts as done.
+            stream = call_with_rate_limit(
+                self.rate_limiter,
+                lambda: client.chat.completions.with_raw_response.create(
+                    model=model, messages=messages, stream=True, stream_options={"include_usage": True},
+                    **params,
+                ),
+                budget,
+                log=log,
+            )
+            head = []
+            for chunk in stream:
+                head.append(chunk)
+                if chunk.choices and chunk.choices[0].delta.content:
+                    break
+            return stream, head
+
+        (stream, head), hedged = hedged_call(
+            hedge_policy, open_stream, discard=lambda result: result[0].close(), log=log
+        )
+        if hedged:
+            current_run.get().hedged = True
+            log("The hedged request answered first")
+        first_token = None
+        usage = {}
+        parts = []
+        live = False
+        f = tmp_path = None
+        if export:
+            os.makedirs(self.outputs_folder, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.outputs_folder, prefix=".tmp-", suffix=".part")
+            os.chmod(tmp_path, FILE_MODE)
+            f = os.fdopen(fd, "w", encoding="utf-8")
+        try:
+            for chunk in itertools.chain(head, stream):
+                if job.cancelled():
+                    stream.close()
+                    job.check_cancelled()
+                if chunk.usage is not None:
+                    usage = usage_dict(chunk.usage)
+                    self.rate_limiter.reconcile(budget, chunk.usage.total_tokens)
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if not delta:
+                    continue
+                if first_token is None:
+                    current_run.get().mark_first_token()
+                    first_token = time.perf_counter() - started
+                    log(f"First token after {first_token:.2f}s")
+                    with self.live_stream_lock:
+                        live = self.live_stream_job is None
+                        if live:
+                            self.live_stream_job = job.id
+                    if live:
+                        timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
+                        self.ui_updates.append(self.append_stream_text, f"[{timestamp}] #{job.id} API Response: ")
+                parts.append(delta)
+                if f is not None:
+                    f.write(delta)
+                    f.flush()
+                if live:
+                    self.ui_updates.append(self.append_stream_text, delta)
+            if f is not None:
+                os.fsync(f.fileno())
+                f.close()
+                os.replace(tmp_path, self.output_file_path(title))
+        except BaseException:
+            if f is not None:
+                f.close()
+                os.remove(tmp_path)
+            raise
         finally:
-            self.run_button.setEnabled(True)
-            self.run_button.setText("Run Prompt")
-            self.prompt_input.clear()
-
-    def validate_input(self):
+            if live:
+                self.ui_updates.append(self.end_stream_text, "")
+                with self.live_stream_lock:
+                    self.live_stream_job = None
+
+        output = "".join(parts)
+        if not live:
+            log(f"API Response: {self.preview_output(output)}")
+        log(f"Stream finished in {time.perf_counter() - started:.2f}s")
+        if export:
+            self.file_writer.submit([(self.prompt_file_path(title), messages[0]["content"])], self.files_saved)
+        return output, first_token, usage
+
+    def run_batch_job(self, job, api_key, prompts_folder, outputs_folder, refresh_cache, model, params):
+        # Cancelling the job only stops the polling. Submitted batches keep
+        # running at the provider, and the next batch run collects them.
+        def log(message):
+            self.print_output(f"#{job.id} {message}")
+
+        ok, failed = run_batch_api(
+            prompts_folder, outputs_folder, api_key, model=model, work_dir=default_work_dir(self.config_folder),
+            cache=self.get_response_cache(), refresh_cache=refresh_cache, store=self.get_run_store(),
+            transport=self.transport, cancelled=job.cancel_event, log=log, params=params,
+        )
+        job.check_cancelled()
+        log(f"Batch run finished: {ok} saved, {failed} failed")
+        return f"{ok} saved, {failed} failed"
+
+    def get_run_store(self):
+        with self.lazy_lock:
+            if self.run_store is None:
+                self.run_store = RunStore(default_store_path(self.config_folder))
+        return self.run_store
+
+    def get_response_cache(self):
+        with self.lazy_lock:
+            if self.response_cache is None:
+                self.response_cache = ResponseCache(default_cache_dir(self.config_folder))
+        return self.response_cache
+
+    def validate_input(self, prompt_text, model):
         if not self.api_key_input.text():
             self.print_output("API Key is required!")
             return False
-        if not self.prompts_folder:
-            self.print_output("Prompts folder not set!")
-            return False
-        if not self.outputs_folder:
-            self.print_output("Outputs folder not set!")
+        if self.export_checkbox.isChecked():
+            if not self.prompts_folder:
+                self.print_output("Prompts folder not set!")
+                return False
+            if not self.outputs_folder:
+                self.print_output("Outputs folder not set!")
+                return False
+
+        # Reject prompts that cannot fit before they cost a round trip.
+        run_estimate = estimate([{"role": "user", "content": prompt_text}], model)
+        self.print_output(f"Estimate: {describe(run_estimate)}")
+        if not fits_context(run_estimate):
+            self.print_output(f"Prompt is too long for {model}!")
             return False
         return True
 
-    def save_prompt_and_output(self, prompt, output, title):
-        prompt_file = os.path.join(self.prompts_folder, f"{title}.txt")
-        output_file = os.path.join(self.outputs_folder, f"{title}_output.txt")
+    def prompt_file_path(self, title):
+        return os.path.join(self.prompts_folder, f"{title}.txt")
 
-        if os.path.exists(prompt_file) or os.path.exists(output_file):
+    def output_file_path(self, title):
+        return os.path.join(self.outputs_folder, f"{title}_output.txt")
+
+    def confirm_overwrite(self, title):
+        # Asked up front on the GUI thread; the files are written from a worker.
+        if os.path.exists(self.prompt_file_path(title)) or os.path.exists(self.output_file_path(title)):
             reply = QtWidgets.QMessageBox.question(
                 self,
                 "File Exists",
@@ -208,37 +666,162 @@ class EnhancedPromptRunner(QtWidgets.QMainWindow):
                 QtWidgets.QMessageBox.StandardButton.Yes | QtWidgets.QMessageBox.StandardButton.No,
             )
             if reply == QtWidgets.QMessageBox.StandardButton.No:
-                return
-
-        with open(prompt_file, "w") as f:
-            f.write(prompt)
-        with open(output_file, "w") as f:
-            f.write(output)
+                return False
+        return True
 
-        self.print_output(f"Files saved to {self.prompts_folder} and {self.outputs_folder}")
+    def save_prompt_and_output(self, prompt, output, title):
+        prompt_file = self.prompt_file_path(title)
+        output_file = self.output_file_path(title)
+
+        # Written behind on the file writer thread; the caller never waits.
+        self.file_writer.submit([(prompt_file, prompt), (output_file, output)], self.files_saved)
+
+    def export_metrics(self, run, export):
+        # The Prometheus file suits node_exporter's textfile collector; both
+        # exports are rewritten atomically after every run.
+        files = self.metrics.export_files(default_metrics_dir(self.config_folder))
+        if export:
+            files.append((metrics_file_path(self.output_file_path(run.title)), run.to_json()))
+        self.file_writer.submit(files, self.metrics_saved)
+
+    def metrics_saved(self, paths, error):
+        if error is not None:
+            self.print_output(f"Error saving metrics to {', '.join(paths)}: {error}")
+
+    def files_saved(self, paths, error):
+        if error is not None:
+            self.print_output(f"Error saving {', '.join(paths)}: {error}")
+        else:
+            self.print_output(f"Files saved to {self.prompts_folder} and {self.outputs_folder}")
 
     # Step 4: Helper functions for terminal output and UI updates
     def print_output(self, message):
         timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
-        self.terminal_output.append(f"[{timestamp}] {message}")
+        self.ui_updates.append(self.terminal_output.append, f"[{timestamp}] {message}", "\n")
+
+    def preview_output(self, output):
+        if len(output) <= TERMINAL_PREVIEW_CHARS:
+            return output
+        return f"{output[:TERMINAL_PREVIEW_CHARS]}... [{len(output):,} characters; see View Outputs]"
+
+    def append_stream_text(self, text):
+        self.terminal_output.insert_text(text)
+
+    def end_stream_text(self, _text):
+        # Posted through ui_updates after the last delta, so it runs in order.
+        self.terminal_output.end_line()
 
     def clear_output(self):
+        self.ui_updates.flush()
         self.terminal_output.clear()
 
     # Step 5: Implement additional features (some are left as user exercises)
     def test_api_key(self):
-        try:
-            client = OpenAI(api_key=self.api_key_input.text())
-            client.models.list()
-            self.print_output("API Key is valid!")
-        except Exception as e:
-            self.print_output(f"API Key is invalid! Error: {str(e)}")
+        api_key = self.api_key_input.text()
+        if not api_key:
+            self.print_output("API Key is required!")
+            return
+        cached = self.key_cache.get(key_fingerprint(api_key))
+        if cached is not None:
+            self.set_models(cached["models"])
+            minutes = (time.time() - cached["checked_at"]) / 60
+            self.print_output(f"API Key is valid! (checked {minutes:.0f} min ago, {len(cached['models'])} models)")
+            return
+        self.key_check_generation += 1
+        generation = self.pending_key_check = self.key_check_generation
+        task = KeyCheckTask(self.transport, api_key, generation, self.key_cache, self.key_check_deadline)
+        task.signals.finished.connect(self.key_check_finished)
+        QtCore.QThreadPool.globalInstance().start(task)
+        QtCore.QTimer.singleShot(int(self.key_check_deadline * 1000), lambda: self.key_check_timed_out(generation))
+        self.test_api_button.setEnabled(False)
+        self.print_output("Checking API key...")
+
+    def key_check_finished(self, generation, models, error):
+        if generation != self.pending_key_check:
+            return
+        self.pending_key_check = None
+        self.test_api_button.setEnabled(True)
+        if models is None:
+            self.print_output(error)
+            return
+        self.set_models(models)
+        self.print_output(f"API Key is valid! ({len(models)} models)")
+
+    def key_check_timed_out(self, generation):
+        if generation != self.pending_key_check:
+            return
+        self.pending_key_check = None
+        self.test_api_button.setEnabled(True)
+        self.print_output(f"API key check timed out after {self.key_check_deadline:.0f}s")
+
+    def load_cached_models(self):
+        api_key = self.api_key_input.text()
+        cached = self.key_cache.get(key_fingerprint(api_key)) if api_key else None
+        if cached is not None:
+            self.set_models(cached["models"])
+
+    def set_models(self, model_ids):
+        # The current choice is kept even if the list does not include it.
+        current = self.current_model()
+        models = chat_models(model_ids)
+        if current not in models:
+            models.insert(0, current)
+        self.model_picker.blockSignals(True)
+        self.model_picker.clear()
+        self.model_picker.addItems(models)
+        self.model_picker.setCurrentText(current)
+        self.model_picker.blockSignals(False)
+
+    def current_model(self):
+        return self.model_picker.currentText().strip() or MODEL
+
+    def open_search(self):
+        folders = [(self.prompts_folder, "prompt"), (self.outputs_folder, "output")]
+        if self.search_dialog is None:
+            self.search_dialog = SearchDialog(default_index_path(self.config_folder), folders, self)
+        elif self.search_dialog.folders != folders:
+            self.search_dialog.folders = folders
+            self.search_dialog.reindex()
+        self.search_dialog.show()
+        self.search_dialog.raise_()
+
+    def open_compare(self):
+        if self.compare_dialog is None:
+            self.compare_dialog = CompareDialog(self)
+        self.compare_dialog.show()
+        self.compare_dialog.raise_()
+
+    def open_viewer(self):
+        if self.output_viewer is None:
+            self.output_viewer = OutputViewer(self.outputs_folder, self)
+        else:
+            self.output_viewer.outputs_folder = self.outputs_folder
+            self.output_viewer.list_files()
+        self.output_viewer.show()
+        self.output_viewer.raise_()
+
+    def closeEvent(self, event):
+        # Settings are saved first, so they survive a failure while shutting
+        # down. Running jobs stop at their next chunk; blocking calls are
+        # given a few seconds before the stores they write to are closed.
+        self.save_settings()
+        self.job_queue.shutdown()
+        self.file_writer.close()
+        self.transport.close()
+        if self.run_store is not None:
+            self.run_store.close()
+        event.accept()
 
 
 if __name__ == "__main__":
     import sys
 
+    if "--startup-profile" in sys.argv:
+        sys.exit(profile_startup(os.path.abspath(__file__)))
+
     app = QtWidgets.QApplication(sys.argv)
     window = EnhancedPromptRunner()
+    if is_profile_child():
+        window.first_paint.painted.connect(lambda: report_first_paint(app, window.first_paint))
     window.show()
     sys.exit(app.exec())
\ No newline at end of file
@@ -0,0 +1,257 @@
+"""Per-request latency breakdown and metrics export.
+
+A ``RunMetrics`` follows one run from submission to completion. It records
+queue wait (submission to dispatch, including rate-limit waits and
+backoff), connection setup, time to first byte, time to first token, total
+duration, token counts and generation speed. Connection and first-byte
+timings come from httpcore's trace extension. ``trace_request`` (an httpx
+event hook installed by ``Transport``) attaches it to whichever run is
+current in the ``current_run`` context variable.
+
+``MetricsRegistry`` aggregates finished runs per model into Prometheus-style
+cumulative histograms and a rolling window of recent samples. It exports
+them as a Prometheus text-format file and as CSV.
+"""
+
+import contextvars
+import csv
+import io
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+
+current_run = contextvars.ContextVar("current_run", default=None)
+
+# Histogram bucket upper bounds, in seconds.
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+RATE_BUCKETS = (1, 5, 10, 20, 40, 60, 80, 100, 150, 200, 400)
+TOKEN_BUCKETS = (16, 64, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768, 131072)
+
+# metric name -> (help text, buckets)
+HISTOGRAMS = {
+    "queue_wait_seconds": ("Time from submission to dispatch, including rate-limit waits", LATENCY_BUCKETS),
+    "connect_seconds": ("TCP and TLS connection setup (zero when a pooled connection is reused)", LATENCY_BUCKETS),
+    "time_to_first_byte_seconds": ("Dispatch to response headers", LATENCY_BUCKETS),
+    "time_to_first_token_seconds": ("Dispatch to the first generated token", LATENCY_BUCKETS),
+    "duration_seconds": ("Submission to completion", LATENCY_BUCKETS),
+    "prompt_tokens": ("Prompt tokens per run", TOKEN_BUCKETS),
+    "completion_tokens": ("Completion tokens per run", TOKEN_BUCKETS),
+    "tokens_per_second": ("Completion tokens per second after the first token", RATE_BUCKETS),
+}
+
+ROLLING_WINDOW = 1000
+
+
+def default_metrics_dir(config_folder=""):
+    base = config_folder or os.path.join(os.path.expanduser("~"), ".enhanced_prompt_runner")
+    return os.path.join(base, "metrics")
+
+
+def metrics_file_path(output_file):
+    """Sidecar path for a run's latency breakdown, next to its saved output."""
+    return os.path.splitext(output_file)[0] + "_metrics.json"
+
+
+class RunMetrics:
+    def __init__(self, title="", model=""):
+        self.title = title
+        self.model = model
+        self.submitted = time.perf_counter()
+        self.dispatched = None
+        self.connect_started = None
+        self.connected = None
+        self.first_byte = None
+        self.first_token = None
+        self.finished = None
+        self.prompt_tokens = None
+        self.completion_tokens = None
+        self.source = "api"
+        self.hedged = False
+
+    def mark_dispatched(self):
+        # Called on every attempt, so retries and backoff count as queue wait.
+        self.dispatched = time.perf_counter()
+        self.connect_started = self.connected = self.first_byte = None
+
+    def mark_first_token(self):
+        if self.first_token is None:
+            self.first_token = time.perf_counter()
+
+    def finish(self, usage=None):
+        self.finished = time.perf_counter()
+        if usage:
+            self.prompt_tokens = usage.get("prompt_tokens")
+            self.completion_tokens = usage.get("completion_tokens")
+
+    def trace(self, event, info):
+        """httpcore trace callback."""
+        now = time.perf_counter()
+        if event == "connection.connect_tcp.started":
+            self.connect_started = now
+        elif event in ("connection.connect_tcp.complete", "connection.start_tls.complete"):
+            self.connected = now
+        elif event.endswith("receive_response_headers.complete") and self.first_byte is None:
+            self.first_byte = now
+
+    def _since(self, start, end):
+        if start is None or end is None:
+            return None
+        return max(0.0, end - start)
+
+    def as_dict(self):
+        first_token = self.first_token or self.finished
+        generating = self._since(first_token, self.finished)
+        tokens_per_second = None
+        if self.completion_tokens and generating:
+            tokens_per_second = self.completion_tokens / generating
+        return {
+            "source": self.source,
+            "hedged": self.hedged,
+            "queue_wait_seconds": self._since(self.submitted, self.dispatched),
+            "connect_seconds": self._since(self.connect_started, self.connected) or (0.0 if self.dispatched else None),
+            "time_to_first_byte_seconds": self._since(self.dispatched, self.first_byte),
+            "time_to_first_token_seconds": self._since(self.dispatched, first_token),
+            "duration_seconds": self._since(self.submitted, self.finished),
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "tokens_per_second": tokens_per_second,
+        }
+
+    def to_json(self):
+        return json.dumps(dict(self.as_dict(), title=self.title, model=self.model), indent=2, sort_keys=True)
+
+    def describe(self):
+        d = self.as_dict()
+
+        def ms(key):
+            return "-" if d[key] is None else f"{d[key] * 1000:.0f}ms"
+
+        text = (f"queue {ms('queue_wait_seconds')}, connect {ms('connect_seconds')}, "
+                f"ttfb {ms('time_to_first_byte_seconds')}, ttft {ms('time_to_first_token_seconds')}, "
+                f"total {ms('duration_seconds')}")
+        if d["prompt_tokens"] is not None:
+            text += f", tokens {d['prompt_tokens']} in / {d['completion_tokens']} out"
+        if d["tokens_per_second"]:
+            text += f" ({d['tokens_per_second']:.1f} tok/s)"
+        return text
+
+
+def trace_request(request):
+    """httpx request event hook: route httpcore trace events to the current run."""
+    run = current_run.get()
+    if run is not None:
+        request.extensions["trace"] = run.trace
+
+
+async def trace_request_async(request):
+    """The async client's hook; httpcore's async path only accepts a coroutine trace callback."""
+    run = current_run.get()
+    if run is not None:
+        async def trace(event, info):
+            run.trace(event, info)
+
+        request.extensions["trace"] = trace
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.recent = deque(maxlen=ROLLING_WINDOW)
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += value
+        self.count += 1
+        self.recent.append(value)
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(list(self.buckets) + ["+Inf"], self.counts):
+            total += count
+            yield bound, total
+
+    def percentile(self, pct):
+        values = sorted(self.recent)
+        if not values:
+            return None
+        return values[min(len(values) - 1, int(pct / 100 * len(values)))]
+
+
+class MetricsRegistry:
+    def __init__(self, namespace="prompt_runner"):
+        self.namespace = namespace
+        self._lock = threading.Lock()
+        self._histograms = defaultdict(lambda: {name: Histogram(buckets) for name, (_, buckets) in HISTOGRAMS.items()})
+        self._runs = defaultdict(int)
+
+    def observe(self, run):
+        values = run.as_dict()
+        with self._lock:
+            self._runs[(run.model, run.source)] += 1
+            histograms = self._histograms[run.model]
+            for name in HISTOGRAMS:
+                if values[name] is not None:
+                    histograms[name].observe(values[name])
+
+    def percentile(self, model, name, pct, min_samples=1):
+        """Percentile of the rolling window, or None with fewer than ``min_samples``."""
+        with self._lock:
+            histogram = self._histograms[model][name]
+            if len(histogram.recent) < min_samples:
+                return None
+            return histogram.percentile(pct)
+
+    def summary(self, model, name="duration_seconds"):
+        with self._lock:
+            histogram = self._histograms[model][name]
+            p50, p95 = histogram.percentile(50), histogram.percentile(95)
+        if p50 is None:
+            return f"{name}: no samples"
+        return f"{name} over last {len(histogram.recent)} runs: p50 {p50:.2f}s, p95 {p95:.2f}s"
+
+    def prometheus_text(self):
+        out = io.StringIO()
+        with self._lock:
+            name = f"{self.namespace}_runs_total"
+            out.write(f"# HELP {name} Completed runs.\n# TYPE {name} counter\n")
+            for (model, source), count in sorted(self._runs.items()):
+                out.write(f'{name}{{model="{model}",source="{source}"}} {count}\n')
+            for metric, (help_text, _) in HISTOGRAMS.items():
+                name = f"{self.namespace}_{metric}"
+                out.write(f"# HELP {name} {help_text}.\n# TYPE {name} histogram\n")
+                for model, histograms in sorted(self._histograms.items()):
+                    histogram = histograms[metric]
+                    for bound, total in histogram.cumulative():
+                        out.write(f'{name}_bucket{{model="{model}",le="{bound}"}} {total}\n')
+                    out.write(f'{name}_sum{{model="{model}"}} {histogram.sum}\n')
+                    out.write(f'{name}_count{{model="{model}"}} {histogram.count}\n')
+        return out.getvalue()
+
+    def csv_text(self):
+        out = io.StringIO()
+        writer = csv.writer(out)
+        writer.writerow(["metric", "model", "le", "cumulative_count", "sum", "count", "p50", "p95", "p99"])
+        with self._lock:
+            for model, histograms in sorted(self._histograms.items()):
+                for metric, histogram in histograms.items():
+                    percentiles = [histogram.percentile(p) for p in (50, 95, 99)]
+                    for bound, total in histogram.cumulative():
+                        writer.writerow([metric, model, bound, total, histogram.sum, histogram.count, *percentiles])
+        return out.getvalue()
+
+    def export_files(self, directory):
+        """``(path, text)`` pairs for the Prometheus and CSV exports, ready for ``FileWriter``."""
+        return [
+            (os.path.join(directory, f"{self.namespace}.prom"), self.prometheus_text()),
+            (os.path.join(directory, f"{self.namespace}.csv"), self.csv_text()),
+        ]
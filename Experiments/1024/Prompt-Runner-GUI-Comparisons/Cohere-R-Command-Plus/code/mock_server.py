@@ -0,0 +1,538 @@
+"""Local OpenAI-compatible stand-in server for benchmarking the runners.
+
+Implements ``GET /v1/models``, ``POST /v1/chat/completions`` and
+``POST /v1/completions`` (both with SSE streaming). Latency, generation
+speed, error injection and rate limits are configurable, and every
+response carries ``x-ratelimit-*`` headers like the real API.
+
+The Batch API is covered too: ``POST /v1/files`` (multipart upload),
+``GET /v1/files/{id}`` and ``GET /v1/files/{id}/content``, and
+``POST /v1/batches``, ``GET /v1/batches/{id}`` and
+``POST /v1/batches/{id}/cancel``. A batch completes ``--batch-delay``
+seconds after it is created. Its output and error files have the same
+line format as the real service, and ``--error-500-rate`` fails individual
+requests inside it. Only the standard library is used.
+
+Point a runner at it with ``OPENAI_BASE_URL=http://127.0.0.1:8000/v1``.
+
+Usage:
+    python mock_server.py [--port 8000] [--latency-ms 300] [--tps 50]
+                          [--error-429-rate 0.02] [--rpm 500] [--tpm 200000]
+"""
+
+import argparse
+import email.parser
+import email.policy
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+MODELS = ("gpt-3.5-turbo", "gpt-3.5-turbo-instruct", "gpt-4o", "gpt-4o-mini")
+WORDS = ("the", "prompt", "runner", "returns", "a", "mock", "completion", "token", "with", "latency")
+FILE_PATH = re.compile(r"^/v1/files/(?P<id>[\w-]+)(?P<content>/content)?$")
+BATCH_PATH = re.compile(r"^/v1/batches/(?P<id>[\w-]+)(?P<cancel>/cancel)?$")
+BATCH_ENDPOINTS = ("/v1/chat/completions", "/v1/completions")
+
+
+class MockConfig:
+    def __init__(self, latency_ms=300.0, latency_dist="lognormal", latency_sigma=0.5,
+                 tokens_per_second=50.0, completion_tokens=128, error_429_rate=0.0,
+                 error_500_rate=0.0, rpm=500, tpm=200_000, batch_delay=2.0, seed=None):
+        self.latency_ms = latency_ms
+        self.latency_dist = latency_dist
+        self.latency_sigma = latency_sigma
+        self.tokens_per_second = tokens_per_second
+        self.completion_tokens = completion_tokens
+        self.error_429_rate = error_429_rate
+        self.error_500_rate = error_500_rate
+        self.rpm = rpm
+        self.tpm = tpm
+        self.batch_delay = batch_delay
+        self.random = random.Random(seed)
+        self._random_lock = threading.Lock()
+
+    def uniform(self):
+        with self._random_lock:
+            return self.random.random()
+
+    def latency(self):
+        """Seconds before the first byte, drawn from the configured distribution."""
+        mean = self.latency_ms / 1000
+        with self._random_lock:
+            if self.latency_dist == "fixed":
+                return mean
+            if self.latency_dist == "uniform":
+                return self.random.uniform(0, 2 * mean)
+            if self.latency_dist == "exponential":
+                return self.random.expovariate(1 / mean) if mean > 0 else 0.0
+            # lognormal with the requested mean
+            mu = -0.5 * self.latency_sigma ** 2
+            return mean * self.random.lognormvariate(mu, self.latency_sigma)
+
+
+class MinuteWindow:
+    """Requests and tokens used in the current one-minute window."""
+
+    def __init__(self, config):
+        self.config = config
+        self._lock = threading.Lock()
+        self.started = time.monotonic()
+        self.requests = 0
+        self.tokens = 0
+
+    def admit(self, tokens):
+        """Charge one request; return (allowed, headers)."""
+        with self._lock:
+            now = time.monotonic()
+            if now - self.started >= 60:
+                self.started, self.requests, self.tokens = now, 0, 0
+            allowed = self.requests < self.config.rpm and self.tokens + tokens <= self.config.tpm
+            if allowed:
+                self.requests += 1
+                self.tokens += tokens
+            reset = max(0.0, 60 - (now - self.started))
+            headers = {
+                "x-ratelimit-limit-requests": str(self.config.rpm),
+                "x-ratelimit-remaining-requests": str(max(0, self.config.rpm - self.requests)),
+                "x-ratelimit-reset-requests": f"{reset:.3f}s",
+                "x-ratelimit-limit-tokens": str(self.config.tpm),
+                "x-ratelimit-remaining-tokens": str(max(0, self.config.tpm - self.tokens)),
+                "x-ratelimit-reset-tokens": f"{reset:.3f}s",
+            }
+            return allowed, headers
+
+
+def count_words(text):
+    return len(text.split())
+
+
+def prompt_tokens_of(body):
+    if "messages" in body:
+        return sum(count_words(m.get("content") or "") + 4 for m in body["messages"]) + 3
+    prompt = body.get("prompt", "")
+    return count_words(prompt if isinstance(prompt, str) else " ".join(prompt))
+
+
+def completion_words(n):
+    return [WORDS[i % len(WORDS)] for i in range(n)]
+
+
+def completion_tokens_of(config, body):
+    requested = body.get("max_tokens") or body.get("max_completion_tokens") or config.completion_tokens
+    return min(requested, config.completion_tokens)
+
+
+def completion_payload(model, text, usage, chat, response_id, created):
+    """A complete (non-streaming) chat or text completion response body."""
+    if chat:
+        choice = {"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "length"}
+    else:
+        choice = {"index": 0, "text": text, "logprobs": None, "finish_reason": "length"}
+    return {
+        "id": response_id, "object": "chat.completion" if chat else "text_completion",
+        "created": created, "model": model, "choices": [choice], "usage": usage,
+    }
+
+
+def parse_multipart(content_type, raw):
+    """Return ``{field: (filename, bytes)}`` for a multipart/form-data body."""
+    message = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(
+        b"Content-Type: " + content_type.encode("latin-1") + b"\r\n\r\n" + raw
+    )
+    if not message.is_multipart():
+        raise ValueError("Expected a multipart/form-data body")
+    fields = {}
+    for part in message.iter_parts():
+        name = part.get_param("name", header="content-disposition")
+        fields[name] = (part.get_filename(), part.get_payload(decode=True) or b"")
+    return fields
+
+
+class BatchStore:
+    """Uploaded files and batch jobs, kept in memory for the life of the server."""
+
+    def __init__(self, config):
+        self.config = config
+        self._lock = threading.Lock()
+        self.files = {}
+        self.contents = {}
+        self.batches = {}
+
+    def add_file(self, filename, purpose, data):
+        file_id = f"file-{uuid.uuid4().hex[:24]}"
+        meta = {
+            "id": file_id, "object": "file", "bytes": len(data), "created_at": int(time.time()),
+            "filename": filename, "purpose": purpose, "status": "processed",
+        }
+        with self._lock:
+            self.files[file_id] = meta
+            self.contents[file_id] = data
+        return meta
+
+    def file(self, file_id):
+        with self._lock:
+            return self.files.get(file_id), self.contents.get(file_id)
+
+    def create_batch(self, input_file_id, endpoint, completion_window, metadata):
+        now = int(time.time())
+        batch = {
+            "id": f"batch_{uuid.uuid4().hex[:24]}", "object": "batch", "endpoint": endpoint,
+            "errors": None, "input_file_id": input_file_id, "completion_window": completion_window,
+            "status": "validating", "output_file_id": None, "error_file_id": None, "created_at": now,
+            "in_progress_at": None, "expires_at": now + 24 * 3600, "completed_at": None,
+            "finalizing_at": None, "cancelling_at": None, "cancelled_at": None, "failed_at": None,
+            "request_counts": {"total": 0, "completed": 0, "failed": 0}, "metadata": metadata,
+        }
+        with self._lock:
+            self.batches[batch["id"]] = batch
+        threading.Thread(target=self._process, args=(batch["id"],), name="mock-batch", daemon=True).start()
+        return dict(batch)
+
+    def batch(self, batch_id):
+        with self._lock:
+            batch = self.batches.get(batch_id)
+            return None if batch is None else dict(batch)
+
+    def cancel_batch(self, batch_id):
+        with self._lock:
+            batch = self.batches.get(batch_id)
+            if batch is not None and batch["status"] in ("validating", "in_progress"):
+                batch["status"] = "cancelling"
+                batch["cancelling_at"] = int(time.time())
+            return None if batch is None else dict(batch)
+
+    def _update(self, batch_id, **fields):
+        with self._lock:
+            batch = self.batches[batch_id]
+            if batch["status"] == "cancelling" and fields.get("status") != "cancelled":
+                return False
+            batch.update(fields)
+            return True
+
+    def _process(self, batch_id):
+        config = self.config
+        batch = self.batch(batch_id)
+        _, data = self.file(batch["input_file_id"])
+        started = time.monotonic()
+        if not self._update(batch_id, status="in_progress", in_progress_at=int(time.time())):
+            self._update(batch_id, status="cancelled", cancelled_at=int(time.time()))
+            return
+        outputs, errors = [], []
+        lines = [line for line in data.decode("utf-8").splitlines() if line.strip()]
+        for number, line in enumerate(lines, 1):
+            result = {"id": f"batch_req_{uuid.uuid4().hex[:24]}", "custom_id": None, "response": None, "error": None}
+            try:
+                request = json.loads(line)
+                result["custom_id"] = request["custom_id"]
+                body = request["body"]
+                if request.get("url") != batch["endpoint"]:
+                    raise ValueError(f"url must be {batch['endpoint']}")
+            except (ValueError, KeyError, TypeError) as e:
+                result["error"] = {"code": "invalid_request", "message": f"line {number}: {e}"}
+                errors.append(result)
+                continue
+            if config.uniform() < config.error_500_rate:
+                result["response"] = {
+                    "status_code": 500, "request_id": uuid.uuid4().hex,
+                    "body": {"error": {"message": "Injected server error (mock)", "type": "server_error"}},
+                }
+                errors.append(result)
+                continue
+            chat = batch["endpoint"] == "/v1/chat/completions"
+            prompt_tokens = prompt_tokens_of(body)
+            completion_tokens = completion_tokens_of(config, body)
+            usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                     "total_tokens": prompt_tokens + completion_tokens}
+            response_id = f"{'chatcmpl' if chat else 'cmpl'}-{uuid.uuid4().hex[:24]}"
+            result["response"] = {
+                "status_code": 200, "request_id": uuid.uuid4().hex,
+                "body": completion_payload(body.get("model", MODELS[0]), " ".join(completion_words(completion_tokens)),
+                                           usage, chat, response_id, int(time.time())),
+            }
+            outputs.append(result)
+        time.sleep(max(0.0, config.batch_delay - (time.monotonic() - started)))
+
+        def jsonl(records):
+            return "".join(json.dumps(record) + "\n" for record in records).encode("utf-8")
+
+        output_file = self.add_file(f"{batch_id}_output.jsonl", "batch_output", jsonl(outputs)) if outputs else None
+        error_file = self.add_file(f"{batch_id}_error.jsonl", "batch_output", jsonl(errors)) if errors else None
+        now = int(time.time())
+        finished = self._update(
+            batch_id, status="completed", completed_at=now, finalizing_at=now,
+            output_file_id=output_file and output_file["id"], error_file_id=error_file and error_file["id"],
+            request_counts={"total": len(lines), "completed": len(outputs), "failed": len(errors)},
+        )
+        if not finished:
+            self._update(batch_id, status="cancelled", cancelled_at=now)
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "MockOpenAI/1.0"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    # -- plumbing ---------------------------------------------------------
+
+    def _send_json(self, status, payload, headers=None):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_error(self, status, message, error_type, headers=None):
+        self._send_json(status, {"error": {"message": message, "type": error_type, "code": None}}, headers)
+
+    def _write_chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def _send_bytes(self, status, data, content_type="application/octet-stream"):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_raw(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b"{}"
+        return json.loads(raw or b"{}")
+
+    # -- routes -----------------------------------------------------------
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/v1/models":
+            created = int(time.time())
+            models = [{"id": m, "object": "model", "created": created, "owned_by": "mock"} for m in MODELS]
+            self._send_json(200, {"object": "list", "data": models})
+            return
+        path = self.path.rstrip("/")
+        match = FILE_PATH.match(path)
+        if match:
+            meta, data = self.server.batches.file(match.group("id"))
+            if meta is None:
+                self._send_error(404, f"No such file: {match.group('id')}", "invalid_request_error")
+            elif match.group("content"):
+                self._send_bytes(200, data)
+            else:
+                self._send_json(200, meta)
+            return
+        match = BATCH_PATH.match(path)
+        if match and not match.group("cancel"):
+            batch = self.server.batches.batch(match.group("id"))
+            if batch is None:
+                self._send_error(404, f"No such batch: {match.group('id')}", "invalid_request_error")
+            else:
+                self._send_json(200, batch)
+            return
+        self._send_error(404, f"Unknown path {self.path}", "invalid_request_error")
+
+    def do_POST(self):
+        path = self.path.rstrip("/")
+        if path == "/v1/files":
+            self.upload_file()
+            return
+        match = BATCH_PATH.match(path)
+        if match and match.group("cancel"):
+            self._read_raw()
+            batch = self.server.batches.cancel_batch(match.group("id"))
+            if batch is None:
+                self._send_error(404, f"No such batch: {match.group('id')}", "invalid_request_error")
+            else:
+                self._send_json(200, batch)
+            return
+        handler = self.server.routes.get(path)
+        if handler is None:
+            self._send_error(404, f"Unknown path {self.path}", "invalid_request_error")
+            return
+        try:
+            body = self._read_body()
+        except ValueError:
+            self._send_error(400, "Request body is not valid JSON", "invalid_request_error")
+            return
+        handler(self, body)
+
+    def handle_completion(self, body, chat):
+        config = self.server.config
+        prompt_tokens = prompt_tokens_of(body)
+        completion_tokens = completion_tokens_of(config, body)
+
+        allowed, headers = self.server.window.admit(prompt_tokens + completion_tokens)
+        if not allowed or config.uniform() < config.error_429_rate:
+            headers["retry-after"] = "1"
+            self._send_error(429, "Rate limit reached (mock)", "rate_limit_error", headers)
+            return
+        if config.uniform() < config.error_500_rate:
+            self._send_error(500, "Injected server error (mock)", "server_error", headers)
+            return
+
+        time.sleep(config.latency())
+        model = body.get("model", MODELS[0])
+        words = completion_words(completion_tokens)
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+        response_id = f"{'chatcmpl' if chat else 'cmpl'}-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+        per_token = 1 / config.tokens_per_second if config.tokens_per_second > 0 else 0.0
+
+        if not body.get("stream"):
+            time.sleep(per_token * completion_tokens)
+            self._send_json(200, completion_payload(model, " ".join(words), usage, chat, response_id, created), headers)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Transfer-Encoding", "chunked")
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+
+        def event(choices, extra=None):
+            payload = {
+                "id": response_id, "object": "chat.completion.chunk" if chat else "text_completion",
+                "created": created, "model": model, "choices": choices,
+            }
+            if extra:
+                payload.update(extra)
+            self._write_chunk(f"data: {json.dumps(payload)}\n\n".encode("utf-8"))
+
+        try:
+            for i, word in enumerate(words):
+                piece = word if i == 0 else " " + word
+                if chat:
+                    delta = {"content": piece} if i else {"role": "assistant", "content": piece}
+                    event([{"index": 0, "delta": delta, "finish_reason": None}])
+                else:
+                    event([{"index": 0, "text": piece, "logprobs": None, "finish_reason": None}])
+                time.sleep(per_token)
+            if chat:
+                event([{"index": 0, "delta": {}, "finish_reason": "length"}])
+            if (body.get("stream_options") or {}).get("include_usage"):
+                event([], {"usage": usage})
+            self._write_chunk(b"data: [DONE]\n\n")
+            self._write_chunk(b"")
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+
+    def chat_completions(self, body):
+        self.handle_completion(body, chat=True)
+
+    def completions(self, body):
+        self.handle_completion(body, chat=False)
+
+    def upload_file(self):
+        try:
+            fields = parse_multipart(self.headers.get("Content-Type", ""), self._read_raw())
+            filename, data = fields["file"]
+            purpose = fields.get("purpose", (None, b""))[1].decode("utf-8")
+        except (ValueError, KeyError) as e:
+            self._send_error(400, f"Invalid file upload: {e}", "invalid_request_error")
+            return
+        self._send_json(200, self.server.batches.add_file(filename or "upload.jsonl", purpose, data))
+
+    def create_batch(self, body):
+        meta, _ = self.server.batches.file(body.get("input_file_id", ""))
+        if meta is None:
+            self._send_error(400, f"No such file: {body.get('input_file_id')}", "invalid_request_error")
+            return
+        if body.get("endpoint") not in BATCH_ENDPOINTS:
+            self._send_error(400, f"Unsupported endpoint: {body.get('endpoint')}", "invalid_request_error")
+            return
+        batch = self.server.batches.create_batch(
+            meta["id"], body["endpoint"], body.get("completion_window", "24h"), body.get("metadata")
+        )
+        self._send_json(200, batch)
+
+
+class MockServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, config, verbose=False):
+        super().__init__(address, MockHandler)
+        self.config = config
+        self.window = MinuteWindow(config)
+        self.batches = BatchStore(config)
+        self.verbose = verbose
+        self.routes = {
+            "/v1/chat/completions": MockHandler.chat_completions,
+            "/v1/completions": MockHandler.completions,
+            "/v1/batches": MockHandler.create_batch,
+        }
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+
+def start_in_thread(config=None, host="127.0.0.1", port=0):
+    """Start a server on a background thread; returns it (call ``shutdown()`` to stop)."""
+    server = MockServer((host, port), config or MockConfig())
+    threading.Thread(target=server.serve_forever, name="mock-server", daemon=True).start()
+    return server
+
+
+def add_config_arguments(parser):
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="Mean time to first byte")
+    parser.add_argument("--latency-dist", choices=("fixed", "uniform", "exponential", "lognormal"),
+                        default="lognormal")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="Spread of the lognormal distribution")
+    parser.add_argument("--tps", type=float, default=50.0, help="Generated tokens per second")
+    parser.add_argument("--completion-tokens", type=int, default=128, help="Tokens generated per response")
+    parser.add_argument("--error-429-rate", type=float, default=0.0, help="Fraction of requests rejected with 429")
+    parser.add_argument("--error-500-rate", type=float, default=0.0, help="Fraction of requests failed with 500")
+    parser.add_argument("--rpm", type=int, default=500, help="Requests-per-minute limit")
+    parser.add_argument("--tpm", type=int, default=200_000, help="Tokens-per-minute limit")
+    parser.add_argument("--batch-delay", type=float, default=2.0, help="Seconds until a batch job completes")
+    parser.add_argument("--seed", type=int, default=None)
+
+
+def config_from_args(args):
+    return MockConfig(
+        latency_ms=args.latency_ms, latency_dist=args.latency_dist, latency_sigma=args.latency_sigma,
+        tokens_per_second=args.tps, completion_tokens=args.completion_tokens,
+        error_429_rate=args.error_429_rate, error_500_rate=args.error_500_rate,
+        rpm=args.rpm, tpm=args.tpm, batch_delay=args.batch_delay, seed=args.seed,
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible mock server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--verbose", action="store_true", help="Log every request")
+    add_config_arguments(parser)
+    args = parser.parse_args(argv)
+
+    server = MockServer((args.host, args.port), config_from_args(args), verbose=args.verbose)
+    print(f"Mock API listening on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
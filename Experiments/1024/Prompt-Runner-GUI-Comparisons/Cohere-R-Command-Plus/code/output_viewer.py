@@ -0,0 +1,245 @@
+"""Viewer for saved outputs that never loads a whole file into memory.
+
+``LineIndex`` maps a file with ``mmap`` and records the byte offset of every
+line start in an ``array``. The offsets are built on a pool thread, a block
+at a time, so the first screenful shows while the rest of a multi-megabyte
+file is still being scanned. ``OutputModel`` exposes the indexed lines to a
+``QListView`` with uniform item sizes. The view only asks for the visible
+rows, and each row is decoded from the mapping when it is painted.
+"""
+
+import mmap
+import os
+import re
+import threading
+from array import array
+
+from PyQt6 import QtCore, QtGui, QtWidgets
+
+INDEX_BLOCK_BYTES = 4 * 1024 * 1024
+MAX_LINE_CHARS = 4096
+NEWLINE = re.compile(rb"\n")
+OUTPUT_SUFFIXES = (".txt", ".md", ".log")
+
+
+class LineIndex:
+    def __init__(self, path):
+        self.path = path
+        self.size = os.path.getsize(path)
+        self._file = open(path, "rb")
+        # An empty file cannot be mapped; it simply has no lines.
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else None
+        self.offsets = array("q", [0])
+        self.scanned = 0
+        self.complete = self.size == 0
+        self.cancelled = threading.Event()
+
+    def line_count(self):
+        count = len(self.offsets)
+        if self.size == 0 or (self.complete and self.offsets[-1] == self.size):
+            count -= 1  # nothing follows the final newline
+        elif not self.complete:
+            count -= 1  # the last line may not be complete yet
+        return count
+
+    def build(self, on_progress=None):
+        """Scan for line starts; call ``on_progress(lines)`` after each block."""
+        while self.scanned < self.size and not self.cancelled.is_set():
+            end = min(self.scanned + INDEX_BLOCK_BYTES, self.size)
+            block = self._map[self.scanned:end]
+            base = self.scanned + 1
+            self.offsets.extend(base + match.start() for match in NEWLINE.finditer(block))
+            self.scanned = end
+            if self.scanned == self.size:
+                self.complete = True
+            if on_progress is not None:
+                on_progress(self.line_count())
+        return self.complete
+
+    def line(self, number):
+        start = self.offsets[number]
+        end = self.offsets[number + 1] - 1 if number + 1 < len(self.offsets) else self.size
+        end = min(end, start + MAX_LINE_CHARS * 4)
+        return self._map[start:end].decode("utf-8", errors="replace").rstrip("\r")[:MAX_LINE_CHARS]
+
+    def close(self):
+        self.cancelled.set()
+        if self._map is not None:
+            self._map.close()
+        self._file.close()
+
+
+class IndexSignals(QtCore.QObject):
+    progress = QtCore.pyqtSignal(object, int)
+    finished = QtCore.pyqtSignal(object, bool)
+    failed = QtCore.pyqtSignal(object, str)
+
+
+class IndexTask(QtCore.QRunnable):
+    def __init__(self, index):
+        super().__init__()
+        self.index = index
+        self.signals = IndexSignals()
+
+    def run(self):
+        try:
+            complete = self.index.build(lambda lines: self.signals.progress.emit(self.index, lines))
+        except (OSError, ValueError) as e:
+            self.signals.failed.emit(self.index, str(e))
+            return
+        self.signals.finished.emit(self.index, complete)
+
+
+class OutputModel(QtCore.QAbstractListModel):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.index_ = None
+        self._rows = 0
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else self._rows
+
+    def data(self, index, role=QtCore.Qt.ItemDataRole.DisplayRole):
+        if role == QtCore.Qt.ItemDataRole.DisplayRole and index.isValid():
+            return self.index_.line(index.row())
+        return None
+
+    def set_index(self, line_index):
+        self.beginResetModel()
+        self.index_ = line_index
+        self._rows = 0
+        self.endResetModel()
+
+    def grow(self, rows):
+        # Rows only ever appear at the end as indexing advances.
+        if rows > self._rows:
+            self.beginInsertRows(QtCore.QModelIndex(), self._rows, rows - 1)
+            self._rows = rows
+            self.endInsertRows()
+
+
+class OutputViewer(QtWidgets.QDialog):
+    def __init__(self, outputs_folder, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Output Viewer")
+        self.resize(1000, 650)
+        self.outputs_folder = outputs_folder
+        self.line_index = None
+
+        self.files = QtWidgets.QListWidget()
+        self.files.setMaximumWidth(300)
+        self.open_button = QtWidgets.QPushButton("Open File...")
+        self.open_button.setToolTip("View any file, e.g. a concatenated history")
+        self.reload_button = QtWidgets.QPushButton("Reload")
+        self.reload_button.setToolTip("Re-read the file list and the open file")
+        self.model = OutputModel(self)
+        self.view = QtWidgets.QListView()
+        self.view.setModel(self.model)
+        self.view.setUniformItemSizes(True)
+        self.view.setWordWrap(False)
+        self.view.setEditTriggers(QtWidgets.QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.view.setSelectionMode(QtWidgets.QAbstractItemView.SelectionMode.ExtendedSelection)
+        self.view.setFont(QtGui.QFont("Monospace"))
+        self.status = QtWidgets.QLabel("")
+
+        buttons = QtWidgets.QHBoxLayout()
+        buttons.addWidget(self.open_button)
+        buttons.addWidget(self.reload_button)
+        left = QtWidgets.QVBoxLayout()
+        left.addWidget(self.files)
+        left.addLayout(buttons)
+        body = QtWidgets.QHBoxLayout()
+        body.addLayout(left)
+        body.addWidget(self.view, 1)
+        layout = QtWidgets.QVBoxLayout(self)
+        layout.addLayout(body)
+        layout.addWidget(self.status)
+
+        self.files.currentItemChanged.connect(self.file_selected)
+        self.open_button.clicked.connect(self.browse)
+        self.reload_button.clicked.connect(self.reload)
+        self.list_files()
+
+    def list_files(self):
+        self.files.clear()
+        if not self.outputs_folder or not os.path.isdir(self.outputs_folder):
+            self.status.setText("Outputs folder not set")
+            return
+        entries = []
+        with os.scandir(self.outputs_folder) as it:
+            for entry in it:
+                if entry.is_file() and entry.name.endswith(OUTPUT_SUFFIXES):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, entry.name, entry.path, stat.st_size))
+        for _, name, path, size in sorted(entries, reverse=True):
+            item = QtWidgets.QListWidgetItem(f"{name} ({size / 1024:.0f} KB)")
+            item.setData(QtCore.Qt.ItemDataRole.UserRole, path)
+            self.files.addItem(item)
+
+    def file_selected(self, item, _previous=None):
+        if item is not None:
+            self.open_path(item.data(QtCore.Qt.ItemDataRole.UserRole))
+
+    def browse(self):
+        path, _ = QtWidgets.QFileDialog.getOpenFileName(self, "Open Output", self.outputs_folder)
+        if path:
+            self.open_path(path)
+
+    def reload(self):
+        path = self.line_index.path if self.line_index is not None else None
+        self.list_files()
+        if path is not None:
+            self.open_path(path)
+
+    def open_path(self, path):
+        self.close_index()
+        try:
+            self.line_index = LineIndex(path)
+        except (OSError, ValueError) as e:
+            self.status.setText(f"Cannot open {path}: {e}")
+            return
+        self.model.set_index(self.line_index)
+        self.status.setText(f"Indexing {os.path.basename(path)}...")
+        task = IndexTask(self.line_index)
+        task.signals.progress.connect(self.index_progress)
+        task.signals.finished.connect(self.index_finished)
+        task.signals.failed.connect(self.index_failed)
+        QtCore.QThreadPool.globalInstance().start(task)
+        if self.line_index.complete:
+            self.index_finished(self.line_index, True)
+
+    def index_progress(self, line_index, lines):
+        # Progress from an index that has since been replaced is dropped.
+        if line_index is self.line_index:
+            self.model.grow(lines)
+            self.status.setText(f"{lines:,} lines indexed, {line_index.scanned / line_index.size:.0%} scanned")
+
+    def index_finished(self, line_index, complete):
+        if line_index is not self.line_index:
+            line_index.close()
+            return
+        if not complete:
+            return
+        lines = line_index.line_count()
+        self.model.grow(lines)
+        self.status.setText(f"{os.path.basename(line_index.path)}: {lines:,} lines, {line_index.size / 1024:.0f} KB")
+
+    def index_failed(self, line_index, message):
+        if line_index is not self.line_index:
+            line_index.close()
+            return
+        self.status.setText(f"Indexing failed: {message}")
+
+    def close_index(self):
+        self.model.set_index(None)
+        if self.line_index is not None:
+            # A task still scanning stops at the next block, and the mapping
+            # is closed when its finished signal arrives.
+            self.line_index.cancelled.set()
+            if self.line_index.complete:
+                self.line_index.close()
+            self.line_index = None
+
+    def closeEvent(self, event):
+        self.close_index()
+        super().closeEvent(event)
@@ -0,0 +1,221 @@
+"""Client-side rate limiting for chat completion requests.
+
+``RateLimiter`` paces dispatch with two token buckets, one for requests per
+minute and one for estimated tokens per minute. The buckets are re-synced
+from the provider's ``x-ratelimit-*`` response headers after every call, and
+rate-limited or transient failures are retried with jittered exponential
+backoff instead of being dropped.
+
+The OpenAI SDK is imported on the first call rather than at import time.
+"""
+
+import asyncio
+import random
+import re
+import threading
+import time
+
+from metrics import current_run
+
+DEFAULT_RPM = 500
+DEFAULT_TPM = 200_000
+DEFAULT_MAX_RETRIES = 6
+BASE_BACKOFF = 1.0
+MAX_BACKOFF = 60.0
+
+RETRYABLE_STATUS = {408, 409, 429}
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def parse_duration(value):
+    """Parse reset durations like ``"1s"``, ``"6m0s"`` or ``"20ms"`` into seconds."""
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+
+
+def is_retryable(error):
+    import openai
+
+    if isinstance(error, openai.APIConnectionError):
+        return True
+    status = getattr(error, "status_code", None)
+    return status is not None and (status in RETRYABLE_STATUS or status >= 500)
+
+
+class TokenBucket:
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount, now):
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate
+
+    def take(self, amount):
+        self.level -= min(amount, self.capacity)
+
+    def sync(self, limit, remaining):
+        if limit:
+            self.capacity = float(limit)
+            self.rate = self.capacity / 60.0
+        if remaining is not None:
+            self.level = min(self.level, float(remaining))
+
+
+class RateLimiter:
+    def __init__(self, requests_per_minute=DEFAULT_RPM, tokens_per_minute=DEFAULT_TPM,
+                 max_retries=DEFAULT_MAX_RETRIES):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_retries = max_retries
+        self.paused_until = 0.0
+        self.rate_limited = 0
+        self._lock = threading.Lock()
+
+    def _reserve(self, tokens):
+        """Take budget for one request, or return how long to wait for it."""
+        with self._lock:
+            now = time.monotonic()
+            wait = max(self.paused_until - now, 0.0)
+            if not wait:
+                wait = max(self.requests.wait_time(1, now), self.tokens.wait_time(tokens, now))
+            if not wait:
+                self.requests.take(1)
+                self.tokens.take(tokens)
+            return wait
+
+    def acquire(self, tokens):
+        while True:
+            wait = self._reserve(tokens)
+            if not wait:
+                return
+            time.sleep(wait)
+
+    async def acquire_async(self, tokens):
+        while True:
+            wait = self._reserve(tokens)
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+
+    def update_from_headers(self, headers):
+        def read(name, convert=float):
+            value = headers.get(name)
+            try:
+                return convert(value) if value is not None else None
+            except ValueError:
+                return None
+
+        with self._lock:
+            self.requests.sync(read("x-ratelimit-limit-requests"), read("x-ratelimit-remaining-requests"))
+            self.tokens.sync(read("x-ratelimit-limit-tokens"), read("x-ratelimit-remaining-tokens"))
+            if read("x-ratelimit-remaining-requests") == 0:
+                reset = parse_duration(headers.get("x-ratelimit-reset-requests"))
+                if reset:
+                    self.paused_until = max(self.paused_until, time.monotonic() + reset)
+
+    def reconcile(self, estimated, actual):
+        """Return over-estimated budget (or charge the shortfall) once usage is known."""
+        with self._lock:
+            self.tokens.level = min(self.tokens.capacity, self.tokens.level + estimated - actual)
+
+    def backoff(self, error, attempt):
+        """Delay before retrying ``error``; a 429 also pauses every other caller."""
+        headers = getattr(getattr(error, "response", None), "headers", None) or {}
+        delay = parse_duration(headers.get("retry-after"))
+        if delay is None:
+            delay = parse_duration(headers.get("x-ratelimit-reset-requests")) or None
+        if delay is None:
+            # Full jitter: uniform over the exponential window.
+            delay = random.uniform(0, min(MAX_BACKOFF, BASE_BACKOFF * 2 ** attempt))
+        else:
+            delay += random.uniform(0, BASE_BACKOFF)
+        if getattr(error, "status_code", None) == 429:
+            with self._lock:
+                self.rate_limited += 1
+                self.paused_until = max(self.paused_until, time.monotonic() + delay)
+                self.tokens.level = min(self.tokens.level, 0.0)
+        return delay
+
+
+def _usage_tokens(parsed):
+    usage = getattr(parsed, "usage", None)
+    return getattr(usage, "total_tokens", None)
+
+
+def _mark_dispatched():
+    run = current_run.get()
+    if run is not None:
+        run.mark_dispatched()
+
+
+def call_with_rate_limit(limiter, create, estimated_tokens, log=None):
+    """Call ``create()`` (returning a raw OpenAI response) under ``limiter``.
+
+    Retries rate-limited and transient failures with backoff and returns the
+    parsed response.
+    """
+    import openai
+
+    for attempt in range(limiter.max_retries + 1):
+        limiter.acquire(estimated_tokens)
+        _mark_dispatched()
+        try:
+            raw = create()
+        except openai.APIError as e:
+            if attempt == limiter.max_retries or not is_retryable(e):
+                raise
+            delay = limiter.backoff(e, attempt)
+            if log:
+                log(f"Request failed ({e.__class__.__name__}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+            continue
+        limiter.update_from_headers(raw.headers)
+        parsed = raw.parse()
+        actual = _usage_tokens(parsed)
+        if actual is not None:
+            limiter.reconcile(estimated_tokens, actual)
+        return parsed
+
+
+async def call_with_rate_limit_async(limiter, create, estimated_tokens, log=None):
+    import openai
+
+    for attempt in range(limiter.max_retries + 1):
+        await limiter.acquire_async(estimated_tokens)
+        _mark_dispatched()
+        try:
+            raw = await create()
+        except openai.APIError as e:
+            if attempt == limiter.max_retries or not is_retryable(e):
+                raise
+            delay = limiter.backoff(e, attempt)
+            if log:
+                log(f"Request failed ({e.__class__.__name__}), retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+            continue
+        limiter.update_from_headers(raw.headers)
+        parsed = raw.parse()
+        actual = _usage_tokens(parsed)
+        if actual is not None:
+            limiter.reconcile(estimated_tokens, actual)
+        return parsed
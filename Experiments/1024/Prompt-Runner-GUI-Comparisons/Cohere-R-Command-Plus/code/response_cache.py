@@ -0,0 +1,136 @@
+"""Content-addressed on-disk cache of chat completion responses.
+
+Each entry is stored as ``<key>.json`` where the key is a SHA-256 of the
+model, messages and request parameters. Callers pass the same ``params``
+dict they send with the request (temperature, max_tokens, ...; see
+``request_params``), so changing any parameter misses the cache rather than
+returning an answer generated under other settings. The total size of the cache is kept
+under ``max_bytes`` by evicting the least recently used entries; recency is
+tracked in memory and persisted through the entry files' mtimes.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+def default_cache_dir(config_folder=""):
+    base = config_folder or os.path.join(os.path.expanduser("~"), ".enhanced_prompt_runner")
+    return os.path.join(base, "response_cache")
+
+
+def request_params(**params):
+    """The parameters to send and to key the cache with; unset (None) ones are left to the API."""
+    return {name: value for name, value in params.items() if value is not None}
+
+
+def cache_key(model, messages, params=None):
+    payload = json.dumps(
+        {"model": model, "messages": messages, "params": params or {}},
+        sort_keys=True, ensure_ascii=False, separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> size, least recently used first
+        self._total_bytes = 0
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+
+    def _load_index(self):
+        found = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.is_file() and entry.name.endswith(".json"):
+                    st = entry.stat()
+                    found.append((st.st_mtime, entry.name[:-5], st.st_size))
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+            self._total_bytes += size
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, model, messages, params=None):
+        key = cache_key(model, messages, params)
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            try:
+                with open(self._path(key), "r", encoding="utf-8") as f:
+                    output = json.load(f)["output"]
+                os.utime(self._path(key))
+            except (OSError, ValueError, KeyError):
+                self._drop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return output
+
+    def put(self, model, messages, output, params=None):
+        key = cache_key(model, messages, params)
+        data = json.dumps(
+            {"model": model, "messages": messages, "params": params or {}, "output": output},
+            ensure_ascii=False,
+        ).encode("utf-8")
+        if len(data) > self.max_bytes:
+            return
+        # Write and rename outside the lock so lookups are not held up by the
+        # disk. The temp file is unique, so concurrent puts of the same key
+        # never write into one file; the last rename wins.
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".tmp-", suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        with self._lock:
+            self._total_bytes += len(data) - self._entries.pop(key, 0)
+            self._entries[key] = len(data)
+            evicted = self._evict()
+        for stale in evicted:
+            self._remove_file(stale)
+
+    def _evict(self):
+        """Unindex least recently used entries until the cache fits; return their keys."""
+        evicted = []
+        while self._total_bytes > self.max_bytes and self._entries:
+            key, size = self._entries.popitem(last=False)
+            self._total_bytes -= size
+            evicted.append(key)
+        return evicted
+
+    def _drop(self, key):
+        self._total_bytes -= self._entries.pop(key, 0)
+        self._remove_file(key)
+
+    def _remove_file(self, key):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._entries):
+                self._drop(key)
+
+    def stats(self):
+        return (f"cache: {self.hits} hits, {self.misses} misses, "
+                f"{len(self._entries)} entries, {self._total_bytes / (1024 * 1024):.1f} MiB")
@@ -0,0 +1,166 @@
+"""Indexed SQLite store of prompt runs.
+
+Every run is one row holding the prompt, output, model, request parameters,
+timings, token usage and the JSON latency breakdown from ``metrics``. Rows are keyed by an autoincrement id, so titles
+can repeat without overwriting each other. Title, model and date are
+indexed, so history queries are lookups rather than directory scans.
+The database runs in WAL mode, and ``add`` buffers rows so that bulk jobs
+insert them in batches inside one transaction.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_BATCH_SIZE = 100
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    title TEXT NOT NULL,
+    model TEXT NOT NULL,
+    prompt TEXT NOT NULL,
+    output TEXT NOT NULL,
+    params TEXT NOT NULL DEFAULT '{}',
+    source TEXT NOT NULL DEFAULT 'api',
+    created_at REAL NOT NULL,
+    duration REAL,
+    first_token REAL,
+    prompt_tokens INTEGER,
+    completion_tokens INTEGER,
+    total_tokens INTEGER,
+    metrics TEXT
+);
+CREATE INDEX IF NOT EXISTS runs_title ON runs (title, created_at);
+CREATE INDEX IF NOT EXISTS runs_model ON runs (model, created_at);
+CREATE INDEX IF NOT EXISTS runs_created_at ON runs (created_at);
+"""
+
+COLUMNS = (
+    "title", "model", "prompt", "output", "params", "source", "created_at",
+    "duration", "first_token", "prompt_tokens", "completion_tokens", "total_tokens", "metrics",
+)
+
+
+def default_store_path(config_folder=""):
+    base = config_folder or os.path.join(os.path.expanduser("~"), ".enhanced_prompt_runner")
+    return os.path.join(base, "runs.sqlite3")
+
+
+def usage_dict(usage):
+    """Token usage from an OpenAI response's ``usage`` object (or None)."""
+    if usage is None:
+        return {}
+    return {
+        "prompt_tokens": usage.prompt_tokens,
+        "completion_tokens": usage.completion_tokens,
+        "total_tokens": usage.total_tokens,
+    }
+
+
+class RunStore:
+    def __init__(self, path, batch_size=DEFAULT_BATCH_SIZE):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self._pending = []
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._migrate()
+
+    def _migrate(self):
+        # Stores created before latency breakdowns were recorded lack the column.
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(runs)")}
+        if "metrics" not in columns:
+            with self._conn:
+                self._conn.execute("ALTER TABLE runs ADD COLUMN metrics TEXT")
+
+    def _row(self, title, model, prompt, output, params=None, source="api", created_at=None,
+             duration=None, first_token=None, usage=None, metrics=None):
+        usage = usage or {}
+        return (
+            title, model, prompt, output, json.dumps(params or {}, sort_keys=True), source,
+            created_at if created_at is not None else time.time(), duration, first_token,
+            usage.get("prompt_tokens"), usage.get("completion_tokens"), usage.get("total_tokens"),
+            json.dumps(metrics, sort_keys=True) if metrics else None,
+        )
+
+    def record(self, title, model, prompt, output, **fields):
+        """Insert one run immediately and return its id."""
+        row = self._row(title, model, prompt, output, **fields)
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                f"INSERT INTO runs ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})", row
+            )
+            return cursor.lastrowid
+
+    def add(self, title, model, prompt, output, **fields):
+        """Buffer one run; rows are written ``batch_size`` at a time."""
+        row = self._row(title, model, prompt, output, **fields)
+        with self._lock:
+            self._pending.append(row)
+            if len(self._pending) >= self.batch_size:
+                self._flush_locked()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if not self._pending:
+            return
+        with self._conn:
+            self._conn.executemany(
+                f"INSERT INTO runs ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})",
+                self._pending,
+            )
+        self._pending = []
+
+    def get(self, run_id):
+        with self._lock:
+            return self._conn.execute("SELECT * FROM runs WHERE id = ?", (run_id,)).fetchone()
+
+    def latest(self, title, model=None):
+        query = "SELECT * FROM runs WHERE title = ?"
+        args = [title]
+        if model is not None:
+            query += " AND model = ?"
+            args.append(model)
+        query += " ORDER BY created_at DESC LIMIT 1"
+        with self._lock:
+            return self._conn.execute(query, args).fetchone()
+
+    def history(self, title=None, model=None, since=None, until=None, limit=100):
+        clauses, args = [], []
+        if title is not None:
+            clauses.append("title = ?")
+            args.append(title)
+        if model is not None:
+            clauses.append("model = ?")
+            args.append(model)
+        if since is not None:
+            clauses.append("created_at >= ?")
+            args.append(since)
+        if until is not None:
+            clauses.append("created_at < ?")
+            args.append(until)
+        query = "SELECT * FROM runs"
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        args.append(limit)
+        with self._lock:
+            return self._conn.execute(query, args).fetchall()
+
+    def close(self):
+        with self._lock:
+            self._flush_locked()
+            self._conn.close()
@@ -0,0 +1,194 @@
+"""Persistent full-text index over the prompts and outputs folders.
+
+Documents are stored in a SQLite FTS5 table next to a ``files`` table that
+records each file's mtime and size. ``update`` only re-reads files whose
+mtime or size changed, reading them on a thread pool, and drops rows for
+files that disappeared. ``search`` returns bm25-ranked hits with snippets.
+
+Usage:
+    python search_index.py PROMPTS_FOLDER OUTPUTS_FOLDER "query terms"
+"""
+
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    kind TEXT NOT NULL,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS docs USING fts5(
+    title, body, tokenize = 'porter unicode61'
+);
+"""
+
+INDEXED_EXTENSIONS = (".txt", ".md")
+READ_WORKERS = 8
+
+SearchHit = namedtuple("SearchHit", "path kind title snippet rank")
+
+
+def default_index_path(config_folder=""):
+    base = config_folder or os.path.join(os.path.expanduser("~"), ".enhanced_prompt_runner")
+    return os.path.join(base, "search_index.sqlite3")
+
+
+def build_match_query(text):
+    """Turn free text into an FTS5 query: all terms required, last one as a prefix."""
+    terms = [t.replace('"', '""') for t in text.split()]
+    if not terms:
+        return None
+    quoted = [f'"{t}"' for t in terms]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+def _scan(folder, kind):
+    for root, _, names in os.walk(folder):
+        for name in names:
+            if not name.lower().endswith(INDEXED_EXTENSIONS):
+                continue
+            # The outputs folder may be the prompts folder or inside it, so
+            # each file belongs to exactly one kind.
+            if (kind == "output") != name.endswith("_output.txt"):
+                continue
+            path = os.path.join(root, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            yield path, kind, st.st_mtime, st.st_size
+
+
+def _read(path):
+    try:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+class SearchIndex:
+    def __init__(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._connection().executescript(SCHEMA)
+
+    def _connection(self):
+        # One connection per thread; WAL lets searches run during a reindex.
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def update(self, folders, progress=None):
+        """Bring the index in line with ``folders``, a list of (folder, kind).
+
+        Returns ``(indexed, removed)`` counts.
+        """
+        with self._write_lock:
+            conn = self._connection()
+            known = {row[0]: row[1:] for row in conn.execute("SELECT path, id, mtime, size FROM files")}
+            seen = set()
+            changed = {}  # path -> (kind, mtime, size); overlapping folders yield a path more than once
+            for folder, kind in folders:
+                if not folder or not os.path.isdir(folder):
+                    continue
+                for path, file_kind, mtime, size in _scan(os.path.abspath(folder), kind):
+                    seen.add(path)
+                    entry = known.get(path)
+                    if entry is None or entry[1] != mtime or entry[2] != size:
+                        changed.setdefault(path, (file_kind, mtime, size))
+
+            removed = [known[path][0] for path in known.keys() - seen]
+            with conn:
+                conn.executemany("DELETE FROM docs WHERE rowid = ?", ((i,) for i in removed))
+                conn.executemany("DELETE FROM files WHERE id = ?", ((i,) for i in removed))
+
+            indexed = 0
+            with ThreadPoolExecutor(max_workers=READ_WORKERS) as pool:
+                bodies = pool.map(_read, changed)
+                with conn:
+                    for (path, (kind, mtime, size)), body in zip(changed.items(), bodies):
+                        if body is None:
+                            continue
+                        self._upsert(conn, known.get(path), path, kind, mtime, size, body)
+                        indexed += 1
+                        if progress and indexed % 500 == 0:
+                            progress(indexed, len(changed))
+            return indexed, len(removed)
+
+    def _upsert(self, conn, entry, path, kind, mtime, size, body):
+        title = os.path.splitext(os.path.basename(path))[0]
+        if kind == "output" and title.endswith("_output"):
+            title = title[: -len("_output")]
+        if entry is None:
+            cursor = conn.execute(
+                "INSERT INTO files (path, kind, mtime, size) VALUES (?, ?, ?, ?)", (path, kind, mtime, size)
+            )
+            doc_id = cursor.lastrowid
+        else:
+            doc_id = entry[0]
+            conn.execute("UPDATE files SET kind = ?, mtime = ?, size = ? WHERE id = ?", (kind, mtime, size, doc_id))
+            conn.execute("DELETE FROM docs WHERE rowid = ?", (doc_id,))
+        conn.execute("INSERT INTO docs (rowid, title, body) VALUES (?, ?, ?)", (doc_id, title, body))
+
+    def search(self, text, limit=50, kind=None):
+        query = build_match_query(text)
+        if query is None:
+            return []
+        sql = (
+            "SELECT files.path, files.kind, docs.title, "
+            "snippet(docs, 1, '[', ']', '...', 12), bm25(docs, 5.0, 1.0) AS rank "
+            "FROM docs JOIN files ON files.id = docs.rowid WHERE docs MATCH ?"
+        )
+        args = [query]
+        if kind is not None:
+            sql += " AND files.kind = ?"
+            args.append(kind)
+        sql += " ORDER BY rank LIMIT ?"
+        args.append(limit)
+        return [SearchHit(*row) for row in self._connection().execute(sql, args)]
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 3:
+        print(__doc__.strip().splitlines()[-1].strip(), file=sys.stderr)
+        return 2
+    prompts_folder, outputs_folder, query = argv
+    index = SearchIndex(default_index_path())
+    started = time.perf_counter()
+    indexed, removed = index.update([(prompts_folder, "prompt"), (outputs_folder, "output")])
+    print(f"Indexed {indexed} changed files, removed {removed} ({time.perf_counter() - started:.2f}s)")
+    started = time.perf_counter()
+    hits = index.search(query)
+    for hit in hits:
+        print(f"{hit.rank:8.2f}  [{hit.kind}] {hit.title}: {hit.snippet}")
+    print(f"{len(hits)} results in {(time.perf_counter() - started) * 1000:.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+"""Search window over everything ever run, backed by ``SearchIndex``."""
+
+from PyQt6 import QtCore, QtWidgets
+
+from search_index import SearchIndex
+
+SEARCH_DELAY_MS = 150
+
+
+class ReindexSignals(QtCore.QObject):
+    finished = QtCore.pyqtSignal(int, int, float)
+    failed = QtCore.pyqtSignal(str)
+
+
+class ReindexTask(QtCore.QRunnable):
+    def __init__(self, index, folders):
+        super().__init__()
+        self.index = index
+        self.folders = folders
+        self.signals = ReindexSignals()
+
+    def run(self):
+        started = QtCore.QElapsedTimer()
+        started.start()
+        try:
+            indexed, removed = self.index.update(self.folders)
+        except Exception as e:
+            self.signals.failed.emit(str(e))
+            return
+        self.signals.finished.emit(indexed, removed, started.elapsed() / 1000)
+
+
+class SearchDialog(QtWidgets.QDialog):
+    def __init__(self, index_path, folders, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Search Prompts and Outputs")
+        self.resize(700, 500)
+        self.index = SearchIndex(index_path)
+        self.folders = folders
+
+        self.query_input = QtWidgets.QLineEdit()
+        self.query_input.setPlaceholderText("Search prompts and outputs...")
+        self.reindex_button = QtWidgets.QPushButton("Reindex")
+        self.reindex_button.setToolTip("Pick up new, changed and deleted files")
+        self.results = QtWidgets.QListWidget()
+        self.results.setWordWrap(True)
+        self.status = QtWidgets.QLabel("")
+
+        query_row = QtWidgets.QHBoxLayout()
+        query_row.addWidget(self.query_input)
+        query_row.addWidget(self.reindex_button)
+        layout = QtWidgets.QVBoxLayout(self)
+        layout.addLayout(query_row)
+        layout.addWidget(self.results)
+        layout.addWidget(self.status)
+
+        # Queries run on a short debounce rather than on every keystroke.
+        self.search_timer = QtCore.QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DELAY_MS)
+        self.search_timer.timeout.connect(self.run_search)
+        self.query_input.textChanged.connect(self.search_timer.start)
+        self.reindex_button.clicked.connect(self.reindex)
+
+        self.reindex()
+
+    def reindex(self):
+        self.reindex_button.setEnabled(False)
+        self.status.setText("Indexing...")
+        task = ReindexTask(self.index, self.folders)
+        task.signals.finished.connect(self.reindex_finished)
+        task.signals.failed.connect(self.reindex_failed)
+        QtCore.QThreadPool.globalInstance().start(task)
+
+    def reindex_finished(self, indexed, removed, seconds):
+        self.reindex_button.setEnabled(True)
+        self.status.setText(f"Index updated: {indexed} changed, {removed} removed ({seconds:.2f}s)")
+        self.run_search()
+
+    def reindex_failed(self, message):
+        self.reindex_button.setEnabled(True)
+        self.status.setText(f"Indexing failed: {message}")
+
+    def run_search(self):
+        self.results.clear()
+        text = self.query_input.text()
+        if not text.strip():
+            return
+        timer = QtCore.QElapsedTimer()
+        timer.start()
+        hits = self.index.search(text)
+        for hit in hits:
+            snippet = " ".join(hit.snippet.split())
+            item = QtWidgets.QListWidgetItem(f"[{hit.kind}] {hit.title}\n{snippet}")
+            item.setToolTip(hit.path)
+            item.setData(QtCore.Qt.ItemDataRole.UserRole, hit.path)
+            self.results.addItem(item)
+        self.status.setText(f"{len(hits)} results in {timer.elapsed()} ms")
+
+    def closeEvent(self, event):
+        self.index.close()
+        event.accept()
@@ -0,0 +1,98 @@
+"""Startup measurement for the Enhanced Prompt Runner (``--startup-profile``).
+
+``profile_startup`` relaunches the app under ``python -X importtime`` and
+reads the per-module import costs from its stderr. The child reports its
+time-to-first-paint and then quits. The totals are compared against
+``STARTUP_BUDGET_MS`` so that launch-time regressions show up as a failing
+exit code.
+"""
+
+import os
+import subprocess
+import sys
+import time
+
+from PyQt6 import QtCore
+
+STARTUP_BUDGET_MS = 1000
+TOP_MODULES = 20
+PROFILE_ENV = "PROMPT_RUNNER_STARTUP_PROFILE"
+LAUNCHED_AT_ENV = "PROMPT_RUNNER_LAUNCHED_AT"
+FIRST_PAINT_PREFIX = "first-paint-ms:"
+
+
+def is_profile_child():
+    return os.environ.get(PROFILE_ENV) == "1"
+
+
+class FirstPaintWatcher(QtCore.QObject):
+    """Emits ``painted`` once, right after ``widget`` receives its first paint."""
+
+    painted = QtCore.pyqtSignal()
+
+    def __init__(self, widget):
+        super().__init__(widget)
+        self.widget = widget
+        self.painted_at = None
+        widget.installEventFilter(self)
+
+    def eventFilter(self, obj, event):
+        if obj is self.widget and event.type() == QtCore.QEvent.Type.Paint:
+            self.widget.removeEventFilter(self)
+            self.painted_at = time.time()
+            QtCore.QTimer.singleShot(0, self.painted.emit)
+        return False
+
+
+def report_first_paint(app, watcher):
+    """In the profiled child: print launch-to-first-paint time and quit the app."""
+    launched_at = float(os.environ.get(LAUNCHED_AT_ENV, watcher.painted_at))
+    print(f"{FIRST_PAINT_PREFIX}{(watcher.painted_at - launched_at) * 1000:.1f}", flush=True)
+    app.quit()
+
+
+def parse_importtime(stderr):
+    """Return ``[(module, depth, self_us, cumulative_us)]`` from ``-X importtime`` output."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3:
+            continue
+        try:
+            self_us, cumulative_us = int(parts[0]), int(parts[1])
+        except ValueError:
+            continue  # the header line
+        name = parts[2][1:]  # one separator space, then two per nesting level
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), depth, self_us, cumulative_us))
+    return rows
+
+
+def profile_startup(script, budget_ms=STARTUP_BUDGET_MS, top=TOP_MODULES):
+    env = dict(os.environ, **{PROFILE_ENV: "1", LAUNCHED_AT_ENV: repr(time.time())})
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", script],
+        env=env, capture_output=True, text=True, timeout=120,
+    )
+    rows = parse_importtime(proc.stderr)
+    first_paint = None
+    for line in proc.stdout.splitlines():
+        if line.startswith(FIRST_PAINT_PREFIX):
+            first_paint = float(line[len(FIRST_PAINT_PREFIX):])
+
+    # Top-level imports (depth 0) add up to the total import cost.
+    total_us = sum(cumulative for _, depth, _, cumulative in rows if depth == 0)
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for module, _, self_us, cumulative_us in sorted(rows, key=lambda r: r[3], reverse=True)[:top]:
+        print(f"{cumulative_us / 1000:14.1f} {self_us / 1000:9.1f}  {module}")
+    print(f"\n{len(rows)} modules imported, {total_us / 1000:.1f} ms total import time")
+
+    if proc.returncode != 0 or first_paint is None:
+        print(f"App did not reach first paint (exit code {proc.returncode})", file=sys.stderr)
+        print(proc.stderr[-2000:], file=sys.stderr)
+        return 2
+    verdict = "within" if first_paint <= budget_ms else "OVER"
+    print(f"Time to first paint: {first_paint:.1f} ms ({verdict} the {budget_ms} ms budget)")
+    return 0 if first_paint <= budget_ms else 1
@@ -0,0 +1,47 @@
+"""Shared fixtures: the modules under test are imported by plain name, as the app does."""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mock_server import MockConfig, start_in_thread  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def qapp():
+    from PyQt6 import QtWidgets
+
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    return QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+
+@pytest.fixture
+def mock_config():
+    # Fast enough for a test run: ~10ms to the first byte, 16 tokens at 2,000 tokens/s.
+    return MockConfig(latency_ms=10.0, latency_dist="fixed", tokens_per_second=2000.0,
+                      completion_tokens=16, batch_delay=0.2, seed=1)
+
+
+@pytest.fixture
+def mock_server(mock_config, monkeypatch):
+    """A mock API on a free port; OPENAI_BASE_URL points every client at it."""
+    server = start_in_thread(mock_config)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    monkeypatch.setenv("OPENAI_BASE_URL", base_url)
+    try:
+        yield base_url
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def prompts_folder(tmp_path):
+    folder = tmp_path / "prompts"
+    folder.mkdir()
+    for i in range(3):
+        (folder / f"prompt{i}.txt").write_text(f"Say hello number {i}", encoding="utf-8")
+    return folder
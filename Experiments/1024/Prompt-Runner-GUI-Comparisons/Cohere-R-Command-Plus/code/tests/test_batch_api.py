@@ -0,0 +1,92 @@
+import os
+import threading
+
+import pytest
+
+pytest.importorskip("openai")
+
+from batch_api import (LOCK_NAME, MANIFEST_NAME, Manifest, WorkDirBusy, batch_request, pack, read_jsonl,  # noqa: E402
+                       run_batch_api, work_dir_lock)
+from batch_runner import DEFAULT_MODEL  # noqa: E402
+from response_cache import ResponseCache  # noqa: E402
+from run_store import RunStore  # noqa: E402
+
+
+def test_pack_splits_input_files(tmp_path):
+    requests = [batch_request(f"p{i}", "gpt-4o", "x" * 50) for i in range(5)]
+    files = list(pack(iter(requests), str(tmp_path), "run", max_requests=2))
+    assert [count for _, count in files] == [2, 2, 1]
+    assert [r["custom_id"] for path, _ in files for r in read_jsonl(path)] == [f"p{i}" for i in range(5)]
+
+
+def test_run_batch_api_against_mock_server(mock_server, prompts_folder, tmp_path):
+    work_dir = tmp_path / "batches"
+    outputs = tmp_path / "outputs"
+    cache = ResponseCache(str(tmp_path / "cache"))
+    store = RunStore(str(tmp_path / "runs.sqlite3"))
+    try:
+        ok, failed = run_batch_api(
+            str(prompts_folder), str(outputs), "test-key", work_dir=str(work_dir), cache=cache, store=store,
+            poll_seconds=0.05, max_poll_seconds=0.2, params={"max_tokens": 4}, log=lambda message: None,
+        )
+        assert (ok, failed) == (3, 0)
+        for i in range(3):
+            assert (outputs / f"prompt{i}_output.txt").read_text(encoding="utf-8").startswith("the prompt")
+            assert store.latest(f"prompt{i}") is not None
+        messages = [{"role": "user", "content": "Say hello number 0"}]
+        assert cache.get(DEFAULT_MODEL, messages, {"max_tokens": 4}) is not None
+        # Collected batches leave nothing behind in the work folder.
+        assert Manifest(str(work_dir)).batches == {}
+        assert sorted(os.listdir(work_dir)) == [MANIFEST_NAME, LOCK_NAME]
+    finally:
+        store.close()
+
+
+def test_open_batches_are_collected_by_the_next_run(mock_server, prompts_folder, tmp_path):
+    work_dir = str(tmp_path / "batches")
+    outputs = tmp_path / "outputs"
+    stop = threading.Event()
+    stop.set()
+    ok, failed = run_batch_api(str(prompts_folder), str(outputs), "test-key", work_dir=work_dir,
+                               poll_seconds=0.05, cancelled=stop, log=lambda message: None)
+    assert (ok, failed) == (0, 0)
+    assert len(Manifest(work_dir).batches) == 1
+
+    ok, failed = run_batch_api(str(prompts_folder), str(outputs), "test-key", work_dir=work_dir,
+                               poll_seconds=0.05, max_poll_seconds=0.2, collect_only=True, log=lambda message: None)
+    assert (ok, failed) == (3, 0)
+    assert sorted(os.listdir(outputs)) == [f"prompt{i}_output.txt" for i in range(3)]
+
+
+def test_open_batches_are_collected_into_their_own_outputs_folder(mock_server, prompts_folder, tmp_path):
+    work_dir = str(tmp_path / "batches")
+    stop = threading.Event()
+    stop.set()
+    run_batch_api(str(prompts_folder), str(tmp_path / "first"), "test-key", work_dir=work_dir,
+                  poll_seconds=0.05, cancelled=stop, log=lambda message: None)
+
+    ok, failed = run_batch_api(str(prompts_folder), str(tmp_path / "second"), "test-key", work_dir=work_dir,
+                               poll_seconds=0.05, max_poll_seconds=0.2, log=lambda message: None)
+    # The second run submits its own batch instead of skipping the prompts still open for the first folder.
+    assert (ok, failed) == (6, 0)
+    for folder in ("first", "second"):
+        assert sorted(os.listdir(tmp_path / folder)) == [f"prompt{i}_output.txt" for i in range(3)]
+
+
+def test_a_second_run_on_the_same_work_dir_is_refused(tmp_path):
+    work_dir = str(tmp_path)
+    with work_dir_lock(work_dir):
+        with pytest.raises(WorkDirBusy):
+            run_batch_api(str(tmp_path / "prompts"), str(tmp_path / "outputs"), "test-key", work_dir=work_dir,
+                          collect_only=True, log=lambda message: None)
+    with work_dir_lock(work_dir):
+        pass
+
+
+def test_manifest_saves_leave_no_temp_files(tmp_path):
+    manifest = Manifest(str(tmp_path))
+    manifest.add("batch_1", str(tmp_path / "input.jsonl"), "gpt-4o", str(tmp_path / "outputs"))
+    manifest.remove("batch_1")
+    manifest.add("batch_2", str(tmp_path / "input.jsonl"), "gpt-4o", str(tmp_path / "outputs"))
+    assert os.listdir(tmp_path) == [MANIFEST_NAME]
+    assert Manifest(str(tmp_path)).batches["batch_2"]["outputs_folder"] == str(tmp_path / "outputs")
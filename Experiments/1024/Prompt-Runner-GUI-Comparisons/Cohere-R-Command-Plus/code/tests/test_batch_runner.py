@@ -0,0 +1,41 @@
+import asyncio
+import json
+
+import pytest
+
+pytest.importorskip("openai")
+
+from batch_runner import output_path, run_batch  # noqa: E402
+from metrics import MetricsRegistry, metrics_file_path  # noqa: E402
+from run_store import RunStore  # noqa: E402
+
+
+def test_run_batch_against_mock_server(mock_server, prompts_folder, tmp_path):
+    outputs = tmp_path / "outputs"
+    store = RunStore(str(tmp_path / "runs.sqlite3"))
+    try:
+        ok, failed = asyncio.run(run_batch(
+            str(prompts_folder), str(outputs), "test-key", concurrency=2, store=store, metrics=MetricsRegistry(),
+            log=lambda message: None,
+        ))
+        assert (ok, failed) == (3, 0)
+        for i in range(3):
+            title = f"prompt{i}"
+            output_file = output_path(str(outputs), title)
+            with open(output_file, encoding="utf-8") as f:
+                assert f.read().startswith("the prompt runner")
+            # Time to first byte is only known if the trace hook ran on the async client.
+            with open(metrics_file_path(output_file), encoding="utf-8") as f:
+                assert json.load(f)["time_to_first_byte_seconds"] is not None
+            assert store.latest(title) is not None
+    finally:
+        store.close()
+
+
+def test_run_batch_skips_existing_outputs(mock_server, prompts_folder, tmp_path):
+    outputs = tmp_path / "outputs"
+    outputs.mkdir()
+    (outputs / "prompt0_output.txt").write_text("kept", encoding="utf-8")
+    ok, failed = asyncio.run(run_batch(str(prompts_folder), str(outputs), "test-key", log=lambda message: None))
+    assert (ok, failed) == (3, 0)
+    assert (outputs / "prompt0_output.txt").read_text(encoding="utf-8") == "kept"
@@ -0,0 +1,60 @@
+import asyncio
+import json
+
+import pytest
+
+from dataset_runner import ResultsWriter, expand, read_rows, template_fields  # noqa: E402
+
+
+def write(path, text):
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+def test_read_rows_reports_bad_records(tmp_path):
+    path = write(tmp_path / "rows.jsonl", '{"id": "a", "name": "Ann"}\nnot json\n[1]\n{"name": "no id"}\n')
+    rows = list(read_rows(path, "id"))
+    assert rows[0] == ("a", {"id": "a", "name": "Ann"}, None)
+    assert [row[1] for row in rows[1:]] == [None, None, None]
+    assert all(row[2] for row in rows[1:])
+
+
+def test_expand_fills_titles_and_templates(tmp_path):
+    path = write(tmp_path / "rows.csv", "id,name\n1,Ann\n2,Bob/Jr\n")
+    jobs = list(expand(read_rows(path, "id"), "Greet {name}", "{_template}-{_id}-{name}", "greet"))
+    assert jobs == [("1", "greet-1-Ann", "Greet Ann", None), ("2", "greet-2-Bob_Jr", "Greet Bob/Jr", None)]
+    assert template_fields("Greet {name} from {city.upper}") == {"name", "city"}
+
+
+def test_run_dataset_against_mock_server(mock_server, tmp_path):
+    pytest.importorskip("openai")
+    from dataset_runner import run_dataset
+    from run_store import RunStore
+
+    rows = read_rows(write(tmp_path / "rows.csv", "id,name\n1,Ann\n2,Bob\n3,\n"), "id")
+    results = ResultsWriter(str(tmp_path / "results.jsonl"))
+    store = RunStore(str(tmp_path / "runs.sqlite3"))
+    try:
+        ok, failed = asyncio.run(run_dataset(
+            "Greet {name}", rows, results, "test-key", template_name="greet",
+            outputs_folder=str(tmp_path / "outputs"), store=store, log=lambda message: None,
+        ))
+    finally:
+        results.close()
+    assert (ok, failed) == (3, 0)
+    with open(results.path, encoding="utf-8") as f:
+        records = {record["id"]: record for record in map(json.loads, f)}
+    assert {record["status"] for record in records.values()} == {"ok"}
+    assert (tmp_path / "outputs" / "greet-1_output.txt").read_text(encoding="utf-8") == records["1"]["output"]
+
+    # A rerun skips every row already in the run store.
+    rows = read_rows(str(tmp_path / "rows.csv"), "id")
+    results = ResultsWriter(str(tmp_path / "rerun.jsonl"))
+    try:
+        assert asyncio.run(run_dataset("Greet {name}", rows, results, "test-key", template_name="greet",
+                                       store=store, log=lambda message: None)) == (3, 0)
+    finally:
+        results.close()
+        store.close()
+    with open(results.path, encoding="utf-8") as f:
+        assert {json.loads(line)["status"] for line in f} == {"skipped"}
@@ -0,0 +1,53 @@
+import asyncio
+import os
+
+import pytest
+
+pytest.importorskip("openai")
+
+from fan_out import Backend, OUTPUT_FILE, PROMPT_FILE, fan_out, parse_backend, read_prompt  # noqa: E402
+from file_writer import FILE_MODE  # noqa: E402
+from mock_server import MockConfig  # noqa: E402
+
+
+def test_fan_out_streams_every_backend(mock_server, tmp_path):
+    (tmp_path / PROMPT_FILE).write_text("Write hello", encoding="utf-8")
+    backends = [Backend("A", "gpt-4o", None, "key-a"), Backend("B", "gpt-4o-mini", mock_server, "key-b")]
+    received = {"A": [], "B": []}
+    results = asyncio.run(fan_out(
+        read_prompt(str(tmp_path)), backends, str(tmp_path),
+        on_delta=lambda name, text: received[name].append(text),
+    ))
+    assert [result.error for result in results] == [None, None]
+    for result in results:
+        name = result.backend.name
+        assert (tmp_path / name / OUTPUT_FILE).read_text(encoding="utf-8") == "".join(received[name])
+        assert os.stat(tmp_path / name / OUTPUT_FILE).st_mode & 0o777 == FILE_MODE
+        assert result.metrics.as_dict()["time_to_first_token_seconds"] is not None
+    # Only the finished output is left; the temp file was swapped into place.
+    assert sorted(p.name for p in (tmp_path / "A").iterdir()) == [OUTPUT_FILE]
+
+
+@pytest.mark.parametrize("mock_config", [MockConfig(latency_ms=10.0, latency_dist="fixed", tokens_per_second=50.0,
+                                                     completion_tokens=40, seed=1)])
+def test_timeout_bounds_the_gaps_not_the_whole_stream(mock_server, tmp_path):
+    # 40 tokens at 50 tokens/s take about 0.8s, longer than the timeout.
+    (result,) = asyncio.run(fan_out("Write hello", [Backend("A", "gpt-4o", None, "key")], str(tmp_path), timeout=0.4))
+    assert result.error is None
+    assert len((tmp_path / "A" / OUTPUT_FILE).read_text(encoding="utf-8").split()) == 40
+
+
+def test_failed_backend_keeps_previous_output(mock_server, tmp_path):
+    (tmp_path / "A").mkdir()
+    (tmp_path / "A" / OUTPUT_FILE).write_text("previous", encoding="utf-8")
+    backend = Backend("A", "gpt-4o", "http://127.0.0.1:9/v1", "key")  # nothing listens on port 9
+    (result,) = asyncio.run(fan_out("Write hello", [backend], str(tmp_path), timeout=1))
+    assert result.error is not None
+    assert (tmp_path / "A" / OUTPUT_FILE).read_text(encoding="utf-8") == "previous"
+
+
+def test_parse_backend():
+    backend = parse_backend("Local=llama3@http://localhost:11434/v1", {"PROMPT_RUNNER_KEY_LOCAL": "k"})
+    assert backend == Backend("Local", "llama3", "http://localhost:11434/v1", "k")
+    with pytest.raises(ValueError):
+        parse_backend("no-model=")
@@ -0,0 +1,25 @@
+import os
+import threading
+
+from file_writer import FILE_MODE, FileWriter
+
+
+def test_files_are_replaced_with_the_default_mode(tmp_path):
+    done = threading.Event()
+    results = []
+
+    def on_done(paths, error):
+        results.append((paths, error))
+        done.set()
+
+    target = tmp_path / "outputs" / "title_output.txt"
+    writer = FileWriter()
+    writer.submit([(str(target), "hello")], on_done)
+    assert done.wait(5)
+    writer.close(5)
+
+    assert results == [([str(target)], None)]
+    assert target.read_text(encoding="utf-8") == "hello"
+    # mkstemp's owner-only mode must not leak into the saved file.
+    assert os.stat(target).st_mode & 0o777 == FILE_MODE
+    assert [name for name in os.listdir(target.parent)] == ["title_output.txt"]
@@ -0,0 +1,28 @@
+import os
+
+import pytest
+
+pytest.importorskip("PyQt6.QtCore")
+
+from key_check import KeyCache, chat_models, key_fingerprint  # noqa: E402
+
+
+def test_key_cache_round_trip(tmp_path):
+    path = tmp_path / "config" / "key_cache.json"
+    fingerprint = key_fingerprint("sk-test", "http://127.0.0.1:1/v1")
+    KeyCache(str(path)).put(fingerprint, ["gpt-4o", "gpt-3.5-turbo"])
+
+    assert KeyCache(str(path)).get(fingerprint)["models"] == ["gpt-3.5-turbo", "gpt-4o"]
+    assert "sk-test" not in path.read_text(encoding="utf-8")
+    assert os.listdir(path.parent) == ["key_cache.json"]
+
+
+def test_expired_entries_are_ignored(tmp_path):
+    path = str(tmp_path / "key_cache.json")
+    KeyCache(path).put("abc", ["gpt-4o"])
+    assert KeyCache(path, ttl=-1).get("abc") is None
+
+
+def test_chat_models_filters_non_chat_models():
+    assert chat_models(["whisper-1", "gpt-4o", "o1-mini"]) == ["gpt-4o", "o1-mini"]
+    assert chat_models(["llama3"]) == ["llama3"]
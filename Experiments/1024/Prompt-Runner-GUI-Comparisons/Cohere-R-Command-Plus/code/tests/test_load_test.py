@@ -0,0 +1,33 @@
+import pytest
+
+pytest.importorskip("openai")
+
+from load_test import main, parse_args, percentile  # noqa: E402
+
+
+def test_percentile_is_nearest_rank():
+    values = [0.1, 0.2, 0.3, 0.4]
+    assert percentile(values, 50) == 0.2
+    assert percentile(values, 99) == 0.4
+
+
+def test_client_and_mock_limits_are_separate_options():
+    args = parse_args(["prompts", "--mock", "--rpm", "60", "--tpm", "1000", "--client-rpm", "30"])
+    assert (args.rpm, args.tpm) == (60, 1000)
+    assert (args.client_rpm, args.client_tpm) == (30, None)
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_load_test_against_mock_server(mock_server, prompts_folder, capsys, stream):
+    argv = [str(prompts_folder), "--base-url", mock_server, "--concurrency", "4", "--repeat", "2",
+            "--client-rpm", "6000"]
+    assert main(argv + (["--stream"] if stream else [])) == 0
+    report = capsys.readouterr().out
+    assert report.startswith(f"6 requests against {mock_server}")
+    assert "errors: 0" in report
+    assert ("first token" in report) == stream
+
+
+def test_load_test_with_in_process_mock(prompts_folder, capsys):
+    assert main([str(prompts_folder), "--mock", "--latency-ms", "5", "--tps", "5000"]) == 0
+    assert "errors: 0" in capsys.readouterr().out
@@ -0,0 +1,46 @@
+import pytest
+
+pytest.importorskip("PyQt6.QtWidgets")
+
+from log_view import TerminalLog  # noqa: E402
+
+
+def lines(log):
+    model = log.log_model
+    return [model.data(model.index(row)) for row in range(model.rowCount())]
+
+
+def test_streamed_text_gets_its_own_row(qapp):
+    log = TerminalLog()
+    log.append("[t] #1 Running prompt...")
+    log.insert_text("#2 API Response: Hel")
+    log.append("[t] #1 Error: boom")
+    log.insert_text("lo\nworld")
+    log.end_line()
+    log.append("[t] #2 Stream finished")
+    assert lines(log) == [
+        "[t] #1 Running prompt...",
+        "[t] #1 Error: boom",
+        "#2 API Response: Hello",
+        "world",
+        "[t] #2 Stream finished",
+    ]
+
+
+def test_lines_inserted_above_the_stream_respect_max_lines(qapp):
+    log = TerminalLog(max_lines=3)
+    log.append("a")
+    log.insert_text("live")
+    log.append("b\nc\nd")
+    assert lines(log) == ["c", "d", "live"]
+
+
+def test_streamed_line_reaches_the_log_file_when_closed(qapp, tmp_path):
+    path = tmp_path / "logs" / "terminal.log"
+    log = TerminalLog()
+    log.open_log_file(str(path))
+    log.insert_text("streamed")
+    log.append("other")
+    assert path.read_text(encoding="utf-8") == "other\n"
+    log.end_line()
+    assert path.read_text(encoding="utf-8") == "other\nstreamed\n"
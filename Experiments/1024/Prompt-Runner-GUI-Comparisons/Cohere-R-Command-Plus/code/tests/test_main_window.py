@@ -0,0 +1,152 @@
+import os
+
+import pytest
+
+pytest.importorskip("PyQt6.QtWidgets")
+
+from PyQt6 import QtCore  # noqa: E402
+
+from mock_server import MockConfig  # noqa: E402
+
+
+@pytest.fixture
+def settings(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    QtCore.QSettings.setPath(QtCore.QSettings.Format.NativeFormat, QtCore.QSettings.Scope.UserScope,
+                             str(tmp_path / "settings"))
+    settings = QtCore.QSettings("MyApp", "EnhancedPromptRunner")
+    settings.clear()
+    settings.setValue("config_folder", str(tmp_path / "config"))
+    settings.sync()
+    return settings
+
+
+@pytest.fixture
+def window(qapp, settings, tmp_path):
+    from main import EnhancedPromptRunner
+
+    window = EnhancedPromptRunner()
+    yield window
+    window.close()
+
+
+def test_finish_startup_builds_shared_objects(window, settings, tmp_path):
+    settings.setValue("prompts_folder", str(tmp_path / "prompts"))
+    settings.sync()
+    window.finish_startup()
+    assert window.transport is not None and window.rate_limiter is not None
+    assert window.hedge_policy is not None and window.key_cache is not None
+    assert window.prompts_folder_edit.text() == str(tmp_path / "prompts")
+
+
+def test_folder_edits_update_the_folders(window):
+    window.finish_startup()
+    window.outputs_folder_edit.setText("/tmp/outputs")
+    assert window.outputs_folder == "/tmp/outputs"
+
+
+def stream_run(window, job, tmp_path):
+    from metrics import RunMetrics
+
+    window.finish_startup()
+    window.prompts_folder_edit.setText(str(tmp_path / "prompts"))
+    window.outputs_folder_edit.setText(str(tmp_path / "outputs"))
+    options = {"api_key": "test-key", "export": True, "stream": True, "refresh_cache": True, "model": "gpt-4o",
+               "params": window.request_params()}
+    window.run_prompt_thread(job, "Say hello", "greeting", RunMetrics("greeting", "gpt-4o"),
+                             window.hedge_policy, options)
+
+
+def partial_outputs(tmp_path):
+    return [path.read_text(encoding="utf-8") for path in (tmp_path / "outputs").glob(".tmp-*.part")]
+
+
+def test_streamed_run_writes_the_output_as_it_arrives(window, mock_server, tmp_path, monkeypatch):
+    pytest.importorskip("openai")
+    from file_writer import FILE_MODE
+    from job_queue import Job
+
+    seen_on_disk = []
+    post = window.ui_updates.append
+
+    def record(target, text, sep=""):
+        if target == window.append_stream_text:
+            seen_on_disk.extend(partial_outputs(tmp_path))
+        post(target, text, sep)
+
+    monkeypatch.setattr(window.ui_updates, "append", record)
+    window.terminal_output.append("[t] earlier line")
+    stream_run(window, Job(1, "greeting", None), tmp_path)
+    window.file_writer.close(5)
+
+    output_file = tmp_path / "outputs" / "greeting_output.txt"
+    assert output_file.read_text(encoding="utf-8").startswith("the prompt runner")
+    assert (tmp_path / "prompts" / "greeting.txt").read_text(encoding="utf-8") == "Say hello"
+    assert os.stat(output_file).st_mode & 0o777 == FILE_MODE
+    window.ui_updates.flush()
+    model = window.terminal_output.log_model
+    lines = [model.data(model.index(row)) for row in range(model.rowCount())]
+    streamed = [line for line in lines if "API Response: " in line]
+    first_line = output_file.read_text(encoding="utf-8").split("\n")[0]
+    assert len(streamed) == 1 and streamed[0].endswith(f"#1 API Response: {first_line}")
+    assert "[t] earlier line" in lines
+    # The temp file grew during generation and was swapped into place at the end.
+    assert any(text and output_file.read_text(encoding="utf-8").startswith(text) for text in seen_on_disk)
+    assert partial_outputs(tmp_path) == []
+
+
+@pytest.mark.parametrize("mock_config", [MockConfig(latency_ms=10.0, latency_dist="fixed", tokens_per_second=50.0,
+                                                     completion_tokens=40, seed=1)])
+def test_a_stream_may_outlast_the_run_deadline(window, settings, mock_server, tmp_path):
+    pytest.importorskip("openai")
+    from job_queue import Job
+
+    # 40 tokens at 50 tokens/s take about 0.8s; the deadline only bounds the first token.
+    settings.setValue("request_timeout", 0.4)
+    stream_run(window, Job(1, "greeting", None), tmp_path)
+    window.file_writer.close(5)
+    assert len((tmp_path / "outputs" / "greeting_output.txt").read_text(encoding="utf-8").split()) == 40
+
+
+def test_cancelled_stream_keeps_the_previous_output(window, mock_server, tmp_path, monkeypatch):
+    pytest.importorskip("openai")
+    from job_queue import Job, JobCancelled
+
+    (tmp_path / "outputs").mkdir()
+    (tmp_path / "outputs" / "greeting_output.txt").write_text("previous", encoding="utf-8")
+    job = Job(1, "greeting", None)
+    post = window.ui_updates.append
+
+    def cancel_on_first_delta(target, text, sep=""):
+        if target == window.append_stream_text:
+            job.cancel_event.set()
+        post(target, text, sep)
+
+    monkeypatch.setattr(window.ui_updates, "append", cancel_on_first_delta)
+    with pytest.raises(JobCancelled):
+        stream_run(window, job, tmp_path)
+    assert (tmp_path / "outputs" / "greeting_output.txt").read_text(encoding="utf-8") == "previous"
+    assert partial_outputs(tmp_path) == []
+
+
+def test_settings_are_saved_on_close(qapp, settings, tmp_path):
+    from main import EnhancedPromptRunner
+
+    window = EnhancedPromptRunner()
+    window.finish_startup()
+    window.model_picker.setCurrentText("gpt-4o-mini")
+    window.api_key_input.setText("test-key")
+    window.outputs_folder_edit.setText(str(tmp_path / "outputs"))
+    window.close()
+
+    settings.sync()
+    assert settings.value("model") == "gpt-4o-mini"
+    assert settings.value("outputs_folder") == str(tmp_path / "outputs")
+    reopened = EnhancedPromptRunner()
+    try:
+        reopened.finish_startup()
+        assert reopened.current_model() == "gpt-4o-mini"
+        assert reopened.api_key_input.text() == "test-key"
+        assert reopened.dark_mode is False
+    finally:
+        reopened.close()
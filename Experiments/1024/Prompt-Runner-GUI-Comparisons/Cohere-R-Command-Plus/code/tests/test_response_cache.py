@@ -0,0 +1,71 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from response_cache import ResponseCache, cache_key, request_params
+
+MESSAGES = [{"role": "user", "content": "Say hello"}]
+
+
+def test_every_request_parameter_is_part_of_the_key():
+    assert request_params(temperature=None, max_tokens=16) == {"max_tokens": 16}
+    assert cache_key("gpt-4o", MESSAGES) == cache_key("gpt-4o", MESSAGES, {})
+    keys = {
+        cache_key("gpt-4o", MESSAGES),
+        cache_key("gpt-4o", MESSAGES, {"temperature": 0.2}),
+        cache_key("gpt-4o", MESSAGES, {"temperature": 0.7}),
+        cache_key("gpt-4o", MESSAGES, {"temperature": 0.2, "max_tokens": 16}),
+        cache_key("gpt-4o-mini", MESSAGES, {"temperature": 0.2}),
+    }
+    assert len(keys) == 5
+
+
+def test_entries_are_kept_apart_by_params(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    cache.put("gpt-4o", MESSAGES, "cold", {"temperature": 0.0})
+    assert cache.get("gpt-4o", MESSAGES, {"temperature": 0.0}) == "cold"
+    assert cache.get("gpt-4o", MESSAGES, {"temperature": 1.0}) is None
+    assert cache.get("gpt-4o", MESSAGES) is None
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_lru_eviction_keeps_the_budget(tmp_path):
+    cache = ResponseCache(str(tmp_path), max_bytes=400)
+    for i in range(5):
+        cache.put("gpt-4o", [{"role": "user", "content": f"prompt {i}"}], "x" * 100)
+    assert cache.get("gpt-4o", [{"role": "user", "content": "prompt 0"}]) is None
+    assert cache.get("gpt-4o", [{"role": "user", "content": "prompt 4"}]) == "x" * 100
+
+
+def test_concurrent_puts_of_one_key_leave_a_single_entry(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda i: cache.put("gpt-4o", MESSAGES, f"answer {i}"), range(64)))
+    assert os.listdir(tmp_path) == [f"{cache_key('gpt-4o', MESSAGES)}.json"]
+    assert cache.get("gpt-4o", MESSAGES).startswith("answer ")
+
+
+def test_batch_runner_sends_and_keys_its_params(mock_server, prompts_folder, tmp_path):
+    pytest.importorskip("openai")
+    from batch_runner import run_batch
+
+    cache = ResponseCache(str(tmp_path / "cache"))
+    outputs = str(tmp_path / "outputs")
+
+    def run(**params):
+        sources = []
+        ok, failed = asyncio.run(run_batch(
+            str(prompts_folder), outputs, "test-key", overwrite=True, cache=cache, params=request_params(**params),
+            log=lambda message: sources.append(message.split("(")[-1].split(";")[0]),
+        ))
+        assert (ok, failed) == (3, 0)
+        return set(sources)
+
+    assert run(temperature=0.2, max_tokens=4) == {"api"}
+    assert run(temperature=0.2, max_tokens=4) == {"cache"}
+    assert run(temperature=0.7, max_tokens=4) == {"api"}
+    # The mock honours max_tokens, so the parameters really reached the request.
+    with open(f"{outputs}/prompt0_output.txt", encoding="utf-8") as f:
+        assert len(f.read().split()) == 4
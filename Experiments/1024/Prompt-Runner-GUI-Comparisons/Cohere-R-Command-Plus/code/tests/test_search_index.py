@@ -0,0 +1,19 @@
+import pytest
+
+from search_index import SearchIndex
+
+
+@pytest.mark.parametrize("outputs", ["outputs", "."])
+def test_outputs_inside_the_prompts_folder_are_indexed_once(tmp_path, outputs):
+    prompts = tmp_path / "prompts"
+    (prompts / outputs).mkdir(parents=True, exist_ok=True)
+    (prompts / "greeting.txt").write_text("say hello", encoding="utf-8")
+    (prompts / outputs / "greeting_output.txt").write_text("hello there", encoding="utf-8")
+    index = SearchIndex(str(tmp_path / "index.db"))
+    folders = [(str(prompts), "prompt"), (str(prompts / outputs), "output")]
+
+    assert index.update(folders) == (2, 0)
+    assert index.update(folders) == (0, 0)
+    hits = sorted((hit.kind, hit.title) for hit in index.search("hello"))
+    assert hits == [("output", "greeting"), ("prompt", "greeting")]
+    index.close()
@@ -0,0 +1,81 @@
+"""Coalesces bursts of worker-thread updates into at most one UI flush per frame.
+
+A streaming worker can produce thousands of deltas a second. As a queued
+signal, each one becomes its own event, and each event its own repaint.
+``UpdateThrottle`` is thread-safe and lives on the GUI thread. Workers post
+updates to it. Only the first post after a flush wakes the GUI thread. The
+flush runs at most once per ``interval_ms`` and delivers everything pending:
+
+- ``append(target, text, sep)``: consecutive appends to the same target are
+  joined and delivered in a single call. Arrival order across targets is
+  kept.
+- ``set_latest(target, value)``: only the newest value is delivered (progress
+  bars, status labels).
+
+Targets are GUI-thread callables. They are called on the GUI thread with the
+merged text or latest value. Call ``flush()`` from the GUI thread to deliver
+pending updates right away, e.g. before handling a worker's ``finished``
+signal.
+"""
+
+import threading
+
+from PyQt6 import QtCore
+
+FRAME_MS = 16
+
+
+class UpdateThrottle(QtCore.QObject):
+    wake = QtCore.pyqtSignal()
+
+    def __init__(self, interval_ms=FRAME_MS, parent=None):
+        super().__init__(parent)
+        self.interval_ms = interval_ms
+        self._lock = threading.Lock()
+        self._pending = []  # [target, sep, parts] in arrival order
+        self._latest = {}
+        self._awake = False
+        self._timer = QtCore.QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setTimerType(QtCore.Qt.TimerType.PreciseTimer)
+        self._timer.timeout.connect(self.flush)
+        self._since_flush = QtCore.QElapsedTimer()
+        self._since_flush.start()
+        # Emitted from a worker, this is queued onto the GUI thread.
+        self.wake.connect(self._schedule)
+
+    def append(self, target, text, sep=""):
+        with self._lock:
+            last = self._pending[-1] if self._pending else None
+            if last is not None and last[0] == target and last[1] == sep:
+                last[2].append(text)
+            else:
+                self._pending.append([target, sep, [text]])
+            wake = not self._awake
+            self._awake = True
+        if wake:
+            self.wake.emit()
+
+    def set_latest(self, target, value):
+        with self._lock:
+            self._latest[target] = value
+            wake = not self._awake
+            self._awake = True
+        if wake:
+            self.wake.emit()
+
+    def _schedule(self):
+        if not self._timer.isActive():
+            self._timer.start(max(0, self.interval_ms - self._since_flush.elapsed()))
+
+    def flush(self):
+        self._timer.stop()
+        with self._lock:
+            pending, self._pending = self._pending, []
+            latest, self._latest = self._latest, {}
+            self._awake = False
+        self._since_flush.restart()
+        for target, value in latest.items():
+            target(value)
+        for target, sep, parts in pending:
+            target(sep.join(parts))
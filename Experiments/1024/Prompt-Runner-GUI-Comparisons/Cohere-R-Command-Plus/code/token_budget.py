@@ -0,0 +1,133 @@
+"""Token counting and cost estimation for prompts before they are sent.
+
+Counts come from tiktoken's local BPE encodings. Each encoding's merge table
+is loaded once per process and cached. Batches of prompts are tokenized in a
+process pool. If tiktoken is not installed, or its BPE table cannot be
+loaded (tiktoken downloads it on first use, which fails offline), counts
+fall back to a rough regex estimate, and ``TokenEstimate.exact`` is False.
+That fallback is cached per model like a loaded encoding, so the download
+is not retried on every count. tiktoken itself is only imported when the
+first count is requested.
+"""
+
+import os
+import re
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+DEFAULT_COMPLETION_TOKENS = 512
+FALLBACK_ENCODING = "cl100k_base"
+
+# Context window and USD price per million (input, output) tokens.
+MODEL_LIMITS = {
+    "gpt-3.5-turbo": (16_385, 0.50, 1.50),
+    "gpt-3.5-turbo-instruct": (4_096, 1.50, 2.00),
+    "gpt-4": (8_192, 30.00, 60.00),
+    "gpt-4-turbo": (128_000, 10.00, 30.00),
+    "gpt-4o": (128_000, 2.50, 10.00),
+    "gpt-4o-mini": (128_000, 0.15, 0.60),
+}
+
+# Per-message and reply-priming overhead of the chat format.
+TOKENS_PER_MESSAGE = 3
+TOKENS_PER_REPLY = 3
+
+_ESTIMATE_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+TokenEstimate = namedtuple(
+    "TokenEstimate",
+    "model prompt_tokens completion_tokens context_window cost exact",
+)
+
+
+def model_limits(model):
+    if model in MODEL_LIMITS:
+        return MODEL_LIMITS[model]
+    # Dated snapshots such as "gpt-4o-2024-08-06" share their family's limits.
+    for name in sorted(MODEL_LIMITS, key=len, reverse=True):
+        if model.startswith(name):
+            return MODEL_LIMITS[name]
+    return None
+
+
+@lru_cache(maxsize=None)
+def get_encoding(model):
+    try:
+        import tiktoken
+    except ImportError:  # optional: fall back to an estimate
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding(FALLBACK_ENCODING)
+    except Exception:  # e.g. the BPE table download failed
+        return None
+
+
+def count_tokens(text, model):
+    encoding = get_encoding(model)
+    if encoding is None:
+        return sum(1 for _ in _ESTIMATE_PATTERN.finditer(text))
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def count_message_tokens(messages, model):
+    total = TOKENS_PER_REPLY
+    for message in messages:
+        total += TOKENS_PER_MESSAGE
+        for value in message.values():
+            total += count_tokens(value or "", model)
+    return total
+
+
+def estimate(messages, model, max_completion_tokens=None):
+    prompt_tokens = count_message_tokens(messages, model)
+    return estimate_from_count(prompt_tokens, model, max_completion_tokens)
+
+
+def estimate_from_count(prompt_tokens, model, max_completion_tokens=None):
+    completion_tokens = max_completion_tokens or DEFAULT_COMPLETION_TOKENS
+    limits = model_limits(model)
+    context_window = cost = None
+    if limits is not None:
+        context_window, input_price, output_price = limits
+        cost = (prompt_tokens * input_price + completion_tokens * output_price) / 1_000_000
+    return TokenEstimate(model, prompt_tokens, completion_tokens, context_window, cost,
+                         get_encoding(model) is not None)
+
+
+def fits_context(estimate_):
+    if estimate_.context_window is None:
+        return True
+    return estimate_.prompt_tokens + estimate_.completion_tokens <= estimate_.context_window
+
+
+def describe(estimate_):
+    approx = "" if estimate_.exact else "~"
+    text = f"{approx}{estimate_.prompt_tokens} prompt tokens"
+    if estimate_.context_window is not None:
+        text += f" of {estimate_.context_window} context"
+    if estimate_.cost is not None:
+        text += f", up to ${estimate_.cost:.4f} with {estimate_.completion_tokens} completion tokens"
+    return text
+
+
+def _count_chunk(args):
+    texts, model = args
+    return [count_message_tokens([{"role": "user", "content": text}], model) for text in texts]
+
+
+def count_tokens_batch(texts, model, workers=None, chunk_size=64):
+    """Count chat prompt tokens for many prompt texts using a process pool.
+
+    Each worker loads the encoding once and then reuses it for every chunk
+    it is given.
+    """
+    texts = list(texts)
+    if len(texts) <= chunk_size:
+        return _count_chunk((texts, model))
+    chunks = [(texts[i:i + chunk_size], model) for i in range(0, len(texts), chunk_size)]
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        return [count for counts in pool.map(_count_chunk, chunks) for count in counts]
@@ -0,0 +1,105 @@
+"""Shared, pooled HTTP transport for all API calls.
+
+One ``Transport`` is owned by the application. It holds a single keep-alive
+connection pool (HTTP/2 when the ``h2`` package is installed) and hands out
+OpenAI clients bound to it, so repeated runs and key tests reuse warm
+connections instead of paying DNS, TCP and TLS setup every time.
+
+httpx and the OpenAI SDK are only imported when the first client is
+requested, so constructing a ``Transport`` costs nothing at startup.
+Every request carries the ``metrics`` trace hook, so connection setup and
+time to first byte are recorded for the run that is current at the time.
+"""
+
+import importlib.util
+import threading
+
+from metrics import trace_request, trace_request_async
+
+DEFAULT_MAX_CONNECTIONS = 20
+DEFAULT_MAX_KEEPALIVE = 10
+DEFAULT_KEEPALIVE_EXPIRY = 60.0
+
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+class Transport:
+    def __init__(self, max_connections=DEFAULT_MAX_CONNECTIONS,
+                 max_keepalive_connections=DEFAULT_MAX_KEEPALIVE,
+                 keepalive_expiry=DEFAULT_KEEPALIVE_EXPIRY, http2=HTTP2_AVAILABLE):
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.http2 = http2 and HTTP2_AVAILABLE
+        self._lock = threading.Lock()
+        self._http_client = None
+        self._async_http_client = None
+        self._clients = {}
+        self._async_clients = {}
+
+    def _limits(self):
+        import httpx
+
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+    @property
+    def http_client(self):
+        with self._lock:
+            if self._http_client is None:
+                from openai import DefaultHttpxClient
+
+                self._http_client = DefaultHttpxClient(
+                    limits=self._limits(), http2=self.http2, event_hooks={"request": [trace_request]}
+                )
+            return self._http_client
+
+    @property
+    def async_http_client(self):
+        # httpx.AsyncClient is bound to the event loop it first runs on, so
+        # create it lazily from inside that loop.
+        if self._async_http_client is None:
+            from openai import DefaultAsyncHttpxClient
+
+            self._async_http_client = DefaultAsyncHttpxClient(
+                limits=self._limits(), http2=self.http2, event_hooks={"request": [trace_request_async]}
+            )
+        return self._async_http_client
+
+    def openai_client(self, api_key, base_url=None):
+        key = (api_key, base_url)
+        with self._lock:
+            client = self._clients.get(key)
+        if client is None:
+            from openai import OpenAI
+
+            client = OpenAI(api_key=api_key, base_url=base_url, http_client=self.http_client)
+            with self._lock:
+                client = self._clients.setdefault(key, client)
+        return client
+
+    def async_openai_client(self, api_key, base_url=None):
+        key = (api_key, base_url)
+        client = self._async_clients.get(key)
+        if client is None:
+            from openai import AsyncOpenAI
+
+            client = AsyncOpenAI(api_key=api_key, base_url=base_url, http_client=self.async_http_client)
+            self._async_clients[key] = client
+        return client
+
+    def close(self):
+        with self._lock:
+            if self._http_client is not None:
+                self._http_client.close()
+                self._http_client = None
+            self._clients.clear()
+
+    async def aclose(self):
+        if self._async_http_client is not None:
+            await self._async_http_client.aclose()
+            self._async_http_client = None
+        self._async_clients.clear()
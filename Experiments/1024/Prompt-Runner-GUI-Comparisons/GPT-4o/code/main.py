@@ -1,10 +1,31 @@
 import sys
+import re
 from PyQt6.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QLineEdit, QTextEdit, QLabel,
     QPushButton, QFileDialog, QHBoxLayout, QCheckBox, QProgressBar,
     QMessageBox
 )
 from PyQt6.QtGui import QFont
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, QTimer, pyqtSignal
+
+TOKEN_COUNT_DELAY_MS = 300
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+class TokenCountSignals(QObject):
+    counted = pyqtSignal(int, int)
+
+class TokenCountTask(QRunnable):
+    # Counts tokens on a pool thread; the generation number lets the UI
+    # ignore results for text that has changed since
+    def __init__(self, text, generation):
+        super().__init__()
+        self.text = text
+        self.generation = generation
+        self.signals = TokenCountSignals()
+
+    def run(self):
+        count = sum(1 for _ in TOKEN_PATTERN.finditer(self.text))
+        self.signals.counted.emit(self.generation, count)
 
 class PromptRunnerApp(QWidget):
     def __init__(self):
@@ -32,9 +53,18 @@ class PromptRunnerApp(QWidget):
         # Character Count
         self.char_count_label = QLabel("Character Count: 0", self)
         layout.addWidget(self.char_count_label)
-        
-        # Connect text change signal to character count update
-        self.prompt_input.textChanged.connect(self.updateCharCount)
+        self.token_count_label = QLabel("Token Count: 0", self)
+        layout.addWidget(self.token_count_label)
+
+        # Token counting is debounced so it only runs once typing pauses
+        self.token_generation = 0
+        self.token_timer = QTimer(self)
+        self.token_timer.setSingleShot(True)
+        self.token_timer.setInterval(TOKEN_COUNT_DELAY_MS)
+        self.token_timer.timeout.connect(self.startTokenCount)
+
+        # Connect document change signal to character count update
+        self.prompt_input.document().contentsChange.connect(self.updateCharCount)
 
         # Folder Configuration
         folder_layout = QHBoxLayout()
@@ -84,10 +114,22 @@ class PromptRunnerApp(QWidget):
         # Set main layout
         self.setLayout(layout)
 
-    def updateCharCount(self):
-        text_length = len(self.prompt_input.toPlainText())
-        
+    def updateCharCount(self, position, removed, added):
+        # characterCount() is O(1); it includes the trailing paragraph separator
+        text_length = self.prompt_input.document().characterCount() - 1
+
         self.char_count_label.setText(f"Character Count: {text_length}")
+        self.token_generation += 1
+        self.token_timer.start()
+
+    def startTokenCount(self):
+        task = TokenCountTask(self.prompt_input.toPlainText(), self.token_generation)
+        task.signals.counted.connect(self.updateTokenCount)
+        QThreadPool.globalInstance().start(task)
+
+    def updateTokenCount(self, generation, count):
+        if generation == self.token_generation:
+            self.token_count_label.setText(f"Token Count: ~{count}")
 
 def main():
     app = QApplication(sys.argv)
@@ -1,12 +1,400 @@
 import sys
-from PyQt6.QtWidgets import QApplication, QWidget, QVBoxLayout, QGridLayout, QLabel, QLineEdit, QTextEdit, QPushButton, QFileDialog, QScrollArea, QTextBrowser, QCheckBox, QComboBox, QMenu, QMenuBar, QAction, QInputDialog
-from PyQt6.QtGui import QFont, QPalette, QColor, QContextMenuEvent, QCloseEvent
-from PyQt6.QtCore import Qt, QThread, pyqtSignal, pyqtSlot
+from PyQt6.QtWidgets import QApplication, QWidget, QVBoxLayout, QHBoxLayout, QGridLayout, QLabel, QLineEdit, QTextEdit, QPushButton, QFileDialog, QTextBrowser, QCheckBox, QMenu, QMenuBar, QMessageBox, QListWidget, QListWidgetItem, QComboBox, QProgressBar
+from PyQt6.QtGui import QAction, QTextCursor
+from PyQt6.QtCore import Qt, QObject, QRunnable, QThreadPool, QTimer, pyqtSignal
 import os
+import collections
+import hashlib
+import itertools
 import json
-import requests
+import math
+import random
+import re
+import tempfile
 import threading
-from datetime import datetime
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+# OPENAI_BASE_URL can point the app at a local stand-in server for benchmarks
+API_BASE_URL = os.environ.get("OPENAI_BASE_URL", "https://api.openai.com/v1").rstrip("/")
+COMPLETIONS_URL = f"{API_BASE_URL}/completions"
+MODELS_URL = f"{API_BASE_URL}/models"
+COMPLETIONS_MODEL = "gpt-3.5-turbo-instruct"
+POOL_CONNECTIONS = 4
+POOL_MAXSIZE = 20
+MAX_RETRIES = 6
+# Client-side budget shared by every job; the provider's x-ratelimit-*
+# headers replace these limits once the first response arrives
+REQUESTS_PER_MINUTE = 500
+TOKENS_PER_MINUTE = 200_000
+MAX_TOKENS = 2048
+# (connect, read) timeouts for every request, and a hard limit on a whole run
+CONNECT_TIMEOUT = 10
+READ_TIMEOUT = 60
+RUN_DEADLINE = 300
+MAX_CONCURRENT_JOBS = 4
+# Hedging (opt-in): a request with no response after the p95 response time
+# of recent runs is sent once more, and the first response wins. Hedges are
+# capped at HEDGE_BUDGET_RATIO of all requests, plus one.
+HEDGE_QUANTILE = 95
+HEDGE_MIN_DELAY = 0.5
+HEDGE_MAX_DELAY = 30
+HEDGE_MIN_SAMPLES = 20
+HEDGE_BUDGET_RATIO = 0.1
+LATENCY_SAMPLES = 200
+# A run waiting on a response notices a cancel within this many seconds
+CANCEL_POLL_SECONDS = 0.1
+# Streamed text is sent to the GUI at most once per frame
+FRAME_SECONDS = 0.016
+# Key checks give up after KEY_CHECK_DEADLINE seconds; a successful check and
+# its model list are remembered for KEY_CACHE_TTL seconds
+KEY_CHECK_DEADLINE = 10
+KEY_CACHE_TTL = 3600
+KEY_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".prompt_runner_key_cache.json")
+# Only these models work with the legacy completions endpoint
+COMPLETION_MODEL_HINTS = ("instruct", "davinci", "babbage")
+
+
+def parse_duration(value):
+    # Reset durations come as "1s", "6m0s" or "20ms"; Retry-After as seconds
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = re.findall(r"(\d+(?:\.\d+)?)(ms|h|m|s)", value)
+    if not parts:
+        return None
+    units = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+    return sum(float(amount) * units[unit] for amount, unit in parts)
+
+
+class TokenBucket:
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def wait_time(self, amount, now):
+        rate = self.capacity / 60.0
+        self.level = min(self.capacity, self.level + (now - self.updated) * rate)
+        self.updated = now
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / rate
+
+    def take(self, amount):
+        self.level -= min(amount, self.capacity)
+
+    def sync(self, limit, remaining):
+        if limit:
+            self.capacity = float(limit)
+        if remaining is not None:
+            self.level = min(self.level, float(remaining))
+
+
+class RateLimiter:
+    # Paces every job against one requests-per-minute and one
+    # tokens-per-minute bucket. Each response re-syncs the buckets from its
+    # x-ratelimit-* headers, and a 429 pauses all jobs for its Retry-After,
+    # not only the one that was refused.
+    def __init__(self, requests_per_minute=REQUESTS_PER_MINUTE, tokens_per_minute=TOKENS_PER_MINUTE):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def reserve(self, tokens):
+        # Takes the budget for one request, or returns how long to wait for it
+        with self.lock:
+            now = time.monotonic()
+            wait = max(self.paused_until - now, 0.0)
+            if not wait:
+                wait = max(self.requests.wait_time(1, now), self.tokens.wait_time(tokens, now))
+            if not wait:
+                self.requests.take(1)
+                self.tokens.take(tokens)
+            return wait
+
+    def acquire(self, tokens, cancel_event):
+        while True:
+            wait = self.reserve(tokens)
+            if not wait:
+                return
+            if cancel_event.wait(wait):
+                raise JobCancelled()
+
+    def update_from_headers(self, headers, status=None):
+        def read(name):
+            try:
+                return float(headers[name]) if headers.get(name) is not None else None
+            except ValueError:
+                return None
+
+        with self.lock:
+            self.requests.sync(read("x-ratelimit-limit-requests"), read("x-ratelimit-remaining-requests"))
+            self.tokens.sync(read("x-ratelimit-limit-tokens"), read("x-ratelimit-remaining-tokens"))
+            pause = None
+            if status == 429:
+                pause = parse_duration(headers.get("retry-after")) or parse_duration(headers.get("x-ratelimit-reset-requests"))
+                self.tokens.level = min(self.tokens.level, 0.0)
+            elif read("x-ratelimit-remaining-requests") == 0:
+                pause = parse_duration(headers.get("x-ratelimit-reset-requests"))
+            if pause:
+                self.paused_until = max(self.paused_until, time.monotonic() + pause + random.uniform(0, 1.0))
+
+    def release(self, tokens):
+        # Gives back a reservation that was not used
+        with self.lock:
+            self.requests.level = min(self.requests.capacity, self.requests.level + 1)
+            self.tokens.level = min(self.tokens.capacity, self.tokens.level + tokens)
+
+    def reconcile(self, estimated, actual):
+        # Returns over-estimated budget, or charges the shortfall, once usage is known
+        with self.lock:
+            self.tokens.level = min(self.tokens.capacity, self.tokens.level + estimated - actual)
+
+
+def estimate_tokens(prompt_text, max_tokens=MAX_TOKENS):
+    # About four characters per token, plus the most the completion can use
+    return len(prompt_text) // 4 + 1 + max_tokens
+
+
+class HedgeBudget:
+    def __init__(self, ratio=HEDGE_BUDGET_RATIO, burst=1):
+        self.ratio = ratio
+        self.burst = burst
+        self.requests = 0
+        self.hedges = 0
+        self.lock = threading.Lock()
+
+    def record_request(self):
+        with self.lock:
+            self.requests += 1
+
+    def try_spend(self):
+        with self.lock:
+            if self.hedges < self.ratio * self.requests + self.burst:
+                self.hedges += 1
+                return True
+            return False
+
+
+class LatencyTracker:
+    # Recent times to a response, per model and per streamed or not, which
+    # set how long a request may stay pending before it is hedged
+    def __init__(self, size=LATENCY_SAMPLES):
+        self.size = size
+        self.samples = {}
+        self.lock = threading.Lock()
+
+    def add(self, key, seconds):
+        with self.lock:
+            self.samples.setdefault(key, collections.deque(maxlen=self.size)).append(seconds)
+
+    def hedge_delay(self, key):
+        with self.lock:
+            samples = sorted(self.samples.get(key, ()))
+        if len(samples) < HEDGE_MIN_SAMPLES:
+            return HEDGE_MAX_DELAY  # too little history; hedge only real stragglers
+        observed = samples[math.ceil(len(samples) * HEDGE_QUANTILE / 100) - 1]
+        return min(max(observed, HEDGE_MIN_DELAY), HEDGE_MAX_DELAY)
+
+
+def close_response(future):
+    # The losing request of a hedge is closed as soon as it completes
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
+
+
+def create_retry(total=MAX_RETRIES, limiter=None):
+    # Retry 429s and transient server errors instead of dropping the prompt.
+    # Retry-After is honoured when present; otherwise the delay grows
+    # exponentially with random jitter. Every retried response is also shown
+    # to the limiter, so the other jobs hold off while this one waits.
+    from urllib3.util.retry import Retry
+
+    class LimitedRetry(Retry):
+        def new(self, **kw):
+            retry = super().new(**kw)
+            retry.limiter = self.limiter
+            return retry
+
+        def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+            if self.limiter is not None and response is not None:
+                self.limiter.update_from_headers(response.headers, response.status)
+            return super().increment(method, url, response, error, _pool, _stacktrace)
+
+    retry = LimitedRetry(
+        total=total,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=None,
+        backoff_factor=1.0,
+        backoff_jitter=1.0,
+        backoff_max=60,
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    retry.limiter = limiter
+    return retry
+
+
+def create_session(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE, limiter=None):
+    # One keep-alive connection pool shared by every request the app makes,
+    # so only the first call to a host pays for DNS, TCP and TLS setup.
+    # requests is imported here, on first use, to keep it off the startup path.
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=create_retry(limiter=limiter))
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def key_fingerprint(api_key):
+    # The cache is keyed by a hash of the endpoint and key, never the key itself
+    return hashlib.sha256(f"{API_BASE_URL}\n{api_key}".encode("utf-8")).hexdigest()
+
+
+def write_json_atomic(path, data):
+    # Each writer gets its own temp file in the target directory, so two
+    # windows saving at once never write into the same file
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def read_key_cache():
+    try:
+        with open(KEY_CACHE_PATH, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def cached_models(api_key, ttl=KEY_CACHE_TTL):
+    entry = read_key_cache().get(key_fingerprint(api_key))
+    if entry is None or time.time() - entry["checked_at"] > ttl:
+        return None
+    return entry
+
+
+def cache_models(api_key, models, ttl=KEY_CACHE_TTL):
+    now = time.time()
+    entries = {name: entry for name, entry in read_key_cache().items() if now - entry["checked_at"] <= ttl}
+    entries[key_fingerprint(api_key)] = {"models": sorted(models), "checked_at": now}
+    write_json_atomic(KEY_CACHE_PATH, entries)
+
+
+def completion_models(model_ids):
+    models = [model_id for model_id in model_ids if any(hint in model_id for hint in COMPLETION_MODEL_HINTS)]
+    return sorted(models or model_ids)
+
+
+class KeyCheckSignals(QObject):
+    finished = pyqtSignal(int, object, str)  # generation, model ids or None, error
+
+
+class KeyCheckJob(QRunnable):
+    # Lists the models on a pool thread, so a slow network never blocks the
+    # window. Only successful checks are cached; a corrected key is checked
+    # again straight away.
+    def __init__(self, runner, api_key, generation, deadline, ttl):
+        super().__init__()
+        self.runner = runner
+        self.api_key = api_key
+        self.generation = generation
+        self.deadline = deadline
+        self.ttl = ttl
+        self.signals = KeyCheckSignals()
+
+    def run(self):
+        import requests
+
+        try:
+            response = self.runner.get_session().get(MODELS_URL, headers={"Authorization": f"Bearer {self.api_key}"}, timeout=(self.deadline, self.deadline))
+            if response.status_code != 200:
+                self.signals.finished.emit(self.generation, None, f"API Key is invalid! (HTTP {response.status_code})")
+                return
+            models = [model["id"] for model in response.json().get("data", [])]
+        except (requests.exceptions.RequestException, ValueError) as e:
+            self.signals.finished.emit(self.generation, None, f"Error: {e}")
+            return
+        try:
+            cache_models(self.api_key, models, self.ttl)
+        except OSError:
+            pass
+        self.signals.finished.emit(self.generation, models, "")
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class PromptJobSignals(QObject):
+    started = pyqtSignal(int)
+    message = pyqtSignal(int, str)
+    delta = pyqtSignal(int, str)
+    finished = pyqtSignal(int, str)  # job id, final state
+
+
+class PromptJob(QRunnable):
+    # One prompt run on the window's bounded thread pool. Everything it needs
+    # from the widgets is copied in when it is queued, and it reports back
+    # only through signals. Cancelling sets an event that the run checks
+    # between chunks.
+    def __init__(self, job_id, runner, prompt_text, title, outputs_folder, api_key, stream, model=COMPLETIONS_MODEL, hedge=False):
+        super().__init__()
+        self.job_id = job_id
+        self.runner = runner
+        self.prompt_text = prompt_text
+        self.title = title
+        self.outputs_folder = outputs_folder
+        self.api_key = api_key
+        self.stream = stream
+        self.hedge = hedge
+        self.model = model
+        self.state = "pending"
+        self.cancel_event = threading.Event()
+        self.signals = PromptJobSignals()
+
+    def log(self, text):
+        self.signals.message.emit(self.job_id, text)
+
+    def check_cancelled(self):
+        if self.cancel_event.is_set():
+            raise JobCancelled()
+
+    def run(self):
+        if self.cancel_event.is_set():
+            self.signals.finished.emit(self.job_id, "cancelled")
+            return
+        self.signals.started.emit(self.job_id)
+        self.log("Running prompt...")
+        # finished is emitted from the finally, so even an unexpected error
+        # frees the job's slot and updates the job list
+        state = "failed"
+        try:
+            self.runner.run_prompt(self)
+            state = "done"
+            self.log("Output saved!")
+        except JobCancelled:
+            state = "cancelled"
+            self.log("Cancelled")
+        except Exception as e:
+            # Network errors, a malformed response body or a bug: whatever
+            # it is, the job reports it instead of dying on the pool thread
+            self.log(f"Error: {e.__class__.__name__}: {e}")
+        finally:
+            self.log("Prompt completed!")
+            self.signals.finished.emit(self.job_id, state)
 
 class PromptRunner(QWidget):
     def __init__(self):
@@ -21,11 +409,59 @@ class PromptRunner(QWidget):
         self.create_widgets()
         self.layout_widgets()
 
+        self.config = {}
+        self.session = None
+        self.rate_limiter = None
+        self.session_lock = threading.Lock()
+        self.hedge_budget = HedgeBudget()
+        self.latencies = LatencyTracker()
+        # The config file is read after the window has been shown
+        QTimer.singleShot(0, self.finish_startup)
+
+        # Runs are queued on a bounded pool, so Run stays enabled while
+        # earlier prompts are in flight
+        self.job_pool = QThreadPool(self)
+        self.job_pool.setMaxThreadCount(MAX_CONCURRENT_JOBS)
+        self.jobs = {}
+        self.job_items = {}
+        self.job_ids = itertools.count(1)
+        # Only one job at a time streams into the terminal, on a row of its
+        # own; other lines go above that row while it is open. The streamed
+        # text of the other jobs is held and printed when their stream ends.
+        self.live_job = None
+        self.live_block = None
+        self.held_output = {}
+        # A key check result that arrives after its deadline is ignored
+        self.key_check_generation = 0
+        self.pending_key_check = None
+
+    def finish_startup(self):
         self.config = self.load_config()
         self.set_config_defaults()
-
-        self.thread = QThread()
-        self.thread.started.connect(self.run_prompt)
+        self.job_pool.setMaxThreadCount(self.config.get("max_concurrent_jobs", MAX_CONCURRENT_JOBS))
+        self.model_picker.setCurrentText(self.config.get("model", COMPLETIONS_MODEL))
+        self.hedge_toggle.setChecked(self.config.get("hedge_requests", False))
+        self.load_cached_models()
+
+    def get_session(self):
+        # Called from the job threads as well as the GUI thread
+        with self.session_lock:
+            if self.session is None:
+                self.rate_limiter = RateLimiter(
+                    self.config.get("requests_per_minute", REQUESTS_PER_MINUTE),
+                    self.config.get("tokens_per_minute", TOKENS_PER_MINUTE),
+                )
+                self.session = create_session(
+                    self.config.get("pool_connections", POOL_CONNECTIONS),
+                    self.config.get("pool_maxsize", POOL_MAXSIZE),
+                    self.rate_limiter,
+                )
+        return self.session
+
+    def get_timeout(self):
+        # requests waits forever without a timeout; a stalled server must not
+        # hang the run thread.
+        return (self.config.get("connect_timeout", CONNECT_TIMEOUT), self.config.get("read_timeout", READ_TIMEOUT))
 
     def create_widgets(self):
         self.prompt_input = QTextEdit()
@@ -52,9 +488,26 @@ class PromptRunner(QWidget):
         self.api_key_toggle.stateChanged.connect(self.toggle_api_key_visibility)
         self.api_key_test_button = QPushButton("Test API Key")
         self.api_key_test_button.clicked.connect(self.test_api_key)
+        self.api_key_input.editingFinished.connect(self.load_cached_models)
+        self.model_picker = QComboBox()
+        self.model_picker.setEditable(True)
+        self.model_picker.addItem(COMPLETIONS_MODEL)
+        self.model_picker.setToolTip("Model for new runs; the list comes from the last successful key test")
 
         self.run_button = QPushButton("Run Prompt")
         self.run_button.clicked.connect(self.start_thread)
+        self.stream_toggle = QCheckBox("Stream output")
+        self.hedge_toggle = QCheckBox("Hedge slow requests")
+        self.hedge_toggle.setToolTip("Send a request once more if it is slower than 95% of recent runs; the first response wins")
+
+        self.job_list = QListWidget()
+        self.job_list.setSelectionMode(QListWidget.SelectionMode.ExtendedSelection)
+        self.job_list.setFixedHeight(100)
+        self.job_status = QLabel("0 running, 0 pending")
+        self.cancel_job_button = QPushButton("Cancel Selected")
+        self.cancel_job_button.clicked.connect(self.cancel_selected_jobs)
+        self.clear_jobs_button = QPushButton("Clear Finished")
+        self.clear_jobs_button.clicked.connect(self.clear_finished_jobs)
 
         self.terminal_output = QTextBrowser()
         self.terminal_output.setFixedHeight(200)
@@ -89,8 +542,18 @@ class PromptRunner(QWidget):
         self.layout.addWidget(self.api_key_input)
         self.layout.addWidget(self.api_key_toggle)
         self.layout.addWidget(self.api_key_test_button)
+        self.layout.addWidget(self.model_picker)
 
         self.layout.addWidget(self.run_button)
+        self.layout.addWidget(self.stream_toggle)
+        self.layout.addWidget(self.hedge_toggle)
+
+        self.layout.addWidget(self.job_list)
+        self.job_buttons_layout = QHBoxLayout()
+        self.job_buttons_layout.addWidget(self.job_status, 1)
+        self.job_buttons_layout.addWidget(self.cancel_job_button)
+        self.job_buttons_layout.addWidget(self.clear_jobs_button)
+        self.layout.addLayout(self.job_buttons_layout)
 
         self.layout.addWidget(self.terminal_output)
 
@@ -118,40 +581,255 @@ class PromptRunner(QWidget):
 
     def test_api_key(self):
         api_key = self.api_key_input.text()
-        try:
-            response = requests.get("https://api.openai.com/v1/models", headers={"Authorization": f"Bearer {api_key}"})
-            if response.status_code == 200:
-                self.terminal_output.append("API Key is valid!")
-            else:
-                self.terminal_output.append("API Key is invalid!")
-        except requests.exceptions.RequestException as e:
-            self.terminal_output.append(f"Error: {e}")
-
-    def start_thread(self):
-        self.thread.start()
-
-    @pyqtSlot()
-    def run_prompt(self):
-        prompt_text = self.prompt_input.toPlainText()
-        title = self.title_input.text()
-        prompts_folder = self.prompts_folder_input.text()
-        outputs_folder = self.outputs_folder_input.text()
-        config_save_path = self.config_save_path_input.text()
+        ttl = self.config.get("key_cache_ttl", KEY_CACHE_TTL)
+        cached = cached_models(api_key, ttl)
+        if cached is not None:
+            self.set_models(cached["models"])
+            self.print_line(f"API Key is valid! (checked {(time.time() - cached['checked_at']) / 60:.0f} min ago)")
+            return
+        deadline = self.config.get("key_check_deadline", KEY_CHECK_DEADLINE)
+        self.key_check_generation += 1
+        generation = self.pending_key_check = self.key_check_generation
+        job = KeyCheckJob(self, api_key, generation, deadline, ttl)
+        job.signals.finished.connect(self.key_check_finished)
+        QThreadPool.globalInstance().start(job)
+        QTimer.singleShot(int(deadline * 1000), lambda: self.key_check_timed_out(generation, deadline))
+        self.api_key_test_button.setEnabled(False)
+        self.print_line("Checking API key...")
+
+    def key_check_finished(self, generation, models, error):
+        if generation != self.pending_key_check:
+            return
+        self.pending_key_check = None
+        self.api_key_test_button.setEnabled(True)
+        if models is None:
+            self.print_line(error)
+        else:
+            self.set_models(models)
+            self.print_line("API Key is valid!")
+
+    def key_check_timed_out(self, generation, deadline):
+        if generation != self.pending_key_check:
+            return
+        self.pending_key_check = None
+        self.api_key_test_button.setEnabled(True)
+        self.print_line(f"Error: the API key check timed out after {deadline}s")
+
+    def load_cached_models(self):
+        # Reads the local cache only; no request is made
         api_key = self.api_key_input.text()
+        cached = cached_models(api_key, self.config.get("key_cache_ttl", KEY_CACHE_TTL)) if api_key else None
+        if cached is not None:
+            self.set_models(cached["models"])
+
+    def set_models(self, model_ids):
+        current = self.model_picker.currentText().strip() or COMPLETIONS_MODEL
+        models = completion_models(model_ids)
+        if current not in models:
+            models.insert(0, current)
+        self.model_picker.clear()
+        self.model_picker.addItems(models)
+        self.model_picker.setCurrentText(current)
 
-        self.terminal_output.append("Running prompt...")
+    def start_thread(self):
+        job = PromptJob(
+            next(self.job_ids), self, self.prompt_input.toPlainText(), self.title_input.text(),
+            self.outputs_folder_input.text(), self.api_key_input.text(), self.stream_toggle.isChecked(),
+            self.model_picker.currentText().strip() or COMPLETIONS_MODEL, self.hedge_toggle.isChecked(),
+        )
+        job.signals.started.connect(self.job_started)
+        job.signals.message.connect(self.job_message)
+        job.signals.delta.connect(self.job_delta)
+        job.signals.finished.connect(self.job_finished)
+        self.jobs[job.job_id] = job
+        item = QListWidgetItem()
+        item.setData(Qt.ItemDataRole.UserRole, job.job_id)
+        self.job_items[job.job_id] = item
+        self.job_list.addItem(item)
+        self.job_pool.start(job)
+        self.print_line(f"#{job.job_id} Queued: {job.title}")
+        self.refresh_jobs()
+
+    def refresh_jobs(self):
+        running = sum(1 for job in self.jobs.values() if job.state == "running")
+        pending = sum(1 for job in self.jobs.values() if job.state == "pending")
+        for job_id, job in self.jobs.items():
+            self.job_items[job_id].setText(f"#{job_id} {job.title} - {job.state}")
+        self.job_status.setText(f"{running} running, {pending} pending")
+
+    def job_started(self, job_id):
+        self.jobs[job_id].state = "running"
+        self.refresh_jobs()
+
+    def print_line(self, text):
+        if self.live_job is None:
+            self.terminal_output.append(text)
+            return
+        document = self.terminal_output.document()
+        blocks = document.blockCount()
+        cursor = QTextCursor(document.findBlockByNumber(self.live_block))
+        cursor.insertText(text)
+        cursor.insertBlock()
+        self.live_block += document.blockCount() - blocks
+
+    def job_message(self, job_id, text):
+        # A job logs only after its last delta, so its stream has ended
+        self.end_stream(job_id)
+        self.print_line(f"#{job_id} {text}")
+
+    def job_delta(self, job_id, text):
+        if self.live_job is None:
+            # A job that was held so far goes live with what it has streamed
+            self.terminal_output.append(f"#{job_id} {''.join(self.held_output.pop(job_id, []))}")
+            self.live_job = job_id
+            self.live_block = self.terminal_output.document().blockCount() - 1
+        if self.live_job != job_id:
+            self.held_output.setdefault(job_id, []).append(text)
+            return
+        cursor = self.terminal_output.textCursor()
+        cursor.movePosition(QTextCursor.MoveOperation.End)
+        cursor.insertText(text)
+
+    def end_stream(self, job_id):
+        if self.live_job == job_id:
+            self.live_job = self.live_block = None
+        held = self.held_output.pop(job_id, None)
+        if held:
+            self.print_line(f"#{job_id} {''.join(held)}")
+
+    def job_finished(self, job_id, state):
+        self.end_stream(job_id)
+        self.jobs[job_id].state = state
+        self.refresh_jobs()
+
+    def cancel_selected_jobs(self):
+        for item in self.job_list.selectedItems():
+            job = self.jobs[item.data(Qt.ItemDataRole.UserRole)]
+            if job.state not in ("pending", "running"):
+                continue
+            job.cancel_event.set()
+            if job.state == "pending" and self.job_pool.tryTake(job):
+                self.job_finished(job.job_id, "cancelled")
+
+    def clear_finished_jobs(self):
+        for job_id in [job_id for job_id, job in self.jobs.items() if job.state not in ("pending", "running")]:
+            del self.jobs[job_id]
+            self.job_list.takeItem(self.job_list.row(self.job_items.pop(job_id)))
+        self.refresh_jobs()
+
+    def run_prompt(self, job):
+        # Runs on a pool thread: no widget access here, only job signals.
+        output_path = os.path.join(job.outputs_folder, f"{job.title}.txt")
+        session = self.get_session()
+        budget = estimate_tokens(job.prompt_text)
+        self.rate_limiter.acquire(budget, job.cancel_event)
+        run_deadline = self.config.get("run_deadline", RUN_DEADLINE)
+        deadline = time.monotonic() + run_deadline
+        if job.stream:
+            self.stream_prompt(job, output_path, budget, deadline, run_deadline)
+        else:
+            payload = {"model": job.model, "prompt": job.prompt_text, "max_tokens": MAX_TOKENS}
+            response = self.send(job, lambda: session.post(COMPLETIONS_URL, headers={"Authorization": f"Bearer {job.api_key}"}, json=payload, timeout=self.get_timeout()), budget, deadline, run_deadline)
+            with response:
+                self.rate_limiter.update_from_headers(response.headers, response.status_code)
+                response.raise_for_status()
+                body = response.json()
+            output = body["choices"][0]["text"]
+            usage = body.get("usage") or {}
+            if usage.get("total_tokens") is not None:
+                self.rate_limiter.reconcile(budget, usage["total_tokens"])
+            job.check_cancelled()
+            with open(output_path, "w") as f:
+                f.write(output)
 
+    def send(self, job, post, budget, deadline, run_deadline):
+        # Calls post() on a thread of its own and waits for its response,
+        # giving up at the run deadline or when the job is cancelled. With
+        # hedging on, a request still pending after the p95 response time is
+        # sent once more, if the hedge budget and the rate limit allow it;
+        # the first response wins and the other is closed when it arrives.
+        import requests
+
+        key = (job.model, job.stream)
+        started = time.monotonic()
+        hedge_at = started + self.latencies.hedge_delay(key) if job.hedge else None
+        self.hedge_budget.record_request()
+        pool = ThreadPoolExecutor(max_workers=2)
+        primary = pool.submit(post)
+        pending = {primary}
+        error = None
         try:
-            response = requests.post("https://api.openai.com/v1/completions", headers={"Authorization": f"Bearer {api_key}"}, json={"prompt": prompt_text, "max_tokens": 2048})
+            while pending:
+                now = time.monotonic()
+                if now > deadline:
+                    raise requests.exceptions.Timeout(f"Run exceeded the {run_deadline}s deadline")
+                job.check_cancelled()
+                if hedge_at is not None and now >= hedge_at:
+                    hedge_at = None
+                    if self.rate_limiter.reserve(budget):
+                        job.log(f"No response after {now - started:.2f}s; the rate limit leaves no room for a hedged request")
+                    elif self.hedge_budget.try_spend():
+                        job.log(f"No response after {now - started:.2f}s, sending a hedged request")
+                        pending.add(pool.submit(post))
+                    else:
+                        self.rate_limiter.release(budget)
+                done, _ = wait(pending, timeout=min(max(deadline - now, 0), CANCEL_POLL_SECONDS), return_when=FIRST_COMPLETED)
+                pending -= done
+                for future in done:
+                    if future.exception() is None:
+                        pending |= done - {future}  # a tie: close the other one too
+                        self.latencies.add(key, time.monotonic() - started)
+                        if future is not primary:
+                            job.log("The hedged request answered first")
+                        return future.result()
+                    error = future.exception()
+            raise error
+        finally:
+            for future in pending:
+                future.cancel()
+                future.add_done_callback(close_response)
+            pool.shutdown(wait=False)
+
+    def stream_prompt(self, job, output_path, budget, deadline, run_deadline):
+        import requests
+
+        # Read server-sent events line by line and write each delta to the
+        # output file as soon as it arrives. Deltas are batched and sent to
+        # the terminal at most once per frame. The read timeout only bounds
+        # the gap between chunks, so a slow but steady stream is also cut off
+        # once the run deadline passes. Only the wait for the response
+        # headers is hedged; once a stream has started it is read to the end.
+        payload = {"model": job.model, "prompt": job.prompt_text, "max_tokens": MAX_TOKENS, "stream": True}
+        pending = []
+        last_sent = time.monotonic()
+        session = self.get_session()
+        response = self.send(job, lambda: session.post(COMPLETIONS_URL, headers={"Authorization": f"Bearer {job.api_key}"}, json=payload, stream=True, timeout=self.get_timeout()), budget, deadline, run_deadline)
+        with response:
+            self.rate_limiter.update_from_headers(response.headers, response.status_code)
             response.raise_for_status()
-            output = response.json()["choices"][0]["text"]
-            with open(os.path.join(outputs_folder, f"{title}.txt"), "w") as f:
-                f.write(output)
-            self.terminal_output.append("Output saved!")
-        except requests.exceptions.RequestException as e:
-            self.terminal_output.append(f"Error: {e}")
-
-        self.terminal_output.append("Prompt completed!")
+            with open(output_path, "w") as f:
+                for line in response.iter_lines(decode_unicode=True):
+                    job.check_cancelled()
+                    if time.monotonic() > deadline:
+                        raise requests.exceptions.Timeout(f"Run exceeded the {run_deadline}s deadline")
+                    if not line or not line.startswith("data: "):
+                        continue
+                    data = line[len("data: "):]
+                    if data == "[DONE]":
+                        break
+                    choices = json.loads(data).get("choices") or []
+                    delta = choices[0].get("text", "") if choices else ""
+                    if not delta:
+                        continue
+                    f.write(delta)
+                    f.flush()
+                    pending.append(delta)
+                    if time.monotonic() - last_sent >= FRAME_SECONDS:
+                        job.signals.delta.emit(job.job_id, "".join(pending))
+                        pending = []
+                        last_sent = time.monotonic()
+        if pending:
+            job.signals.delta.emit(job.job_id, "".join(pending))
 
     def load_config(self):
         config_path = os.path.join(os.path.expanduser("~"), ".prompt_runner_config.json")
@@ -172,9 +850,25 @@ class PromptRunner(QWidget):
             with open(os.path.join(os.path.expanduser("~"), ".prompt_runner_config.json"), "w") as f:
                 json.dump(self.config, f)
 
+    def closeEvent(self, event):
+        # The picked model and hedging choice are restored on the next start
+        if self.config:
+            self.config["model"] = self.model_picker.currentText().strip() or COMPLETIONS_MODEL
+            self.config["hedge_requests"] = self.hedge_toggle.isChecked()
+            try:
+                write_json_atomic(os.path.join(os.path.expanduser("~"), ".prompt_runner_config.json"), self.config)
+            except OSError:
+                pass
+        for job in self.jobs.values():
+            job.cancel_event.set()
+        self.job_pool.waitForDone(5000)
+        if self.session is not None:
+            self.session.close()
+        event.accept()
+
     def show_about(self):
         about_text = "Enhanced Prompt Runner\n\n Developed by [Your Name]"
-        QInputDialog.show(self, "About", about_text)
+        QMessageBox.about(self, "About", about_text)
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
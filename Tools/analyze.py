@@ -0,0 +1,477 @@
+"""Static analysis of the generated programs in the Experiments tree.
+
+Every ``Experiments/**/code/main.py`` is compiled and checked for:
+
+- E001  syntax errors
+- E101  imports that are neither stdlib, a sibling module, nor listed in the
+        model's ``requirements.txt``
+- W102  imports that only resolve through another requirement's dependencies
+- E201  names that are used but never defined or imported
+- E301  PyQt5 names imported from the wrong PyQt6 module (``QAction`` now
+        lives in ``QtGui``), and E302 APIs that were removed in Qt 6
+- E303  ``exec_()``, which PyQt6 dropped in favour of ``exec()``
+- E304  unscoped enum access (``Qt.AlignCenter``); PyQt6 only accepts
+        ``Qt.AlignmentFlag.AlignCenter``
+- E305  ``str.count()`` called without the required argument
+- E306  the pre-1.0 ``openai.ChatCompletion`` / ``openai.Completion`` APIs
+
+Files are analyzed in a process pool. Results are cached by a hash of the
+source, its requirements and this analyzer's version, so only new or
+changed programs are re-analyzed.
+
+Usage:
+    python Tools/analyze.py [ROOT] [--json] [--no-cache] [--jobs N]
+"""
+
+import argparse
+import ast
+import builtins
+import hashlib
+import json
+import os
+import re
+import sys
+import tempfile
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+ANALYZER_VERSION = "1"
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_ROOT = os.path.join(REPO_ROOT, "Experiments")
+DEFAULT_CACHE = os.path.join(os.path.expanduser("~"), ".cache", "llm-code-generation-tests", "analysis.json")
+TARGET_FILE = "main.py"
+REQUIREMENTS_FILE = "requirements.txt"
+
+Finding = namedtuple("Finding", "code line col message")
+
+# Import name -> distribution name, where they differ.
+DISTRIBUTIONS = {
+    "yaml": "pyyaml",
+    "PIL": "pillow",
+    "cv2": "opencv-python",
+    "sklearn": "scikit-learn",
+    "bs4": "beautifulsoup4",
+    "dotenv": "python-dotenv",
+    "dateutil": "python-dateutil",
+}
+
+# Modules that arrive as dependencies of a requirement rather than directly.
+TRANSITIVE = {
+    "urllib3": ("requests",),
+    "certifi": ("requests", "httpx"),
+    "charset_normalizer": ("requests",),
+    "idna": ("requests", "httpx"),
+    "httpx": ("openai",),
+    "httpcore": ("httpx", "openai"),
+    "h2": ("httpx",),
+    "pydantic": ("openai",),
+    "anyio": ("httpx", "openai"),
+    "regex": ("tiktoken",),
+}
+
+# PyQt5 names that moved to another PyQt6 module.
+MOVED = {
+    ("QtWidgets", "QAction"): "QtGui",
+    ("QtWidgets", "QActionGroup"): "QtGui",
+    ("QtWidgets", "QShortcut"): "QtGui",
+    ("QtWidgets", "QUndoCommand"): "QtGui",
+    ("QtWidgets", "QUndoStack"): "QtGui",
+    ("QtWidgets", "QUndoGroup"): "QtGui",
+    ("QtWidgets", "QFileSystemModel"): "QtGui",
+}
+
+# Removed in Qt 6 -> replacement.
+REMOVED = {
+    "QDesktopWidget": "QScreen (QApplication.primaryScreen())",
+    "QRegExp": "QRegularExpression",
+    "QRegExpValidator": "QRegularExpressionValidator",
+    "QGLWidget": "QOpenGLWidget",
+    "QSound": "QSoundEffect",
+}
+
+# Class -> {unscoped member: enum it now lives in}.
+SCOPED_ENUMS = {
+    "Qt": {
+        **dict.fromkeys(("AlignCenter", "AlignLeft", "AlignRight", "AlignTop", "AlignBottom",
+                         "AlignHCenter", "AlignVCenter", "AlignJustify"), "AlignmentFlag"),
+        **dict.fromkeys(("Horizontal", "Vertical"), "Orientation"),
+        **dict.fromkeys(("LeftButton", "RightButton", "MiddleButton"), "MouseButton"),
+        **dict.fromkeys(("Checked", "Unchecked", "PartiallyChecked"), "CheckState"),
+        **dict.fromkeys(("ScrollBarAlwaysOff", "ScrollBarAlwaysOn", "ScrollBarAsNeeded"), "ScrollBarPolicy"),
+        **dict.fromkeys(("UserRole", "DisplayRole", "EditRole", "ToolTipRole", "DecorationRole"), "ItemDataRole"),
+        **dict.fromkeys(("PointingHandCursor", "ArrowCursor", "WaitCursor", "IBeamCursor"), "CursorShape"),
+        **dict.fromkeys(("Key_Return", "Key_Enter", "Key_Escape", "Key_Tab"), "Key"),
+        **dict.fromkeys(("KeepAspectRatio", "IgnoreAspectRatio"), "AspectRatioMode"),
+        **dict.fromkeys(("SmoothTransformation", "FastTransformation"), "TransformationMode"),
+        **dict.fromkeys(("white", "black", "red", "green", "blue", "gray", "transparent"), "GlobalColor"),
+        **dict.fromkeys(("WA_DeleteOnClose", "WA_TranslucentBackground"), "WidgetAttribute"),
+        **dict.fromkeys(("ToolTip", "FramelessWindowHint", "WindowStaysOnTopHint"), "WindowType"),
+        **dict.fromkeys(("CTRL", "SHIFT", "ALT"), "Modifier"),
+    },
+    "QMessageBox": {
+        **dict.fromkeys(("Yes", "No", "Ok", "Cancel", "Save", "Discard", "Close"), "StandardButton"),
+        **dict.fromkeys(("Information", "Warning", "Critical", "Question"), "Icon"),
+    },
+    "QLineEdit": dict.fromkeys(("Password", "Normal", "NoEcho", "PasswordEchoOnEdit"), "EchoMode"),
+    "QTextCursor": dict.fromkeys(("End", "Start", "EndOfLine", "StartOfLine"), "MoveOperation"),
+    "QSizePolicy": dict.fromkeys(("Expanding", "Fixed", "Minimum", "Maximum", "Preferred"), "Policy"),
+    "QFrame": {
+        **dict.fromkeys(("HLine", "VLine", "StyledPanel", "Box", "NoFrame"), "Shape"),
+        **dict.fromkeys(("Sunken", "Raised", "Plain"), "Shadow"),
+    },
+    "QFont": dict.fromkeys(("Bold", "Normal", "Light", "DemiBold"), "Weight"),
+    "QPalette": dict.fromkeys(("Window", "WindowText", "Base", "Text", "Button", "ButtonText", "Highlight"),
+                              "ColorRole"),
+    "QEasingCurve": dict.fromkeys(("Linear", "InOutQuad", "OutCubic", "InOutCubic", "OutBounce"), "Type"),
+    "QAbstractItemView": dict.fromkeys(("SingleSelection", "MultiSelection", "NoSelection"), "SelectionMode"),
+    "QFileDialog": dict.fromkeys(("ShowDirsOnly", "DontUseNativeDialog"), "Option"),
+    "QEvent": dict.fromkeys(("Enter", "Leave", "KeyPress", "MouseButtonPress", "Resize", "Close"), "Type"),
+}
+
+# Calls known to return str, so ``.count()`` on their result needs an argument.
+STRING_RESULTS = {"toPlainText", "text", "toHtml", "placeholderText", "currentText", "windowTitle",
+                  "strip", "lower", "upper", "read", "format", "join", "str"}
+
+EXTRA_BUILTINS = {"__file__", "__builtins__", "__spec__", "__loader__", "__package__", "__path__", "__cached__"}
+BUILTIN_NAMES = set(dir(builtins)) | EXTRA_BUILTINS
+
+_REQUIREMENT_NAME = re.compile(r"^\s*([A-Za-z0-9][A-Za-z0-9._-]*)")
+
+
+def normalize(name):
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+def parse_requirements(text):
+    names = set()
+    for line in text.splitlines():
+        line = line.split("#", 1)[0].strip()
+        if not line or line.startswith("-"):
+            continue
+        match = _REQUIREMENT_NAME.match(line)
+        if match:
+            names.add(normalize(match.group(1)))
+    return names
+
+
+def stdlib_modules():
+    names = getattr(sys, "stdlib_module_names", None)
+    if names is not None:
+        return set(names)
+    return set(sys.builtin_module_names)  # Python < 3.10: best effort
+
+
+# -- scopes -------------------------------------------------------------------
+
+NESTED_SCOPES = (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda, ast.ClassDef,
+                 ast.ListComp, ast.SetComp, ast.DictComp, ast.GeneratorExp)
+
+
+def _outer_parts(node):
+    """Parts of a nested scope that are evaluated in the enclosing scope."""
+    if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda)):
+        parts = list(node.args.defaults) + [d for d in node.args.kw_defaults if d is not None]
+        return parts + list(getattr(node, "decorator_list", []))
+    if isinstance(node, ast.ClassDef):
+        return list(node.decorator_list) + list(node.bases) + [k.value for k in node.keywords]
+    return []
+
+
+def _inner_parts(node):
+    if isinstance(node, (ast.Module, ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+        return list(node.body)
+    if isinstance(node, ast.Lambda):
+        return [node.body]
+    if isinstance(node, ast.DictComp):
+        return list(node.generators) + [node.key, node.value]
+    return list(node.generators) + [node.elt]
+
+
+def _scope_nodes(node):
+    """Nodes evaluated in ``node``'s own scope; nested scopes are yielded but not entered."""
+    stack = _inner_parts(node)
+    while stack:
+        child = stack.pop()
+        yield child
+        if isinstance(child, NESTED_SCOPES):
+            stack.extend(_outer_parts(child))
+        else:
+            stack.extend(ast.iter_child_nodes(child))
+
+
+def _bindings(node):
+    names, star = set(), False
+    if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda)):
+        args = node.args
+        for arg in args.posonlyargs + args.args + args.kwonlyargs + [args.vararg, args.kwarg]:
+            if arg is not None:
+                names.add(arg.arg)
+    for child in _scope_nodes(node):
+        if isinstance(child, ast.Name) and isinstance(child.ctx, (ast.Store, ast.Del)):
+            names.add(child.id)
+        elif isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            names.add(child.name)
+        elif isinstance(child, ast.Import):
+            names.update(alias.asname or alias.name.split(".")[0] for alias in child.names)
+        elif isinstance(child, ast.ImportFrom):
+            for alias in child.names:
+                if alias.name == "*":
+                    star = True
+                else:
+                    names.add(alias.asname or alias.name)
+        elif isinstance(child, ast.ExceptHandler) and child.name:
+            names.add(child.name)
+        elif isinstance(child, (ast.Global, ast.Nonlocal)):
+            names.update(child.names)
+        elif isinstance(child, ast.NamedExpr):
+            names.add(child.target.id)
+        elif child.__class__.__name__ in ("MatchAs", "MatchStar") and getattr(child, "name", None):
+            names.add(child.name)
+        elif child.__class__.__name__ == "MatchMapping" and getattr(child, "rest", None):
+            names.add(child.rest)
+    return names, star
+
+
+def undefined_names(tree):
+    """``{name: first Name node}`` for loads that no enclosing scope binds."""
+    found = {}
+
+    def check(node, env):
+        local, star = _bindings(node)
+        if star:
+            return True
+        visible = env + [local]
+        for child in _scope_nodes(node):
+            if isinstance(child, ast.Name) and isinstance(child.ctx, ast.Load):
+                if child.id not in BUILTIN_NAMES and not any(child.id in scope for scope in visible):
+                    found.setdefault(child.id, child)
+            elif isinstance(child, NESTED_SCOPES):
+                # Class bodies are not visible from the functions inside them.
+                if check(child, env if isinstance(node, ast.ClassDef) else visible):
+                    return True
+        return False
+
+    if check(tree, []):
+        return {}  # a star import makes every name potentially defined
+    return found
+
+
+# -- checks -------------------------------------------------------------------
+
+def _dotted(node):
+    parts = []
+    while isinstance(node, ast.Attribute):
+        parts.append(node.attr)
+        node = node.value
+    if isinstance(node, ast.Name):
+        parts.append(node.id)
+        return ".".join(reversed(parts))
+    return None
+
+
+def check_imports(tree, requirements, siblings, stdlib):
+    findings = []
+    seen = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            modules = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+            modules = [node.module]
+        else:
+            continue
+        for module in modules:
+            top = module.split(".")[0]
+            if top in seen or top in stdlib or top in siblings or top == "__future__":
+                continue
+            seen.add(top)
+            distribution = normalize(DISTRIBUTIONS.get(top, top))
+            if requirements is not None and distribution in requirements:
+                continue
+            providers = [p for p in TRANSITIVE.get(top, ()) if requirements and normalize(p) in requirements]
+            if providers:
+                findings.append(Finding("W102", node.lineno, node.col_offset,
+                                        f"'{top}' is only installed as a dependency of {', '.join(providers)}; "
+                                        f"pin it in {REQUIREMENTS_FILE}"))
+            elif requirements is None:
+                findings.append(Finding("E101", node.lineno, node.col_offset,
+                                        f"'{top}' is imported but there is no {REQUIREMENTS_FILE}"))
+            else:
+                findings.append(Finding("E101", node.lineno, node.col_offset,
+                                        f"'{top}' is imported but not listed in {REQUIREMENTS_FILE}"))
+    return findings
+
+
+def check_api(tree):
+    findings = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.ImportFrom) and node.module and node.module.startswith("PyQt6."):
+            submodule = node.module.split(".", 1)[1]
+            for alias in node.names:
+                moved = MOVED.get((submodule, alias.name))
+                if moved:
+                    findings.append(Finding("E301", node.lineno, node.col_offset,
+                                            f"{alias.name} is in PyQt6.{moved}, not PyQt6.{submodule}"))
+                if alias.name in REMOVED:
+                    findings.append(Finding("E302", node.lineno, node.col_offset,
+                                            f"{alias.name} was removed in Qt 6; use {REMOVED[alias.name]}"))
+        elif isinstance(node, ast.Attribute):
+            owner = _dotted(node.value)
+            if owner is None:
+                continue
+            owner_name = owner.rsplit(".", 1)[-1]
+            if (owner_name, node.attr) in MOVED:
+                findings.append(Finding("E301", node.lineno, node.col_offset,
+                                        f"{node.attr} is in PyQt6.{MOVED[owner_name, node.attr]}, "
+                                        f"not PyQt6.{owner_name}"))
+            enum = SCOPED_ENUMS.get(owner_name, {}).get(node.attr)
+            if enum:
+                findings.append(Finding("E304", node.lineno, node.col_offset,
+                                        f"{owner_name}.{node.attr} must be written {owner_name}.{enum}.{node.attr}"))
+            if owner == "openai" and node.attr in ("ChatCompletion", "Completion"):
+                findings.append(Finding("E306", node.lineno, node.col_offset,
+                                        f"openai.{node.attr} was removed in openai 1.0; "
+                                        f"use OpenAI().chat.completions.create"))
+        elif isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute):
+            method = node.func.attr
+            if method == "exec_":
+                findings.append(Finding("E303", node.lineno, node.col_offset,
+                                        "exec_() was removed in PyQt6; use exec()"))
+            elif method == "count" and not node.args and not node.keywords:
+                target = node.func.value
+                is_string = isinstance(target, ast.Constant) and isinstance(target.value, str)
+                if isinstance(target, ast.Call):
+                    callee = target.func
+                    name = callee.attr if isinstance(callee, ast.Attribute) else getattr(callee, "id", None)
+                    is_string = name in STRING_RESULTS
+                if is_string:
+                    findings.append(Finding("E305", node.lineno, node.col_offset,
+                                            "str.count() needs a substring argument; use len() for the length"))
+    # Dedupe findings reported for both an import and a later attribute use.
+    return sorted(set(findings), key=lambda f: (f.line, f.col, f.code))
+
+
+def analyze_source(source, filename, requirements, siblings):
+    try:
+        tree = ast.parse(source, filename)
+        compile(tree, filename, "exec")
+    except SyntaxError as e:
+        return [Finding("E001", e.lineno or 0, (e.offset or 1) - 1, f"syntax error: {e.msg}")]
+    findings = check_imports(tree, requirements, siblings, stdlib_modules())
+    for name, node in undefined_names(tree).items():
+        findings.append(Finding("E201", node.lineno, node.col_offset, f"undefined name '{name}'"))
+    findings.extend(check_api(tree))
+    return sorted(findings, key=lambda f: (f.line, f.col, f.code))
+
+
+def file_inputs(path):
+    """Everything the result depends on: ``(source, requirements text or None, sibling modules)``."""
+    directory = os.path.dirname(path)
+    with open(path, "r", encoding="utf-8") as f:
+        source = f.read()
+    requirements_text = None
+    requirements_path = os.path.join(directory, REQUIREMENTS_FILE)
+    if os.path.isfile(requirements_path):
+        with open(requirements_path, "r", encoding="utf-8") as f:
+            requirements_text = f.read()
+    siblings = sorted(
+        os.path.splitext(name)[0] for name in os.listdir(directory)
+        if name.endswith(".py") or os.path.isfile(os.path.join(directory, name, "__init__.py"))
+    )
+    return source, requirements_text, siblings
+
+
+def cache_key(source, requirements_text, siblings):
+    digest = hashlib.sha256()
+    for part in (ANALYZER_VERSION, source, requirements_text or "\0", "\n".join(siblings)):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def analyze_file(path):
+    source, requirements_text, siblings = file_inputs(path)
+    requirements = parse_requirements(requirements_text) if requirements_text is not None else None
+    return [tuple(f) for f in analyze_source(source, path, requirements, set(siblings))]
+
+
+def find_targets(root):
+    targets = []
+    for directory, dirs, files in os.walk(root):
+        dirs[:] = sorted(d for d in dirs if not d.startswith(".") and d != "__pycache__")
+        if os.path.basename(directory) == "code" and TARGET_FILE in files:
+            targets.append(os.path.join(directory, TARGET_FILE))
+    return sorted(targets)
+
+
+def load_cache(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def save_cache(path, cache):
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".part")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(cache, f)
+    os.replace(tmp_path, path)
+
+
+def analyze_all(targets, cache, jobs=None):
+    """Return ``({path: [Finding]}, cache hits)``, analyzing cache misses in a process pool."""
+    keys = {path: cache_key(*file_inputs(path)) for path in targets}
+    misses = [path for path in targets if keys[path] not in cache]
+    if len(misses) > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            for path, findings in zip(misses, pool.map(analyze_file, misses)):
+                cache[keys[path]] = findings
+    else:
+        for path in misses:
+            cache[keys[path]] = analyze_file(path)
+    results = {path: [Finding(*f) for f in cache[keys[path]]] for path in targets}
+    return results, len(targets) - len(misses)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Statically check every generated code/main.py.")
+    parser.add_argument("root", nargs="?", default=DEFAULT_ROOT, help="Experiments root (default: %(default)s)")
+    parser.add_argument("--cache", default=DEFAULT_CACHE, help="Result cache file (default: %(default)s)")
+    parser.add_argument("--no-cache", action="store_true", help="Re-analyze everything")
+    parser.add_argument("--jobs", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--json", action="store_true", help="Print findings as JSON")
+    args = parser.parse_args(argv)
+
+    targets = find_targets(args.root)
+    if not targets:
+        print(f"No code/{TARGET_FILE} files under {args.root}", file=sys.stderr)
+        return 2
+    cache = {} if args.no_cache else load_cache(args.cache)
+    results, hits = analyze_all(targets, cache, args.jobs)
+    if not args.no_cache:
+        save_cache(args.cache, cache)
+
+    if args.json:
+        print(json.dumps({os.path.relpath(path, args.root): [f._asdict() for f in findings]
+                          for path, findings in results.items()}, indent=2))
+    else:
+        rows = []
+        for path, findings in results.items():
+            relative = os.path.relpath(path, args.root)
+            for f in findings:
+                print(f"{relative}:{f.line}:{f.col + 1}: {f.code} {f.message}")
+            errors = sum(f.code.startswith("E") for f in findings)
+            compiles = "no" if any(f.code == "E001" for f in findings) else "yes"
+            rows.append((os.path.dirname(os.path.dirname(relative)), compiles, errors, len(findings) - errors))
+        width = max(len(row[0]) for row in rows)
+        print(f"\n{'program':<{width}}  compiles  errors  warnings")
+        for name, compiles, errors, warnings in rows:
+            print(f"{name:<{width}}  {compiles:>8}  {errors:>6}  {warnings:>8}")
+        print(f"\n{len(targets)} programs, {hits} from cache")
+    return 1 if any(f.code.startswith("E") for findings in results.values() for f in findings) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
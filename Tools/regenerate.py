@@ -0,0 +1,282 @@
+"""Incrementally regenerate the Experiments tree.
+
+Every experiment directory (``Experiments/<batch>/<name>/``) has a
+``prompt.md``, an ``experiment-details.md`` and one folder per model. Each
+model folder holds ``output.md`` plus the code extracted from it, in
+``code/main.py`` and ``code/requirements.txt``. For each experiment, this
+pipeline:
+
+1. re-runs the prompt for every model whose output predates the current
+   ``prompt.md`` (only with ``--rerun`` and a ``--backend`` for that model;
+   the runner is the Cohere build's ``fan_out.py``), and
+2. extracts the fenced code blocks of every new or changed ``output.md``
+   into ``code/``.
+
+What each stage last saw is recorded as SHA-256 hashes in the experiment's
+``.manifest.json``, so unchanged experiments are skipped. Experiments run
+in parallel in a process pool.
+
+Code that was edited by hand after extraction is never overwritten without
+``--force``. On the first run, existing files are adopted as the baseline
+rather than regenerated.
+
+Usage:
+    python Tools/regenerate.py                      # extract what changed
+    python Tools/regenerate.py --dry-run            # report only
+    python Tools/regenerate.py --rerun --backend GPT-4o=gpt-4o
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_ROOT = os.path.join(REPO_ROOT, "Experiments")
+DEFAULT_RUNNER = os.path.join(
+    DEFAULT_ROOT, "1024", "Prompt-Runner-GUI-Comparisons", "Cohere-R-Command-Plus", "code", "fan_out.py"
+)
+PROMPT_FILE = "prompt.md"
+OUTPUT_FILE = "output.md"
+MANIFEST_FILE = ".manifest.json"
+CODE_DIR = "code"
+MAIN_FILE = "main.py"
+REQUIREMENTS_FILE = "requirements.txt"
+RERUN_TIMEOUT = 1800
+# Regenerated files get the mode open() would give them, not mkstemp's 0600.
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+FILE_MODE = 0o666 & ~_UMASK
+
+FENCE = re.compile(r"^(?P<fence>`{3,}|~{3,})[ \t]*(?P<lang>[\w+.-]*)[^\n]*\n(?P<body>.*?)^(?P=fence)[ \t]*$",
+                   re.MULTILINE | re.DOTALL)
+PYTHON_LANGS = {"python", "py", "python3"}
+PLAIN_LANGS = {"", "txt", "text", "plaintext", "requirements", "pip"}
+REQUIREMENT_LINE = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.\-]*(\[[\w,\s-]+\])?\s*([<>=!~]=?\s*[\w.*+-]+\s*,?\s*)*$")
+
+
+def sha256_file(path):
+    digest = hashlib.sha256()
+    try:
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 16), b""):
+                digest.update(block)
+    except FileNotFoundError:
+        return None
+    return digest.hexdigest()
+
+
+def sha256_text(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def find_experiments(root):
+    """Experiment directories, i.e. ``root/*/*/`` with a prompt.md, sorted."""
+    experiments = []
+    for batch in sorted(os.listdir(root)):
+        batch_dir = os.path.join(root, batch)
+        if not os.path.isdir(batch_dir):
+            continue
+        for name in sorted(os.listdir(batch_dir)):
+            directory = os.path.join(batch_dir, name)
+            if os.path.isfile(os.path.join(directory, PROMPT_FILE)):
+                experiments.append(directory)
+    return experiments
+
+
+def find_models(experiment_dir):
+    return sorted(
+        name for name in os.listdir(experiment_dir)
+        if os.path.isfile(os.path.join(experiment_dir, name, OUTPUT_FILE))
+    )
+
+
+def extract_code(markdown):
+    """Return ``{filename: text}`` for the code fenced in a model's output.
+
+    The Python block with a ``__main__`` guard (or else the longest one)
+    becomes main.py. A plain block that lists only requirement specifiers
+    becomes requirements.txt.
+    """
+    python_blocks, requirement_blocks = [], []
+    for match in FENCE.finditer(markdown):
+        lang, body = match.group("lang").lower(), match.group("body")
+        lines = [line.strip() for line in body.splitlines() if line.strip()]
+        if lang in PYTHON_LANGS:
+            python_blocks.append(body)
+        elif lang in PLAIN_LANGS and lines and all(REQUIREMENT_LINE.match(line) for line in lines):
+            requirement_blocks.append("\n".join(lines) + "\n")
+    files = {}
+    if python_blocks:
+        files[MAIN_FILE] = max(python_blocks, key=lambda body: ("__main__" in body, len(body)))
+    if requirement_blocks:
+        files[REQUIREMENTS_FILE] = requirement_blocks[-1]
+    return files
+
+
+def write_atomic(path, text):
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".part")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.chmod(tmp_path, FILE_MODE)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def load_manifest(experiment_dir):
+    try:
+        with open(os.path.join(experiment_dir, MANIFEST_FILE), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"models": {}}
+
+
+def rerun(experiment_dir, specs, runner, log):
+    command = [sys.executable, runner, experiment_dir, "--quiet"]
+    for spec in specs:
+        command += ["--backend", spec]
+    proc = subprocess.run(command, capture_output=True, text=True, timeout=RERUN_TIMEOUT)
+    log.extend(line for line in proc.stdout.splitlines() if line.strip())
+    if proc.returncode != 0:
+        log.append(f"runner exited with {proc.returncode}: {proc.stderr.strip()[-500:]}")
+
+
+def regenerate(experiment_dir, backends, rerun_stale=False, force=False, dry_run=False, runner=DEFAULT_RUNNER):
+    """Run both stages for one experiment; returns ``(experiment_dir, log lines, changed)``."""
+    log = []
+    manifest = load_manifest(experiment_dir)
+    models = manifest.setdefault("models", {})
+    prompt_hash = sha256_file(os.path.join(experiment_dir, PROMPT_FILE))
+    first_run = not models
+
+    # Stage 1: re-run prompts whose outputs were produced from an older prompt.md.
+    stale = [name for name in find_models(experiment_dir)
+             if name in models and models[name].get("prompt") != prompt_hash]
+    if stale:
+        runnable = [name for name in stale if name in backends]
+        for name in stale:
+            if name not in backends:
+                log.append(f"[stale] {name}: prompt changed; pass --backend {name}=MODEL to re-run it")
+        if runnable and rerun_stale and not dry_run:
+            before = {name: sha256_file(os.path.join(experiment_dir, name, OUTPUT_FILE)) for name in runnable}
+            rerun(experiment_dir, [backends[name] for name in runnable], runner, log)
+            for name in runnable:
+                # A failed model keeps its old output and stays stale.
+                if sha256_file(os.path.join(experiment_dir, name, OUTPUT_FILE)) != before[name]:
+                    models[name]["prompt"] = prompt_hash
+        elif runnable:
+            log.append(f"[stale] {', '.join(runnable)}: would re-run (pass --rerun)")
+
+    # Stage 2: extract code from outputs that changed since the last extraction.
+    changed = False
+    for name in find_models(experiment_dir):
+        entry = models.setdefault(name, {"prompt": prompt_hash, "code": {}})
+        output_path = os.path.join(experiment_dir, name, OUTPUT_FILE)
+        output_hash = sha256_file(output_path)
+        code_dir = os.path.join(experiment_dir, name, CODE_DIR)
+        if entry.get("output") == output_hash:
+            continue
+        changed = True
+        with open(output_path, "r", encoding="utf-8") as f:
+            extracted = extract_code(f.read())
+        recorded = entry.setdefault("code", {})
+        for filename, text in extracted.items():
+            path = os.path.join(code_dir, filename)
+            current = sha256_file(path)
+            if first_run and current is not None and not force:
+                # Adopt what is already on disk as the baseline.
+                recorded[filename] = current
+                continue
+            if current is not None and current != recorded.get(filename) and not force:
+                log.append(f"[conflict] {name}/{CODE_DIR}/{filename} was edited by hand; use --force to overwrite")
+                continue
+            if current == sha256_text(text):
+                recorded[filename] = current
+                continue
+            log.append(f"[extract] {name}/{CODE_DIR}/{filename}")
+            if not dry_run:
+                write_atomic(path, text)
+                recorded[filename] = sha256_text(text)
+        if first_run:
+            log.append(f"[adopt] {name}: recorded existing output and code as the baseline")
+        entry["output"] = output_hash
+
+    if not dry_run and (changed or stale):
+        manifest["prompt"] = prompt_hash
+        write_atomic(os.path.join(experiment_dir, MANIFEST_FILE), json.dumps(manifest, indent=2, sort_keys=True) + "\n")
+    return experiment_dir, log, changed
+
+
+def parse_backends(specs):
+    backends = {}
+    for spec in specs:
+        name, sep, model = spec.partition("=")
+        if not sep or not name or not model:
+            raise ValueError(f"Backend must look like NAME=MODEL[@BASE_URL]: {spec!r}")
+        backends[name] = spec
+    return backends
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Re-run stale prompts and re-extract code across the Experiments tree.")
+    parser.add_argument("root", nargs="?", default=DEFAULT_ROOT, help="Experiments root (default: %(default)s)")
+    parser.add_argument("--backend", action="append", default=[], metavar="NAME=MODEL[@BASE_URL]",
+                        help="How to re-run the model folder NAME; repeat for each model")
+    parser.add_argument("--rerun", action="store_true", help="Actually call the API for stale prompts")
+    parser.add_argument("--runner", default=DEFAULT_RUNNER, help="fan_out.py used for re-runs")
+    parser.add_argument("--force", action="store_true", help="Overwrite code that was edited by hand")
+    parser.add_argument("--dry-run", action="store_true", help="Report what would change without writing")
+    parser.add_argument("--jobs", type=int, default=None, help="Worker processes (default: CPU count)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        backends = parse_backends(args.backend)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    experiments = find_experiments(args.root)
+    if not experiments:
+        print(f"No experiments found under {args.root}", file=sys.stderr)
+        return 2
+
+    updated = 0
+    failed = 0
+    with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+        futures = [
+            pool.submit(regenerate, experiment, backends, args.rerun, args.force, args.dry_run, args.runner)
+            for experiment in experiments
+        ]
+        for future in as_completed(futures):
+            try:
+                experiment, log, changed = future.result()
+            except Exception as e:
+                failed += 1
+                print(f"[error] {e}", file=sys.stderr)
+                continue
+            relative = os.path.relpath(experiment, args.root)
+            if not log and not changed:
+                print(f"{relative}: up to date")
+                continue
+            updated += changed
+            print(f"{relative}:")
+            for line in log:
+                print(f"    {line}")
+    print(f"{len(experiments)} experiments checked, {updated} updated, {failed} failed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
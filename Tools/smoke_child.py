@@ -0,0 +1,149 @@
+"""In-process probe for ``smoke_run.py``; launched in place of a generated main.py.
+
+Usage (by smoke_run.py only):
+    python Tools/smoke_child.py PATH/TO/main.py
+
+Before the program under test runs, this module wraps
+``QApplication.exec``. When the event loop starts, it installs a probe on
+the application. The probe records when the first top-level window paints
+and then measures how late a 10 ms timer fires for a few seconds (event
+loop stalls). After that it writes the results and quits the app. Results
+are written as JSON to ``$SMOKE_RESULT`` again at exit, including when the
+program crashes before it ever reaches the event loop.
+"""
+
+import atexit
+import json
+import os
+import resource
+import runpy
+import sys
+import time
+import traceback
+
+PROBE_INTERVAL_MS = 10
+
+launched_at = float(os.environ.get("SMOKE_LAUNCHED_AT", time.time()))
+result_path = os.environ["SMOKE_RESULT"]
+probe_seconds = float(os.environ.get("SMOKE_PROBE_SECONDS", "2"))
+show_timeout = float(os.environ.get("SMOKE_SHOW_TIMEOUT", "15"))
+
+probes = []
+result = {"exec_called": False, "shown_ms": None, "visible_ms": None, "stall_max_ms": None,
+          "stall_p95_ms": None, "error": None}
+
+
+def elapsed_ms():
+    return (time.time() - launched_at) * 1000
+
+
+def write_result():
+    result["peak_rss_kb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    tmp_path = result_path + ".part"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(result, f)
+    os.replace(tmp_path, result_path)
+
+
+def install_probe(app):
+    from PyQt6 import QtCore, QtWidgets
+
+    class Probe(QtCore.QObject):
+        def __init__(self):
+            super().__init__(app)
+            self.lateness = []
+            self.last_tick = None
+            app.installEventFilter(self)
+            self.poll = QtCore.QTimer(self)
+            self.poll.setInterval(PROBE_INTERVAL_MS)
+            self.poll.timeout.connect(self.check_visible)
+            self.poll.start()
+            QtCore.QTimer.singleShot(int(show_timeout * 1000), self.give_up)
+
+        def eventFilter(self, obj, event):
+            if (result["shown_ms"] is None and event.type() == QtCore.QEvent.Type.Paint
+                    and isinstance(obj, QtWidgets.QWidget) and obj.isWindow()):
+                result["shown_ms"] = elapsed_ms()
+                QtCore.QTimer.singleShot(0, self.start_stall_probe)
+            return False
+
+        def check_visible(self):
+            # Fallback for platforms that never deliver a paint event offscreen.
+            if result["visible_ms"] is None and any(w.isVisible() for w in QtWidgets.QApplication.topLevelWidgets()):
+                result["visible_ms"] = elapsed_ms()
+                QtCore.QTimer.singleShot(500, self.start_stall_probe)
+
+        def start_stall_probe(self):
+            if self.last_tick is not None:
+                return
+            self.poll.stop()
+            self.last_tick = time.perf_counter()
+            self.ticker = QtCore.QTimer(self)
+            self.ticker.setTimerType(QtCore.Qt.TimerType.PreciseTimer)
+            self.ticker.setInterval(PROBE_INTERVAL_MS)
+            self.ticker.timeout.connect(self.tick)
+            self.ticker.start()
+            QtCore.QTimer.singleShot(int(probe_seconds * 1000), self.finish)
+
+        def tick(self):
+            now = time.perf_counter()
+            self.lateness.append(max(0.0, (now - self.last_tick) * 1000 - PROBE_INTERVAL_MS))
+            self.last_tick = now
+
+        def finish(self):
+            if self.lateness:
+                ordered = sorted(self.lateness)
+                result["stall_max_ms"] = ordered[-1]
+                result["stall_p95_ms"] = ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+            # Written now as well as at exit: PyQt aborts the process on an
+            # exception in a virtual such as closeEvent, skipping atexit.
+            write_result()
+            app.quit()
+
+        def give_up(self):
+            if result["shown_ms"] is None and result["visible_ms"] is None:
+                result["error"] = f"no window shown within {show_timeout:g}s"
+                app.quit()
+
+    return Probe()
+
+
+def patch_qt():
+    from PyQt6 import QtWidgets
+
+    original_exec = QtWidgets.QApplication.exec
+
+    # exec() is static in PyQt6 and takes no arguments, whether it is called
+    # as app.exec() or QApplication.exec(); the wrapper must be static too.
+    def exec_with_probe():
+        app = QtWidgets.QApplication.instance()
+        result["exec_called"] = True
+        result["exec_ms"] = elapsed_ms()
+        probes.append(install_probe(app))
+        return original_exec()
+
+    QtWidgets.QApplication.exec = staticmethod(exec_with_probe)
+
+
+def main():
+    script = os.path.abspath(sys.argv[1])
+    atexit.register(write_result)
+    try:
+        patch_qt()
+    except ImportError as e:
+        result["error"] = f"PyQt6 is not importable: {e}"
+        sys.exit(3)
+    sys.argv = [script]
+    sys.path.insert(0, os.path.dirname(script))
+    try:
+        runpy.run_path(script, run_name="__main__")
+    except SystemExit:
+        raise
+    except BaseException as e:
+        result["error"] = f"{e.__class__.__name__}: {e}"
+        result["traceback"] = traceback.format_exc()[-4000:]
+        raise
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+"""Headless smoke-run of every generated GUI, with startup and memory scoring.
+
+Each ``Experiments/**/code/main.py`` is launched through ``smoke_child.py``
+under ``QT_QPA_PLATFORM=offscreen``, in its own session and a throwaway home
+directory, with resource limits on address space, CPU time, open files and
+core dumps. API keys are removed from its environment, and the OpenAI base
+URL points at a closed local port, so a run never reaches a real provider.
+
+Per launch, it measures:
+- time from launch until the first window paints
+- peak RSS (from ``wait4``)
+- event-loop stalls: how late a 10 ms timer fires over the first seconds
+
+Launches run in parallel with a per-process timeout. With ``--repeat``,
+each metric is the median over the successful launches. Results are printed
+as one comparison table per experiment. A model's score is 100 times the
+mean of best/own across window time, peak RSS and worst stall within its
+experiment; a program that never shows a window scores 0.
+
+Usage:
+    python Tools/smoke_run.py [ROOT] [--repeat 3] [--timeout 30] [--json]
+"""
+
+import argparse
+import json
+import os
+import resource
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from analyze import DEFAULT_ROOT, find_targets
+
+CHILD = os.path.join(os.path.dirname(os.path.abspath(__file__)), "smoke_child.py")
+DEFAULT_TIMEOUT = 30.0
+DEFAULT_MEMORY_MB = 4096
+DEFAULT_PROBE_SECONDS = 2.0
+MAX_OPEN_FILES = 1024
+CLOSED_PORT_URL = "http://127.0.0.1:9/v1"
+SECRET_MARKERS = ("KEY", "TOKEN", "SECRET", "PASSWORD")
+
+
+def sandbox_env(home, result_path, probe_seconds, show_timeout):
+    env = {name: value for name, value in os.environ.items()
+           if not any(marker in name.upper() for marker in SECRET_MARKERS)}
+    env.update({
+        "HOME": home,
+        "XDG_CONFIG_HOME": os.path.join(home, ".config"),
+        "XDG_CACHE_HOME": os.path.join(home, ".cache"),
+        "QT_QPA_PLATFORM": "offscreen",
+        "OPENAI_BASE_URL": CLOSED_PORT_URL,
+        "PYTHONDONTWRITEBYTECODE": "1",
+        "SMOKE_RESULT": result_path,
+        "SMOKE_LAUNCHED_AT": repr(time.time()),
+        "SMOKE_PROBE_SECONDS": str(probe_seconds),
+        "SMOKE_SHOW_TIMEOUT": str(show_timeout),
+    })
+    return env
+
+
+def limit_resources(memory_mb, cpu_seconds):
+    def apply():
+        memory = memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+        resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds + 1))
+        resource.setrlimit(resource.RLIMIT_NOFILE, (MAX_OPEN_FILES, MAX_OPEN_FILES))
+        resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+    return apply
+
+
+def launch(path, timeout=DEFAULT_TIMEOUT, memory_mb=DEFAULT_MEMORY_MB, probe_seconds=DEFAULT_PROBE_SECONDS):
+    """Launch one program once; return a dict of its measurements."""
+    with tempfile.TemporaryDirectory(prefix="smoke-") as home:
+        result_path = os.path.join(home, "result.json")
+        stderr_path = os.path.join(home, "stderr.txt")
+        show_timeout = max(1.0, timeout - probe_seconds - 2)
+        env = sandbox_env(home, result_path, probe_seconds, show_timeout)
+        with open(stderr_path, "w") as stderr:
+            proc = subprocess.Popen(
+                [sys.executable, CHILD, path], cwd=home, env=env,
+                stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=stderr,
+                start_new_session=True, preexec_fn=limit_resources(memory_mb, int(timeout) + 1),
+            )
+        timed_out = threading.Event()
+
+        def kill():
+            timed_out.set()
+            try:
+                os.killpg(proc.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+
+        timer = threading.Timer(timeout, kill)
+        timer.start()
+        try:
+            # wait4 rather than Popen.wait, for the child's own peak RSS.
+            _, status, usage = os.wait4(proc.pid, 0)
+        finally:
+            timer.cancel()
+        proc.returncode = os.waitstatus_to_exitcode(status)
+
+        measured = {}
+        if os.path.exists(result_path):
+            with open(result_path, "r", encoding="utf-8") as f:
+                measured = json.load(f)
+        with open(stderr_path, "r", errors="replace") as f:
+            stderr_tail = f.read()[-2000:]
+
+    shown_ms = measured.get("shown_ms") or measured.get("visible_ms")
+    if timed_out.is_set():
+        status_text = "timeout"
+    elif measured.get("error"):
+        status_text = "crash" if not measured.get("exec_called") else "no window"
+    elif proc.returncode != 0 and shown_ms is None:
+        status_text = "crash"
+    elif proc.returncode != 0:
+        status_text = "bad exit"  # the window worked, but shutting down failed
+    elif shown_ms is None:
+        status_text = "no window"
+    else:
+        status_text = "ok"
+    error = measured.get("error")
+    if error is None and status_text != "ok":
+        lines = [line for line in stderr_tail.splitlines() if line.strip()]
+        error = lines[-1] if lines else f"exit code {proc.returncode}"
+    return {
+        "status": status_text,
+        "exit_code": proc.returncode,
+        "shown_ms": shown_ms,
+        "peak_rss_mb": usage.ru_maxrss / 1024,  # ru_maxrss is in KiB on Linux
+        "stall_max_ms": measured.get("stall_max_ms"),
+        "stall_p95_ms": measured.get("stall_p95_ms"),
+        "error": error,
+    }
+
+
+def summarize(runs):
+    """Median of each metric over the successful runs (or the first failure)."""
+    ok = [run for run in runs if run["status"] == "ok"]
+    if not ok:
+        return dict(runs[0], runs=len(runs), ok=0)
+    summary = {"status": "ok", "runs": len(runs), "ok": len(ok), "error": None}
+    for key in ("shown_ms", "peak_rss_mb", "stall_max_ms", "stall_p95_ms"):
+        values = [run[key] for run in ok if run[key] is not None]
+        summary[key] = statistics.median(values) if values else None
+    return summary
+
+
+def score(experiment_rows):
+    """Add a 0-100 ``score`` to each row, relative to the best in its experiment."""
+    keys = ("shown_ms", "peak_rss_mb", "stall_max_ms")
+    ok = [row for row in experiment_rows if row["status"] == "ok"]
+    best = {key: min((row[key] for row in ok if row[key] is not None), default=None) for key in keys}
+    for row in experiment_rows:
+        if row["status"] != "ok":
+            row["score"] = 0.0
+            continue
+        ratios = []
+        for key in keys:
+            if best[key] is not None and row[key] is not None:
+                # Stalls can be ~0 ms; one millisecond of slack keeps the ratio sane.
+                slack = 1.0 if key == "stall_max_ms" else 0.0
+                ratios.append((best[key] + slack) / (row[key] + slack))
+        row["score"] = 100 * sum(ratios) / len(ratios) if ratios else 0.0
+
+
+def print_table(experiment, rows):
+    print(f"\n{experiment}")
+    width = max(len(row["model"]) for row in rows)
+    print(f"  {'model':<{width}}  {'status':<9}  {'window ms':>9}  {'peak RSS MB':>11}  "
+          f"{'stall max':>9}  {'stall p95':>9}  {'score':>5}")
+
+    def fmt(value, digits=0):
+        return "-" if value is None else f"{value:.{digits}f}"
+
+    for row in sorted(rows, key=lambda r: -r["score"]):
+        print(f"  {row['model']:<{width}}  {row['status']:<9}  {fmt(row['shown_ms']):>9}  "
+              f"{fmt(row['peak_rss_mb'], 1):>11}  {fmt(row['stall_max_ms'], 1):>9}  "
+              f"{fmt(row['stall_p95_ms'], 1):>9}  {row['score']:>5.0f}")
+        if row["error"]:
+            print(f"  {'':<{width}}  {row['error'][:120]}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Launch every generated GUI offscreen and score startup and memory.")
+    parser.add_argument("root", nargs="?", default=DEFAULT_ROOT, help="Experiments root (default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=1, help="Launches per program; metrics are medians")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT, help="Seconds before a launch is killed")
+    parser.add_argument("--memory-mb", type=int, default=DEFAULT_MEMORY_MB, help="Address-space limit per launch")
+    parser.add_argument("--probe-seconds", type=float, default=DEFAULT_PROBE_SECONDS,
+                        help="How long to watch the event loop for stalls after the window shows")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count(), help="Concurrent launches (default: CPU count)")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args(argv)
+
+    targets = find_targets(args.root)
+    if not targets:
+        print(f"No code/main.py files under {args.root}", file=sys.stderr)
+        return 2
+
+    jobs = [(path, i) for path in targets for i in range(args.repeat)]
+    with ThreadPoolExecutor(max_workers=args.jobs) as pool:
+        # Each launch is its own process; threads only wait on them.
+        results = list(pool.map(
+            lambda job: launch(job[0], args.timeout, args.memory_mb, args.probe_seconds), jobs
+        ))
+
+    by_path = {}
+    for (path, _), run in zip(jobs, results):
+        by_path.setdefault(path, []).append(run)
+    experiments = {}
+    for path, runs in by_path.items():
+        model_dir = os.path.dirname(os.path.dirname(path))
+        row = dict(summarize(runs), model=os.path.basename(model_dir))
+        experiments.setdefault(os.path.relpath(os.path.dirname(model_dir), args.root), []).append(row)
+    for rows in experiments.values():
+        score(rows)
+
+    if args.json:
+        print(json.dumps(experiments, indent=2))
+    else:
+        for experiment, rows in experiments.items():
+            print_table(experiment, rows)
+    return 0 if all(row["status"] == "ok" for rows in experiments.values() for row in rows) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,38 @@
+import importlib
+import os
+import sys
+
+import pytest
+
+QtWidgets = pytest.importorskip("PyQt6.QtWidgets")
+from PyQt6 import QtCore  # noqa: E402
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def smoke_child(tmp_path, monkeypatch):
+    monkeypatch.setenv("QT_QPA_PLATFORM", "offscreen")
+    monkeypatch.setenv("SMOKE_RESULT", str(tmp_path / "result.json"))
+    # patch_qt replaces QApplication.exec; put the real one back afterwards.
+    monkeypatch.setattr(QtWidgets.QApplication, "exec", QtWidgets.QApplication.exec)
+    sys.modules.pop("smoke_child", None)
+    module = importlib.import_module("smoke_child")
+    yield module
+    for probe in module.probes:
+        QtWidgets.QApplication.instance().removeEventFilter(probe)
+        probe.deleteLater()
+    sys.modules.pop("smoke_child", None)
+
+
+@pytest.mark.parametrize("call", ["instance", "class"])
+def test_patched_exec_runs_the_event_loop(smoke_child, call):
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+    smoke_child.patch_qt()
+    QtCore.QTimer.singleShot(0, app.quit)
+
+    code = app.exec() if call == "instance" else QtWidgets.QApplication.exec()
+
+    assert code == 0
+    assert smoke_child.result["exec_called"]
+    assert len(smoke_child.probes) == 1